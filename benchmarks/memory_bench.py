@@ -0,0 +1,107 @@
+"""
+Memory footprint of the BGP session representations, per 100k sessions.
+
+    python -m benchmarks.memory_bench --sessions 100000
+
+Compares pynetbox Records, the plain JSON dicts and the compact modules.models records,
+all built from the same synthetic netbox-bgp payloads (as the API returns them).
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from typing import Dict, List, Any
+
+from rich.console import Console
+from rich.table import Table
+
+# Budget for the compact records (modules.models.BgpSession), bytes per session
+MEMORY_TARGET_BYTES = 250
+
+console = Console()
+
+
+def session_payloads(n: int, n_ixps: int = 50) -> List[Dict[str, Any]]:
+    payloads = []
+    for i in range(n):
+        ix, family = i % n_ixps, 6 if i % 2 else 4
+        address = f"2001:db8:{ix:x}::{i // n_ixps + 2:x}/64" if family == 6 else \
+            f"10.{ix // 256}.{ix % 256}.{i // n_ixps % 250 + 2}/22"
+        payloads.append({
+            "id": i + 1,
+            "url": f"http://netbox/api/plugins/bgp/session/{i + 1}/",
+            "display": f"Peer Network {i // 2}",
+            "name": f"Peer Network {i // 2}",
+            "description": f"AS{4200000000 + i // 2} - IX-{ix:04d}",
+            "status": {"value": "active", "label": "Active"},
+            "device": {"id": ix + 1, "url": f"http://netbox/api/dcim/devices/{ix + 1}/", "name": f"rtr-ix{ix}"},
+            "local_address": {"id": 2 * ix + 1, "address": f"10.{ix // 256}.{ix % 256}.1/22", "family": 4},
+            "remote_address": {"id": 10000 + i, "address": address, "family": family},
+            "local_as": {"id": 1, "asn": 5405},
+            "remote_as": {"id": 100 + i // 2, "asn": 4200000000 + i // 2},
+            "peer_group": {"id": 1, "name": "Peering - IXP"},
+            "custom_fields": {"peer_type": "peer_ixp", "sync_from_pdb": True},
+            "tags": [],
+        })
+    return payloads
+
+
+def measure(build, payloads) -> int:
+    # Bytes still allocated after 'build' returns, i.e. what holding the result costs
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(payloads)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def build_records(payloads):
+    import pynetbox
+    from pynetbox.core.response import Record
+
+    api = pynetbox.api("http://netbox", token="benchmark")
+    endpoint = api.plugins.bgp.session
+    return [Record(dict(p), api, endpoint) for p in payloads]
+
+
+def build_dicts(payloads):
+    import json
+    # what the JSON decoder hands over: an independent dict tree per session
+    return [json.loads(json.dumps(p)) for p in payloads]
+
+
+def build_compact(payloads):
+    from modules.models import BgpSession
+    return [BgpSession.from_json(p) for p in payloads]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory per session representation")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    payloads = session_payloads(args.sessions)
+    per_100k = 100_000 / args.sessions
+    table = Table(title=f"Memory for {args.sessions} BGP sessions", show_header=True, header_style="bold magenta")
+    for column in ("Representation", "Total MB", "Bytes/session", "MB per 100k"):
+        table.add_column(column, justify="left" if column == "Representation" else "right")
+
+    used_by = {}
+    for label, build in (("pynetbox Record", build_records), ("JSON dict", build_dicts),
+                         ("models.BgpSession", build_compact)):
+        used = used_by[label] = measure(build, payloads)
+        table.add_row(label, f"{used / 2**20:.1f}", str(used // args.sessions), f"{used * per_100k / 2**20:.1f}")
+
+    console.print(table)
+    per_session = used_by["models.BgpSession"] // args.sessions
+    ok = per_session <= MEMORY_TARGET_BYTES
+    color = "green" if ok else "red"
+    console.print(f"[{color}]Compact records: {per_session} bytes/session (target {MEMORY_TARGET_BYTES})[/{color}]")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Offline benchmark of the IXP onboarding against local NetBox / PeeringDB stand-ins.
+
+    python -m benchmarks.run_bench --latency 0.02 --output bench.json
+    python -m benchmarks.run_bench --scenario 100x1 --scenario 20x200 --compare bench.json
+
+A scenario 'IxP' means I IXPs and P peers (each peer on every IXP, capped by --ixps-per-peer).
+Single-peer scenarios time the controller phases (intersection, validation, dry run, apply),
+multi-peer scenarios run the headless BatchPeeringRunner with scripted answers.
+The CLI startup (interpreter + 'import main' + menu entries) is timed against STARTUP_TARGET_MS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any
+
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.stub_servers import NetBoxStub, PeeringDBStub, populate
+
+DEFAULT_SCENARIOS = ["1x1", "20x1", "100x1", "500x1", "20x50", "5x1000"]
+
+# Time from process start until the main menu can be drawn, on top of a bare interpreter
+STARTUP_TARGET_MS = 150
+STARTUP_CODE = "import main; main.ToolRegistry().names()"
+
+console = Console()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure_startup(repeat: int) -> Dict[str, Any]:
+    # Fresh interpreters, so nothing is already in sys.modules; the bare one is the baseline
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def timed(code):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=root, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - started
+
+    bare = [timed("pass") for _ in range(repeat)]
+    menu = [timed(STARTUP_CODE) for _ in range(repeat)]
+    overhead_ms = round(max(0.0, percentile(menu, 50) - percentile(bare, 50)) * 1000, 1)
+    return {
+        "interpreter_p50_ms": round(percentile(bare, 50) * 1000, 1),
+        "menu_p50_ms": round(percentile(menu, 50) * 1000, 1),
+        "overhead_ms": overhead_ms,
+        "target_ms": STARTUP_TARGET_MS,
+        "ok": overhead_ms <= STARTUP_TARGET_MS,
+    }
+
+
+def make_clients(netbox: NetBoxStub, pdb: PeeringDBStub):
+    # Fresh clients for every repetition: no identity map / footprint cache carried over
+    from modules.netbox_client import NetBoxClient
+    from modules.peeringdb_client import PeeringDBClient
+    from modules.http_transport import CachedHttpClient
+
+    os.environ["NETBOX_URL"] = netbox.url
+    os.environ["NETBOX_TOKEN"] = "benchmark"
+    nb_client = NetBoxClient()
+    pdb_client = PeeringDBClient(http=CachedHttpClient())
+    pdb_client.BASE_URL = f"{pdb.url}/api"
+    return nb_client, pdb_client
+
+
+def run_single_peer(netbox, pdb, peer_asn: int) -> Dict[str, Dict[str, Any]]:
+    from modules.ixp_peering import IxpPeeringController, MY_ASN, PEER_GROUP_NAME
+    from modules.ip_manager import IPManager
+    from modules.bgp_manager import BGPManager
+    from modules.utils import extract_prefix_limits
+    from modules.port_inventory import LocalPortInventory
+
+    nb_client, pdb_client = make_clients(netbox, pdb)
+    controller = IxpPeeringController(nb_client, pdb_client)
+    inventory = LocalPortInventory(nb_client, pdb_client, MY_ASN, path=":memory:")
+    ip_mgr = IPManager(nb_client)
+    bgp_mgr = BGPManager(nb_client)
+    phases = {}
+
+    def phase(name, func):
+        before_nb, before_pdb = netbox.stats.snapshot()["total"], pdb.stats.snapshot()["total"]
+        started = time.perf_counter()
+        result = func()
+        phases[name] = {
+            "wall_s": time.perf_counter() - started,
+            "round_trips": netbox.stats.snapshot()["total"] - before_nb + pdb.stats.snapshot()["total"] - before_pdb,
+        }
+        return result
+
+    # Scripted answers: all IXPs, the peer's own tenant, sync on, no MD5
+    # The port inventory is persisted in real use, its one-off build is timed on its own
+    phase("inventory", inventory.build)
+    net_info, common_ixps = phase("intersection", lambda: controller.fetch_peer_overview(peer_asn))
+    # time until the wizard can show the first validation row (progressive rendering)
+    first_row = []
+    started = time.perf_counter()
+    valid = phase("validation", lambda: controller.validate_resources(
+        common_ixps, ip_mgr, bgp_mgr, on_row=lambda *_: first_row or first_row.append(time.perf_counter() - started)))
+    phases["validation"]["first_row_s"] = first_row[0] if first_row else 0.0
+    actionable = [s for s in valid if not s['bgp_exists'] and s['has_subnet']]
+    tenant = nb_client.get_tenant_by_name(net_info['name'])[0]
+    peer_asn_obj = nb_client.get_asn_for_tenant(peer_asn, tenant.id)
+    limit_v4, limit_v6 = extract_prefix_limits(net_info)
+
+    def plan():
+        return controller.plan_sessions(
+            actionable, net_info, tenant, peer_asn_obj,
+            nb_client.get_my_asn_object(MY_ASN), nb_client.get_peer_group_id(PEER_GROUP_NAME),
+            limit_v4, limit_v6, ip_mgr, inventory
+        )
+    prepared = phase("dry_run", plan)
+    deployable = [p for p in prepared if p['ready']]
+    results = phase("apply", lambda: controller.apply_sessions(deployable, ip_mgr, bgp_mgr, True, ""))
+    phases["_sessions"] = sum(1 for r in results if r['session'])
+    return phases
+
+
+def run_batch(netbox, pdb, peer_asns: List[int], workers: int) -> Dict[str, Any]:
+    from modules.batch_peering import BatchPeeringRunner
+    from modules.ixp_peering import MY_ASN
+    from modules.port_inventory import LocalPortInventory
+
+    nb_client, pdb_client = make_clients(netbox, pdb)
+    peers = [{"asn": asn, "tenant": pdb.nets[asn]["name"], "sync_from_pdb": True} for asn in peer_asns]
+    # built on the first plan, inside the timed run
+    inventory = LocalPortInventory(nb_client, pdb_client, MY_ASN, path=":memory:")
+    runner = BatchPeeringRunner(nb_client, pdb_client, workers=workers, port_inventory=inventory)
+    before = netbox.stats.snapshot()["total"] + pdb.stats.snapshot()["total"]
+    started = time.perf_counter()
+    summary = runner.run(peers)
+    return {
+        "batch": {
+            "wall_s": time.perf_counter() - started,
+            "round_trips": netbox.stats.snapshot()["total"] + pdb.stats.snapshot()["total"] - before,
+        },
+        "_sessions": summary["sessions_created"],
+        "_failed_peers": summary["failed_peers"],
+    }
+
+
+def run_scenario(name: str, args) -> Dict[str, Any]:
+    n_ixps, n_peers = (int(x) for x in name.lower().split("x"))
+    samples: Dict[str, List[Dict[str, Any]]] = {}
+    request_latencies: List[float] = []
+    sessions = 0
+
+    for _ in range(args.repeat):
+        netbox = NetBoxStub(latency=args.latency, bulk_create=not args.no_bulk).start()
+        pdb = PeeringDBStub(latency=args.latency, throttle_every=args.throttle_every).start()
+        try:
+            peer_asns = populate(netbox, pdb, n_ixps, n_peers, ixps_per_peer=args.ixps_per_peer)
+            netbox.stats.reset()
+            pdb.stats.reset()
+            if n_peers == 1:
+                result = run_single_peer(netbox, pdb, peer_asns[0])
+            else:
+                result = run_batch(netbox, pdb, peer_asns, args.workers)
+            sessions = result.pop("_sessions")
+            result.pop("_failed_peers", None)
+            for phase_name, values in result.items():
+                samples.setdefault(phase_name, []).append(values)
+            request_latencies += netbox.stats.snapshot()["latencies"] + pdb.stats.snapshot()["latencies"]
+        finally:
+            netbox.stop()
+            pdb.stop()
+
+    phases = {}
+    for phase_name, runs in samples.items():
+        walls = [r["wall_s"] for r in runs]
+        phases[phase_name] = {
+            "round_trips": runs[-1]["round_trips"],
+            "p50_s": round(percentile(walls, 50), 4),
+            "p95_s": round(percentile(walls, 95), 4),
+        }
+        if "first_row_s" in runs[-1]:
+            phases[phase_name]["first_row_p50_s"] = round(percentile([r["first_row_s"] for r in runs], 50), 4)
+    total_p50 = sum(p["p50_s"] for p in phases.values())
+    return {
+        "scenario": name,
+        "ixps": n_ixps,
+        "peers": n_peers,
+        "sessions": sessions,
+        "round_trips": sum(p["round_trips"] for p in phases.values()),
+        "wall_p50_s": round(total_p50, 4),
+        "sessions_per_s": round(sessions / total_p50, 1) if total_p50 else 0.0,
+        "request_p50_ms": round(percentile(request_latencies, 50) * 1000, 2),
+        "request_p95_ms": round(percentile(request_latencies, 95) * 1000, 2),
+        "phases": phases,
+    }
+
+
+def print_startup(startup: Dict[str, Any], baseline: Dict[str, Any]):
+    color = "green" if startup["ok"] else "red"
+    line = (f"[{color}]Startup: {startup['overhead_ms']} ms over the bare interpreter "
+            f"(target {startup['target_ms']} ms, menu ready at {startup['menu_p50_ms']} ms)[/{color}]")
+    if baseline:
+        line += f" ({startup['overhead_ms'] - baseline['overhead_ms']:+.1f} ms)"
+    console.print(line)
+
+
+def print_report(results: List[Dict[str, Any]], baseline: Dict[str, Any]):
+    table = Table(title="IXP onboarding benchmark", show_header=True, header_style="bold magenta")
+    for column in ("Scenario", "Sessions", "Round trips", "Wall p50 (s)", "Sessions/s", "Req p50 / p95 (ms)"):
+        table.add_column(column)
+    phase_table = Table(title="Per phase", show_header=True, header_style="bold cyan")
+    for column in ("Scenario", "Phase", "Round trips", "p50 (s)", "p95 (s)", "First row (s)"):
+        phase_table.add_column(column)
+
+    for r in results:
+        old = baseline.get(r["scenario"])
+        rt = str(r["round_trips"])
+        wall = f"{r['wall_p50_s']:.3f}"
+        if old:
+            rt += f" ({r['round_trips'] - old['round_trips']:+d})"
+            wall += f" ({r['wall_p50_s'] - old['wall_p50_s']:+.3f})"
+        table.add_row(r["scenario"], str(r["sessions"]), rt, wall, str(r["sessions_per_s"]),
+                      f"{r['request_p50_ms']} / {r['request_p95_ms']}")
+        for phase_name, p in r["phases"].items():
+            first = f"{p['first_row_p50_s']:.3f}" if "first_row_p50_s" in p else "-"
+            phase_table.add_row(r["scenario"], phase_name, str(p["round_trips"]), f"{p['p50_s']:.3f}", f"{p['p95_s']:.3f}", first)
+
+    console.print(table)
+    console.print(phase_table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline IXP onboarding benchmark")
+    parser.add_argument("--scenario", action="append", help="IXPsxPEERS, e.g. 100x1 (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.01, help="Injected latency per request (s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per scenario (p50/p95 over these)")
+    parser.add_argument("--workers", type=int, default=4, help="Batch runner workers for multi-peer scenarios")
+    parser.add_argument("--ixps-per-peer", type=int, default=None, help="Cap the IXPs per peer")
+    parser.add_argument("--output", help="Write the results as JSON (to compare between commits)")
+    parser.add_argument("--compare", help="Previous --output file to diff against")
+    parser.add_argument("--no-bulk", action="store_true", help="Reject bulk POSTs (measures the per-item apply fallback)")
+    parser.add_argument("--throttle-every", type=int, default=0,
+                        help="Answer every N-th PeeringDB request with 429 + Retry-After (measures the retry path)")
+    parser.add_argument("--skip-startup", action="store_true", help="Do not measure the CLI startup time")
+    args = parser.parse_args(argv)
+
+    baseline, startup_baseline = {}, {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            previous = json.load(fh)
+        baseline = {r["scenario"]: r for r in previous["results"]}
+        startup_baseline = previous.get("startup") or {}
+
+    startup = None
+    if not args.skip_startup:
+        startup = measure_startup(max(args.repeat, 5))
+
+    results = []
+    for name in args.scenario or DEFAULT_SCENARIOS:
+        console.print(f"[dim]Running {name}...[/dim]")
+        results.append(run_scenario(name, args))
+
+    print_report(results, baseline)
+    if startup:
+        print_startup(startup, startup_baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"latency": args.latency, "repeat": args.repeat, "startup": startup, "results": results},
+                      fh, indent=2)
+    return 1 if startup and not startup["ok"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+Local stand-ins for the NetBox and PeeringDB REST APIs used by the toolbox.
+Only the endpoints and filters the clients actually use are implemented,
+with an optional injected latency per request and per-endpoint call counters.
+"""
+import ipaddress
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, List, Any
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class CallStats:
+    """Thread-safe round trip counter + server-side latency samples per (method, endpoint)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.latencies: List[float] = []
+        self.bytes_sent = 0
+
+    def record(self, key: str, latency: float, size: int):
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.latencies.append(latency)
+            self.bytes_sent += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.calls), "total": sum(self.calls.values()),
+                    "latencies": list(self.latencies), "bytes": self.bytes_sent}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.latencies.clear()
+            self.bytes_sent = 0
+
+
+class _StubServer:
+    """Runs a ThreadingHTTPServer on a random local port in a background thread."""
+    def __init__(self, latency: float = 0.0, throttle_every: int = 0, retry_after: int = 1):
+        self.latency = latency
+        # every N-th request is answered '429 Too Many Requests' with Retry-After (0: never)
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.stats = CallStats()
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, avoid the Nagle / delayed ACK stall
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self, method):
+                started = time.perf_counter()
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with server.lock:
+                    server.requests += 1
+                    throttled = server.throttle_every and server.requests % server.throttle_every == 0
+                try:
+                    if throttled:
+                        status, payload, key = 429, {"detail": "Request was throttled."}, f"{method} {url.path}"
+                    else:
+                        status, payload, key = server.dispatch(method, url.path, params, body, dict(self.headers))
+                except Exception as e:
+                    status, payload, key = 500, {"detail": str(e)}, f"{method} {url.path}"
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                server.stats.record(key, time.perf_counter() - started, len(data))
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PATCH(self):
+                self._handle("PATCH")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def dispatch(self, method, path, params, body, headers):
+        raise NotImplementedError
+
+
+def _host(address: str) -> str:
+    return ipaddress.ip_address(str(address).split("/")[0]).compressed
+
+
+class NetBoxStub(_StubServer):
+    """
+    In-memory NetBox with the ipam / tenancy / dcim endpoints and the netbox-bgp plugin.
+    Supports limit/offset pagination, multi-value filters, list-body POST and bulk PATCH.
+    """
+    ENDPOINTS = {
+        "ipam/ip-addresses", "ipam/prefixes", "ipam/asns", "tenancy/tenants",
+        "dcim/devices", "dcim/sites", "dcim/interfaces", "plugins/bgp/session", "plugins/bgp/peer-group",
+        "core/object-changes",
+    }
+    # endpoint -> change log object type
+    CHANGE_TYPES = {
+        "ipam/ip-addresses": "ipam.ipaddress", "ipam/prefixes": "ipam.prefix", "ipam/asns": "ipam.asn",
+        "tenancy/tenants": "tenancy.tenant", "dcim/devices": "dcim.device", "dcim/sites": "dcim.site",
+        "dcim/interfaces": "dcim.interface", "plugins/bgp/session": "netbox_bgp.bgpsession",
+        "plugins/bgp/peer-group": "netbox_bgp.bgppeergroup",
+    }
+
+    def __init__(self, latency: float = 0.0, bulk_create: bool = True, **kwargs):
+        super().__init__(latency, **kwargs)
+        # False: list-body POSTs are rejected, like a NetBox (or proxy) without bulk create
+        self.bulk_create = bulk_create
+        self.objects: Dict[str, Dict[int, Dict[str, Any]]] = {e: {} for e in self.ENDPOINTS}
+        self._next_id = 1
+
+    # --- data helpers ---
+
+    def add(self, endpoint: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            obj = dict(obj)
+            obj.setdefault("id", self._next_id)
+            self._next_id = max(self._next_id, obj["id"]) + 1
+            obj["url"] = f"{self.url}/api/{endpoint}/{obj['id']}/"
+            obj.setdefault("custom_fields", {})
+            self.objects[endpoint][obj["id"]] = obj
+            self._log_change(endpoint, "create", obj["id"])
+            return obj
+
+    def _log_change(self, endpoint: str, action: str, obj_id: int):
+        changes = self.objects["core/object-changes"]
+        if endpoint in self.CHANGE_TYPES:
+            change_id = len(changes) + 1
+            changes[change_id] = {"id": change_id, "time": time.time(), "action": {"value": action},
+                                  "changed_object_type": self.CHANGE_TYPES[endpoint], "changed_object_id": obj_id}
+
+    def _nested(self, endpoint: str, obj_id: Optional[int], *fields) -> Optional[Dict[str, Any]]:
+        obj = self.objects[endpoint].get(obj_id) if obj_id else None
+        if not obj:
+            return None
+        nested = {"id": obj["id"], "url": obj["url"]}
+        nested.update({f: obj.get(f) for f in fields})
+        return nested
+
+    def _expand(self, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        # POST bodies carry plain IDs; NetBox answers with nested objects
+        obj = dict(data)
+        if endpoint == "ipam/ip-addresses":
+            obj["tenant"] = self._nested("tenancy/tenants", data.get("tenant"), "name", "slug")
+            obj.setdefault("assigned_object", None)
+        elif endpoint == "plugins/bgp/session":
+            obj["site"] = self._nested("dcim/sites", data.get("site"), "name")
+            obj["device"] = self._nested("dcim/devices", data.get("device"), "name")
+            obj["local_address"] = self._nested("ipam/ip-addresses", data.get("local_address"), "address")
+            obj["remote_address"] = self._nested("ipam/ip-addresses", data.get("remote_address"), "address")
+            obj["local_as"] = self._nested("ipam/asns", data.get("local_as"), "asn")
+            obj["remote_as"] = self._nested("ipam/asns", data.get("remote_as"), "asn")
+            obj["tenant"] = self._nested("tenancy/tenants", data.get("tenant"), "name", "slug")
+            obj["peer_group"] = self._nested("plugins/bgp/peer-group", data.get("peer_group"), "name")
+        return obj
+
+    # --- filtering ---
+
+    @staticmethod
+    def _field(obj, key):
+        if key.startswith("cf_"):
+            return (obj.get("custom_fields") or {}).get(key[3:])
+        if key.endswith("_id"):
+            nested = obj.get(key[:-3])
+            return nested.get("id") if isinstance(nested, dict) else None
+        return obj.get(key)
+
+    def _matches(self, endpoint, obj, key, values) -> bool:
+        if key == "address":
+            return _host(obj["address"]) in {_host(v) for v in values}
+        if key == "contains":
+            host = ipaddress.ip_address(_host(values[0]))
+            net = ipaddress.ip_network(obj["prefix"])
+            return host.version == net.version and host in net
+        if key == "id__gt":
+            return obj["id"] > int(values[0])
+        if key == "q":
+            return values[0].lower() in obj.get("name", "").lower()
+        if key in ("role", "tag"):
+            return values[0] in (obj.get(key + "s") or [obj.get(key)])
+        value = self._field(obj, key)
+        if isinstance(value, bool):
+            return str(value).lower() in {v.lower() for v in values}
+        return str(value) in values
+
+    def _list(self, endpoint, params):
+        limit = int(params.pop("limit", [DEFAULT_PAGE_SIZE])[0]) or DEFAULT_PAGE_SIZE
+        offset = int(params.pop("offset", [0])[0])
+        params.pop("brief", None)
+        ordering = params.pop("ordering", [None])[0]
+        with self.lock:
+            objs = [o for o in self.objects[endpoint].values()
+                    if all(self._matches(endpoint, o, k, v) for k, v in params.items())]
+        if ordering in ("id", "-id"):
+            objs.sort(key=lambda o: o["id"], reverse=ordering == "-id")
+        page = objs[offset:offset + limit]
+        nxt = None
+        if offset + limit < len(objs):
+            nxt = f"{self.url}/api/{endpoint}/?limit={limit}&offset={offset + limit}"
+        return {"count": len(objs), "next": nxt, "previous": None, "results": page}
+
+    def dispatch(self, method, path, params, body, headers):
+        match = re.match(r"^/api/(.+?)/?$", path)
+        if not match:
+            return 404, {"detail": "Not found"}, f"{method} {path}"
+        rest = match.group(1)
+        obj_id = None
+        id_match = re.match(r"^(.*)/(\d+)$", rest)
+        if id_match:
+            rest, obj_id = id_match.group(1), int(id_match.group(2))
+        if rest not in self.objects:
+            return 404, {"detail": "Not found"}, f"{method} /api/{rest}/"
+        key = f"{method} /api/{rest}/"
+
+        if method == "GET" and obj_id is not None:
+            obj = self.objects[rest].get(obj_id)
+            return (200, obj, key) if obj else (404, {"detail": "Not found"}, key)
+        if method == "GET":
+            return 200, self._list(rest, params), key
+        if method == "POST":
+            if isinstance(body, list) and not self.bulk_create:
+                return 400, {"detail": "Bulk create is not allowed"}, key
+            items = body if isinstance(body, list) else [body]
+            created = [self.add(rest, self._expand(rest, item)) for item in items]
+            return 201, created if isinstance(body, list) else created[0], key
+        if method == "PATCH":
+            items = body if isinstance(body, list) else [dict(body, id=obj_id)]
+            updated = []
+            with self.lock:
+                for item in items:
+                    obj = self.objects[rest][item["id"]]
+                    for field, value in item.items():
+                        if field == "custom_fields":
+                            obj["custom_fields"].update(value)
+                        elif field != "id":
+                            obj[field] = value
+                    updated.append(obj)
+                    self._log_change(rest, "update", obj["id"])
+            return 200, updated if isinstance(body, list) else updated[0], key
+        return 405, {"detail": "Method not allowed"}, key
+
+
+class PeeringDBStub(_StubServer):
+    """PeeringDB /api/net and /api/netixlan (asn=, asn__in=, ix_id=, since=)."""
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.nets: Dict[int, Dict[str, Any]] = {}
+        self.netixlans: List[Dict[str, Any]] = []
+
+    def dispatch(self, method, path, params, body, headers):
+        tag = path.strip("/").split("/")[-1]
+        key = f"{method} /api/{tag}"
+        if method != "GET" or tag not in ("net", "netixlan", "ix", "ixlan", "ixpfx"):
+            return 404, {"detail": "Not found"}, key
+        if "since" in params:
+            return 200, {"data": []}, key
+
+        if tag == "net":
+            rows = list(self.nets.values())
+        elif tag == "netixlan":
+            rows = self.netixlans
+        else:
+            rows = []
+
+        if "asn" in params:
+            asn = int(params["asn"][0])
+            rows = [r for r in rows if r["asn"] == asn]
+        if "asn__in" in params:
+            asns = {int(a) for v in params["asn__in"] for a in v.split(",")}
+            rows = [r for r in rows if r["asn"] in asns]
+        if "ix_id" in params:
+            ix_id = int(params["ix_id"][0])
+            rows = [r for r in rows if r["ix_id"] == ix_id]
+        return 200, {"data": rows}, key
+
+
+def ix_lan(ix_index: int, family: int) -> ipaddress._BaseNetwork:
+    # IXP #i peering LAN: 10.0.0.0 + i * /16 for IPv4, 2001:db8:i::/64 for IPv6
+    if family == 4:
+        return ipaddress.ip_network((int(ipaddress.ip_address("10.0.0.0")) + ix_index * 65536, 16))
+    return ipaddress.ip_network(f"2001:db8:{ix_index:x}::/64")
+
+
+def populate(netbox: NetBoxStub, pdb: PeeringDBStub, n_ixps: int, n_peers: int,
+             ixps_per_peer: Optional[int] = None, my_asn: int = 5405,
+             peer_group: str = "Peering - IXP", first_peer_asn: int = 4200000000) -> List[int]:
+    """
+    Builds a consistent world: our ASN on n_ixps IXPs (one router each, local IPs in NetBox),
+    n_peers peers each on 'ixps_per_peer' of them, with tenants and ASN objects in NetBox.
+    Returns the peer ASNs.
+    """
+    ixps_per_peer = min(ixps_per_peer or n_ixps, n_ixps)
+    own_tenant = netbox.add("tenancy/tenants", {"name": "Own", "slug": "own"})
+    netbox.add("ipam/asns", {"asn": my_asn, "tenant": {"id": own_tenant["id"]}})
+    netbox.add("plugins/bgp/peer-group", {"name": peer_group})
+    pdb.nets[my_asn] = {"id": my_asn, "asn": my_asn, "name": "Own Network", "irr_as_set": "AS-OWN"}
+
+    for i in range(n_ixps):
+        ix_name = f"IX-{i:04d}"
+        site = netbox.add("dcim/sites", {"name": f"site-{i}"})
+        device = netbox.add("dcim/devices", {"name": f"rtr-ix{i}", "site": {"id": site["id"], "name": site["name"]}})
+        interface = {"id": 100000 + i, "name": "et-0/0/0", "device": {"id": device["id"], "name": device["name"]}}
+        local = {}
+        for family in (4, 6):
+            lan = ix_lan(i, family)
+            netbox.add("ipam/prefixes", {"prefix": str(lan), "role": "ixp-lan"})
+            ip = netbox.add("ipam/ip-addresses", {"address": f"{lan[1]}/{lan.prefixlen}", "assigned_object": interface})
+            local[family] = str(lan[1])
+        pdb.netixlans.append({"id": len(pdb.netixlans) + 1, "ix_id": i + 1, "name": ix_name, "asn": my_asn,
+                              "ipaddr4": local[4], "ipaddr6": local[6]})
+
+    peer_asns = []
+    for j in range(n_peers):
+        asn = first_peer_asn + j
+        peer_asns.append(asn)
+        tenant = netbox.add("tenancy/tenants", {"name": f"Peer Network {j}", "slug": f"peer-{j}"})
+        netbox.add("ipam/asns", {"asn": asn, "tenant": {"id": tenant["id"]}})
+        pdb.nets[asn] = {"id": asn, "asn": asn, "name": f"Peer Network {j}", "irr_as_set": f"AS-PEER{j} AS-PEER{j}-V6",
+                         "info_prefixes4": 100 + j, "info_prefixes6": 10 + j}
+        for k in range(ixps_per_peer):
+            i = (j + k) % n_ixps
+            pdb.netixlans.append({"id": len(pdb.netixlans) + 1, "ix_id": i + 1, "name": f"IX-{i:04d}", "asn": asn,
+                                  "ipaddr4": str(ix_lan(i, 4)[2 + j]), "ipaddr6": str(ix_lan(i, 6)[2 + j])})
+    return peer_asns
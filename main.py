@@ -1,15 +1,17 @@
 import sys
 import os
 import time
+import json
+import argparse
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import IntPrompt
 from rich import print
 
-# Importáljuk az eszközeinket (Most még csak egy van)
-from modules.ixp_peering import IxpPeeringTool
-# Később ide jöhet majd: from modules.pni_peering import PniPeeringTool
+# Az eszközöket név alapján regisztráljuk, a moduljuk csak kiválasztáskor töltődik be
+# (pynetbox, requests és a PeeringDB kliens így nem lassítja az indulást)
+from modules.tool_registry import ToolRegistry
 
 # Load environment variables
 load_dotenv()
@@ -35,13 +37,10 @@ def print_banner():
 
 def main_menu():
     # --- A LISTA (Command Pattern) ---
-    # Itt regisztráljuk a rendszerbe az elérhető "Munkásokat".
-    # Ha új modult írsz, csak add hozzá ehhez a listához, és kész!
-    tools = [
-        IxpPeeringTool(),
-        # PniPeeringTool(), 
-        # SiteProvisioningTool(),
-    ]
+    # Az elérhető "Munkások" a modules/tool_registry.py TOOLS listájában vannak.
+    # Ha új modult írsz, csak add hozzá ott egy ToolSpec sorral, és kész!
+    tools = ToolRegistry()
+    names = tools.names()
 
     while True:
         print_banner()
@@ -49,14 +48,14 @@ def main_menu():
         
         # --- DINAMIKUS MENÜ GENERÁLÁS ---
         # A main.py nem tudja, mik ezek, csak megkérdezi a nevüket (.name)
-        for idx, tool in enumerate(tools, 1):
-            console.print(f"{idx}. [bold green]{tool.name}[/bold green]")
+        for idx, name in enumerate(names, 1):
+            console.print(f"{idx}. [bold green]{name}[/bold green]")
         
         console.print("0. [bold red]Exit[/bold red]")
         print()
         
         # Választás
-        valid_choices = [str(i) for i in range(len(tools) + 1)]
+        valid_choices = [str(i) for i in range(len(names) + 1)]
         choice = IntPrompt.ask("Select an option", choices=valid_choices)
         
         if choice == 0:
@@ -66,21 +65,260 @@ def main_menu():
         # --- FUTTATÁS ---
         # A kiválasztott eszköz (.run) metódusát hívjuk meg.
         # Ez a polimorfizmus: minden eszköz mást csinál a .run()-ra, de a main.py-t ez nem érdekli.
-        selected_tool = tools[choice - 1]
-        
         try:
-            selected_tool.run()
+            tools.get(choice - 1).run()
         except Exception as e:
-            console.print(f"\n[bold red]💥 Error running '{selected_tool.name}': {e}[/bold red]")
+            console.print(f"\n[bold red]💥 Error running '{names[choice - 1]}': {e}[/bold red]")
             input("Press Enter to continue...")
 
+def run_batch(args):
+    # Headless mode: no prompts, progress goes to stderr, the JSON report to stdout (or --report)
+    from modules.batch_peering import BatchPeeringRunner, load_batch_file
+    from modules.netbox_client import get_shared_client
+    from modules.ixp_peering import pdb_client, MY_ASN
+    from modules.port_inventory import LocalPortInventory
+    from modules.irr_index import IrrIndex
+
+    err_console = Console(stderr=True)
+    batch = load_batch_file(args.file)
+    nb_client = get_shared_client()
+    inventory = LocalPortInventory.from_env(nb_client, pdb_client, MY_ASN)
+    runner = BatchPeeringRunner(nb_client, pdb_client, workers=args.workers, dry_run=args.dry_run,
+                                port_inventory=inventory, irr_index=IrrIndex.from_env())
+
+    def on_result(report):
+        color = {"ok": "green", "partial": "yellow"}.get(report["status"], "red")
+        created = sum(1 for s in report["sessions"] if s["action"] in ("created", "planned"))
+        err_console.print(f"[{color}]AS{report['asn']}: {report['status']}[/{color}] "
+                          f"({created} session(s)) {report.get('error') or ''}"
+                          + (" [retryable]" if report.get("retryable") else ""))
+
+    summary = runner.run(batch["peers"], on_result=on_result)
+    output = json.dumps(summary, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            fh.write(output)
+        err_console.print(f"Report written to {args.report}")
+    else:
+        print(output)
+    if summary["failed_peers"] and summary["failed_peers"] == summary["retryable_peers"] and not summary["partial_peers"]:
+        # only upstream throttling / outages: EX_TEMPFAIL, a scheduler may simply rerun the batch
+        return 75
+    # a partial peer has failed sessions as well
+    return 1 if summary["failed_peers"] or summary["partial_peers"] else 0
+
+def run_reconcile(args):
+    from modules.reconciliation import ReconciliationEngine, DiffWriter
+    from modules.netbox_client import get_shared_client
+    from modules.ixp_peering import pdb_client, MY_ASN
+
+    err_console = Console(stderr=True)
+    engine = ReconciliationEngine(get_shared_client(), pdb_client, MY_ASN, workers=args.workers)
+    writer = DiffWriter(args.output, args.format)
+    try:
+        summary = engine.run(writer, on_shard=lambda shard, rows, error: err_console.print(
+            f"{shard['ix_name']}: {error or f'{rows} difference(s)'}"))
+    finally:
+        writer.close()
+    err_console.print(json.dumps(summary, indent=2))
+    return 1 if summary["errors"] else 0
+
+def run_pdb_sync(args):
+    # Refreshes prefix limits / AS-SETs of the 'sync_from_pdb' sessions; changes to stderr, JSON report to stdout (or --report)
+    from modules.pdb_sync import PdbSyncJob
+    from modules.netbox_client import get_shared_client
+    from modules.ixp_peering import pdb_client
+
+    err_console = Console(stderr=True)
+    job = PdbSyncJob(get_shared_client(), pdb_client, dry_run=args.dry_run)
+
+    def on_change(row):
+        color = {"updated": "green", "planned": "cyan"}.get(row["status"], "red")
+        changes = ", ".join(f"{field} {c['old']} -> {c['new']}" for field, c in row["changes"].items())
+        err_console.print(f"[{color}]{row['session_name']} (AS{row['asn']}, IPv{row['family']}): "
+                          f"{row['status']}[/{color}] {changes} {row['error'] or ''}")
+
+    summary = job.run(on_change=on_change)
+    err_console.print(f"{summary['sessions']} session(s), {summary['changed']} changed, "
+                      f"{summary['failed']} failed, {summary['not_in_peeringdb']} without PeeringDB record")
+    output = json.dumps(summary, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            fh.write(output)
+        err_console.print(f"Report written to {args.report}")
+    else:
+        print(output)
+    if summary["failed"] and summary["failed"] == summary["retryable"]:
+        # only upstream throttling / outages: EX_TEMPFAIL, like the batch run
+        return 75
+    return 1 if summary["failed"] else 0
+
+def run_irr_build(args):
+    # Builds the local IRR index from RPSL dumps (e.g. radb.db.gz, ripe.db.gz)
+    from modules.irr_index import IrrIndex, DEFAULT_IRR_INDEX_PATH
+
+    err_console = Console(stderr=True)
+    index = IrrIndex(os.getenv("IRR_INDEX", DEFAULT_IRR_INDEX_PATH))
+    started = time.time()
+    counts = index.build(args.files, workers=args.workers, on_chunk=lambda members, routes: err_console.print(
+        f"[dim]chunk: {members} as-set member(s), {routes} route(s)[/dim]"))
+    err_console.print(f"{counts['chunks']} chunk(s) in {time.time() - started:.1f}s, index: {index.stats()}")
+    return 0
+
+def run_irr_lookup(args):
+    # Expands an as-set and prints the suggested prefix limits
+    from rich.markup import escape
+    from modules.irr_index import IrrIndex
+
+    index = IrrIndex.from_env()
+    if index is None:
+        console.print("[bold red]No IRR index yet, run 'main.py irr-build <dumps>' first[/bold red]")
+        return 1
+    started = time.time()
+    asns = index.expand(args.as_set)
+    v4, v6 = index.suggest_limits(args.as_set, args.as_set)
+    console.print(f"{escape(args.as_set)}: {len(asns)} ASN(s), suggested limits IPv4 {v4} / IPv6 {v6} "
+                  f"[dim]({time.time() - started:.2f}s)[/dim]")
+    return 0
+
+def run_render_configs(args):
+    # Renders the BGP neighbor config of every device whose sessions changed since the last run
+    from modules.config_render import ConfigRenderer
+    from modules.netbox_client import get_shared_client
+
+    err_console = Console(stderr=True)
+    renderer = ConfigRenderer(get_shared_client(), args.output, args.platform, workers=args.workers)
+    summary = renderer.run(force=args.force, on_device=lambda device, sessions: err_console.print(
+        f"[dim]{device}: {sessions} session(s)[/dim]"))
+    err_console.print(f"{summary['devices']} device(s): {len(summary['rendered'])} rendered, "
+                      f"{summary['unchanged']} unchanged, {len(summary['removed'])} removed "
+                      f"in {summary['elapsed_s']}s (NetBox: {summary['fetch_s']}s)")
+    return 0
+
+def run_pdb_mirror(args):
+    # Initial download (or dump load) of the PeeringDB mirror, afterwards an incremental sync
+    from modules.peeringdb_mirror import PeeringDBMirror
+
+    err_console = Console(stderr=True)
+    mirror = PeeringDBMirror.from_env()
+    if mirror is None:
+        err_console.print("[bold red]PEERINGDB_MIRROR is not set, no mirror to load[/bold red]")
+        return 1
+    started = time.time()
+    if args.dump:
+        counts = mirror.load_dump(args.dump)
+    else:
+        # one request per object type; the first (full) download takes a few minutes
+        with err_console.status("Downloading from PeeringDB...") as status:
+            def on_tag(tag, rows):
+                err_console.print(f"[dim]{tag}: {rows} object(s)[/dim]")
+                status.update(f"Downloading from PeeringDB... ({tag} done)")
+            counts = mirror.sync(full=args.full, on_tag=on_tag)
+    err_console.print(f"PeeringDB mirror {mirror.db_path}: {sum(counts.values())} object(s) "
+                      f"in {time.time() - started:.1f}s")
+    return 0
+
+def run_ports(args):
+    # Rebuilds (or with --show only prints) the local IXP port inventory
+    from rich.table import Table
+    from modules.netbox_client import get_shared_client
+    from modules.ixp_peering import pdb_client, MY_ASN
+    from modules.port_inventory import LocalPortInventory
+
+    inventory = LocalPortInventory.from_env(get_shared_client(), pdb_client, MY_ASN)
+    if not args.show:
+        inventory.build()
+    table = Table(title=f"AS{MY_ASN} IXP ports", show_header=True, header_style="bold magenta")
+    for column in ("IXP", "ix_id", "Local IP", "Interface", "Device", "Site"):
+        table.add_column(column)
+    for port in inventory.ports():
+        table.add_row(port.ix_name, str(port.ix_id), f"{port.host}/{port.prefixlen}",
+                      port.interface_name or "-", port.device_name, port.site_name)
+    console.print(table)
+    return 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Chores Toolbox CLI (no arguments: interactive menu)")
+    parser.add_argument("--profile", action="store_true", help="Trace NetBox/PeeringDB calls and print a summary on exit")
+    parser.add_argument("--trace-json", metavar="FILE", help="With --profile: write every call and the summary as JSON")
+    parser.add_argument("--cprofile", metavar="FILE", help="With --profile: also write a cProfile dump (pstats format)")
+    sub = parser.add_subparsers(dest="command")
+    batch = sub.add_parser("batch", help="Provision IXP peerings for a list of ASNs without prompts")
+    batch.add_argument("file", help="YAML or JSON batch file (see modules/batch_peering.py)")
+    batch.add_argument("--workers", type=int, default=4, help="Number of peers processed in parallel")
+    batch.add_argument("--dry-run", action="store_true", help="Plan only, do not write to NetBox")
+    batch.add_argument("--report", help="Write the JSON report to this file instead of stdout")
+    reconcile = sub.add_parser("reconcile", help="Compare all NetBox IXP sessions with PeeringDB")
+    reconcile.add_argument("output", help="Diff output file")
+    reconcile.add_argument("--format", choices=["json", "csv"], default="json")
+    reconcile.add_argument("--workers", type=int, default=4, help="Number of IXPs processed in parallel")
+    pdb_sync = sub.add_parser("pdb-sync", help="Update prefix limits and AS-SETs of the 'sync_from_pdb' sessions")
+    pdb_sync.add_argument("--dry-run", action="store_true", help="Only report the changes, do not write to NetBox")
+    pdb_sync.add_argument("--report", help="Write the JSON report to this file instead of stdout")
+    irr_build = sub.add_parser("irr-build", help="Build the local IRR index (prefix limit suggestions) from RPSL dumps")
+    irr_build.add_argument("files", nargs="+", help="RPSL dump files (plain, .gz, .bz2 or .xz)")
+    irr_build.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    irr_lookup = sub.add_parser("irr-lookup", help="Expand an as-set from the local IRR index")
+    irr_lookup.add_argument("as_set", help="e.g. AS-EXAMPLE or RIPE::AS-EXAMPLE")
+    render = sub.add_parser("render-configs", help="Render per-device BGP neighbor configs (only changed devices)")
+    render.add_argument("output", help="Output directory (keeps the manifest of the previous run)")
+    render.add_argument("--platform", choices=["junos", "iosxr", "bird"], default="junos")
+    render.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    render.add_argument("--force", action="store_true", help="Render every device, not only the changed ones")
+    pdb_mirror = sub.add_parser("pdb-mirror", help="Download (first run) or update the local PeeringDB mirror")
+    pdb_mirror.add_argument("--full", action="store_true", help="Download everything again, not only the changes")
+    pdb_mirror.add_argument("--dump", metavar="FILE", help="Load a PeeringDB JSON dump instead of downloading")
+    ports = sub.add_parser("ports", help="Rebuild the local IXP port inventory used by the dry run")
+    ports.add_argument("--show", action="store_true", help="Only print the stored inventory")
+    return parser.parse_args()
+
+def start_profiling(args):
+    from modules.instrumentation import TRACER
+    TRACER.enable(keep_events=bool(args.trace_json))
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+def stop_profiling(args, profiler):
+    from modules.instrumentation import TRACER, print_summary
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+    print_summary(Console(stderr=True))
+    if args.trace_json:
+        TRACER.write_json(args.trace_json)
+
 if __name__ == "__main__":
+    args = parse_args()
+    profiler = start_profiling(args) if args.profile else None
     try:
         check_env_vars()
+        if args.command == "batch":
+            sys.exit(run_batch(args))
+        if args.command == "reconcile":
+            sys.exit(run_reconcile(args))
+        if args.command == "pdb-sync":
+            sys.exit(run_pdb_sync(args))
+        if args.command == "irr-build":
+            sys.exit(run_irr_build(args))
+        if args.command == "irr-lookup":
+            sys.exit(run_irr_lookup(args))
+        if args.command == "render-configs":
+            sys.exit(run_render_configs(args))
+        if args.command == "pdb-mirror":
+            sys.exit(run_pdb_mirror(args))
+        if args.command == "ports":
+            sys.exit(run_ports(args))
         main_menu()
     except KeyboardInterrupt:
         console.print("\n[bold red]Aborted by user![/bold red]")
         sys.exit()
     except Exception as e: 
         console.print(f"\n[bold red]💥 CRITICAL ERROR: {e}[/bold red]")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        if args.profile:
+            stop_profiling(args, profiler)
\ No newline at end of file
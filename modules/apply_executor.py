@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from typing import Optional, List, Any, Callable
+
+from modules.instrumentation import ContextThreadPoolExecutor
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: on average 'rate' acquisitions per second, bursts up to 'burst'.
+    acquire() blocks until a token is available.
+    """
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One write budget per process: parallel applies (batch mode workers) share it
+NETBOX_WRITE_BUCKET = TokenBucket(float(os.getenv("NETBOX_WRITE_RATE", "100")))
+
+
+class ApplyExecutor:
+    """
+    Runs independent write chains (e.g. one planned session: remote IP, then the BGP session)
+    in a bounded thread pool. The steps inside a chain stay in order, the chains run in parallel,
+    and every NetBox write goes through the shared token bucket (call()).
+    """
+    def __init__(self, workers: int = 8, bucket: Optional[TokenBucket] = None):
+        self.workers = workers
+        self.bucket = bucket or NETBOX_WRITE_BUCKET
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        # one NetBox write, once the bucket allows it
+        self.bucket.acquire()
+        return func(*args, **kwargs)
+
+    def map(self, chain: Callable[[Any], Any], items: List[Any],
+            on_result: Optional[Callable[[Any, Any], None]] = None) -> List[Any]:
+        """
+        chain(item) for every item, in parallel. Results are returned in input order;
+        'on_result(item, result)' is called as each chain finishes. chain should not raise.
+        """
+        if not items:
+            return []
+        results = [None] * len(items)
+        with ContextThreadPoolExecutor(max_workers=min(self.workers, len(items)), thread_name_prefix="apply") as pool:
+            futures = {pool.submit(chain, item): i for i, item in enumerate(items)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if on_result:
+                    on_result(items[i], results[i])
+        return results
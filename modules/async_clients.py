@@ -0,0 +1,65 @@
+import asyncio
+import functools
+from typing import Optional, Dict, Iterable, Any, Callable, Hashable
+
+from modules.http_transport import POOL_MAXSIZE
+from modules.ip_manager import IPManager, normalize_ip
+from modules.instrumentation import ContextThreadPoolExecutor
+
+# asyncio front-end of the NetBox lookups the session planning fans out (AsyncIPManager).
+# The transport stays the pooled requests.Session of the sync clients: every call runs in a worker
+# thread, at most 'concurrency' at a time (by default as many as the pool keeps connections), so
+# concurrent coroutines reuse the same keep-alive connections and identity map as the sync API.
+# Create the wrapper inside the running event loop (one per asyncio.run()).
+
+# Worker threads for the blocking calls, sized like the connection pool
+# (the loop's default executor can be as small as 5 threads).
+_executor = ContextThreadPoolExecutor(max_workers=POOL_MAXSIZE, thread_name_prefix="netio")
+
+
+class AsyncLimiter:
+    """
+    Concurrency limit plus single-flight: identical lookups issued at the same time
+    (e.g. 40 sessions behind the same local IP) share one request.
+    """
+    def __init__(self, concurrency: int = POOL_MAXSIZE):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+    async def once(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self.run(func, *args, **kwargs))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # one cancelled waiter must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+
+class AsyncIPManager:
+    """
+    Async variant of the IPManager lookups the planner fans out: local IPs and their devices
+    (same identity map). The rest of the planning inputs are resolved by the sync clients.
+    """
+    def __init__(self, ip_mgr: IPManager, limiter: Optional[AsyncLimiter] = None):
+        self.sync = ip_mgr
+        self.limiter = limiter or AsyncLimiter()
+
+    async def get_ip_address(self, address: str) -> Optional[object]:
+        return await self.limiter.once(("ipam.ip_addresses", normalize_ip(address)), self.sync.get_ip_address, address)
+
+    async def get_ip_addresses(self, addresses: Iterable[str]) -> Dict[str, object]:
+        return await self.limiter.run(self.sync.get_ip_addresses, list(addresses))
+
+    async def get_device(self, device_id: int) -> Optional[object]:
+        return await self.limiter.once(("dcim.devices", device_id), self.sync.get_device, device_id)
+
+    async def get_device_site_from_ip(self, ip_address: str) -> Optional[Dict]:
+        device_id = IPManager.device_id_of(await self.get_ip_address(ip_address))
+        if device_id is None:
+            return None
+        return IPManager.device_context(await self.get_device(device_id))
@@ -0,0 +1,235 @@
+import json
+import time
+from concurrent.futures import as_completed
+from typing import Optional, Dict, List, Any
+
+from modules.ip_manager import IPManager
+from modules.bgp_manager import BGPManager
+from modules.ixp_peering import IxpPeeringController, MY_ASN, PEER_GROUP_NAME
+from modules.utils import extract_prefix_limits, suggest_prefix_limits
+from modules.instrumentation import TRACER, ContextThreadPoolExecutor
+from modules.request_scheduler import TransientError
+
+
+def load_batch_file(path: str) -> Dict[str, Any]:
+    """
+    Reads a batch file (YAML or JSON):
+
+        defaults:
+          sync_from_pdb: true
+        peers:
+          - asn: 13335
+            tenant: "Cloudflare, Inc."   # tenant name/slug or NetBox ID
+            md5: "secret"
+            sync_from_pdb: false
+            ixps: [31, "AMS-IX"]         # PeeringDB ix_id or IXP name, omit for all common IXPs
+            prefix_limit_v4: 2000        # used if PeeringDB has no limit
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        content = fh.read()
+
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is not installed, use a JSON batch file or 'pip install pyyaml'")
+        batch = yaml.safe_load(content)
+    else:
+        batch = json.loads(content)
+
+    if not isinstance(batch, dict) or not isinstance(batch.get("peers"), list):
+        raise ValueError(f"{path}: a top-level 'peers' list is required")
+
+    defaults = batch.get("defaults") or {}
+    peers = []
+    for entry in batch["peers"]:
+        peer = {**defaults, **entry}
+        if "asn" not in peer or "tenant" not in peer:
+            raise ValueError(f"{path}: every peer needs 'asn' and 'tenant' ({entry})")
+        peer["asn"] = int(peer["asn"])
+        peers.append(peer)
+    return {"peers": peers}
+
+
+class BatchPeeringRunner:
+    """
+    Non-interactive version of the IXP Peering Wizard.
+    Runs IxpPeeringController for many ASNs in a bounded worker pool,
+    with the decisions (tenant, MD5, sync flag, IXP filter) taken from the batch file.
+    """
+    def __init__(self, nb_client, pdb_client, workers: int = 4, dry_run: bool = False, port_inventory=None,
+                 irr_index=None):
+        self.nb_client = nb_client
+        self.pdb_client = pdb_client
+        self.workers = workers
+        self.dry_run = dry_run
+        # Optional LocalPortInventory: the local side of every session without NetBox reads
+        self.port_inventory = port_inventory
+        # Optional IrrIndex: suggests the limits PeeringDB does not have
+        self.irr_index = irr_index
+
+    def run(self, peers: List[Dict[str, Any]], on_result=None) -> Dict[str, Any]:
+        """Provisions every peer; 'on_result(report)' is called as soon as one finishes."""
+        started = time.time()
+        reports = []
+        with ContextThreadPoolExecutor(max_workers=self.workers) as executor, TRACER.phase("batch"):
+            futures = {executor.submit(self.run_peer, peer): peer for peer in peers}
+            for future in as_completed(futures):
+                try:
+                    report = future.result()
+                except Exception as e:
+                    report = {"asn": futures[future]["asn"], "status": "error", "error": str(e), "sessions": [],
+                              # rate limited / unavailable upstream: rerun the peer later, nothing is wrong with it
+                              "retryable": isinstance(e, TransientError)}
+                reports.append(report)
+                if on_result:
+                    on_result(report)
+
+        elapsed = time.time() - started
+        created = sum(1 for r in reports for s in r["sessions"] if s["action"] == "created")
+        return {
+            "dry_run": self.dry_run,
+            "peers": len(peers),
+            "failed_peers": sum(1 for r in reports if r["status"] == "error"),
+            "partial_peers": sum(1 for r in reports if r["status"] == "partial"),
+            "retryable_peers": sum(1 for r in reports if r.get("retryable")),
+            "sessions_created": created,
+            "elapsed_s": round(elapsed, 2),
+            "sessions_per_minute": round(created / elapsed * 60, 1) if elapsed else 0.0,
+            "results": sorted(reports, key=lambda r: r["asn"]),
+        }
+
+    def run_peer(self, peer: Dict[str, Any]) -> Dict[str, Any]:
+        asn = peer["asn"]
+        report = {"asn": asn, "status": "ok", "error": None, "warnings": [], "sessions": []}
+        started = time.time()
+
+        def fail(message):
+            report["status"] = "error"
+            report["error"] = message
+            report["elapsed_s"] = round(time.time() - started, 2)
+            return report
+
+        # YAML turns unquoted values into floats, booleans or lists
+        spec = peer["tenant"]
+        if isinstance(spec, bool) or not isinstance(spec, (int, str)) or not str(spec).strip():
+            return fail(f"Invalid tenant {spec!r}: a tenant name / slug or a NetBox tenant ID is required")
+
+        controller = IxpPeeringController(self.nb_client, self.pdb_client)
+        ip_mgr = IPManager(self.nb_client)
+        bgp_mgr = BGPManager(self.nb_client)
+
+        # 1. PeeringDB
+        net_info, common_ixps = controller.fetch_peer_overview(asn)
+        if not net_info:
+            return fail(f"ASN {asn} not found in PeeringDB")
+        selected_ixps = self._filter_ixps(common_ixps, peer.get("ixps"))
+        if not selected_ixps:
+            return fail(f"No common IXPs between AS{MY_ASN} and AS{asn} (after the IXP filter)")
+
+        # 2. NetBox validation
+        valid_sessions = controller.validate_resources(selected_ixps, ip_mgr, bgp_mgr)
+        for s in valid_sessions:
+            if s['bgp_exists']:
+                report["sessions"].append(self._session_row(s, "exists"))
+            elif not s['has_subnet']:
+                report["sessions"].append(self._session_row(s, "no_subnet"))
+        actionable_sessions = [s for s in valid_sessions if not s['bgp_exists'] and s['has_subnet']]
+        if not actionable_sessions:
+            report["elapsed_s"] = round(time.time() - started, 2)
+            return report
+
+        # 3. Tenant, ASN and limits (no prompts: missing data fails the peer)
+        tenant = self._resolve_tenant(peer["tenant"])
+        if not tenant:
+            return fail(f"Tenant '{peer['tenant']}' not found or ambiguous")
+        peer_asn_obj = self.nb_client.get_asn_for_tenant(asn, tenant.id)
+        if not peer_asn_obj:
+            return fail(f"AS{asn} not found under tenant '{tenant.name}'")
+
+        limit_v4, limit_v6 = extract_prefix_limits(net_info)
+        limit_v4 = limit_v4 or int(peer.get("prefix_limit_v4") or 0)
+        limit_v6 = limit_v6 or int(peer.get("prefix_limit_v6") or 0)
+        if self.irr_index and (not limit_v4 or not limit_v6):
+            irr_v4, irr_v6, source = suggest_prefix_limits(net_info, self.irr_index)
+            if source:
+                report["warnings"].append(f"Prefix limits suggested from the IRR: IPv4 {limit_v4 or irr_v4}, IPv6 {limit_v6 or irr_v6}")
+            limit_v4, limit_v6 = limit_v4 or irr_v4, limit_v6 or irr_v6
+        if not limit_v4 or not limit_v6:
+            report["warnings"].append("Prefix limit missing for IPv4 and/or IPv6, sessions are created without it")
+
+        # 4. Dry Run
+        my_asn_obj = self.nb_client.get_my_asn_object(MY_ASN)
+        peer_group_id = self.nb_client.get_peer_group_id(PEER_GROUP_NAME)
+        prepared_sessions = controller.plan_sessions(
+            actionable_sessions, net_info, tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+            limit_v4, limit_v6, ip_mgr, self.port_inventory
+        )
+        for item in prepared_sessions:
+            if not item['ready']:
+                report["sessions"].append(self._session_row(item['original_data'], "no_local_context"))
+        deployable_sessions = [p for p in prepared_sessions if p['ready']]
+
+        if self.dry_run:
+            for item in deployable_sessions:
+                report["sessions"].append(self._planned_row(item, "planned"))
+            report["elapsed_s"] = round(time.time() - started, 2)
+            return report
+
+        # 5. Apply
+        results = controller.apply_sessions(
+            deployable_sessions, ip_mgr, bgp_mgr,
+            bool(peer.get("sync_from_pdb", True)), peer.get("md5") or ""
+        )
+        errors = []
+        for result in results:
+            row = self._planned_row(result['item'], "created" if result['session'] else "failed")
+            row["ip_id"] = result['ip_obj'].id if result['ip_obj'] else None
+            row["session_id"] = result['session'].id if result['session'] else None
+            error = result['ip_error'] or result['session_error']
+            if error:
+                row["error"] = str(error)
+                errors.append(error)
+                report["status"] = "partial"
+            report["sessions"].append(row)
+        if errors and not any(result['session'] for result in results):
+            # nothing was created: the peer failed, not partially succeeded
+            report["retryable"] = all(isinstance(e, TransientError) for e in errors)
+            return fail(f"No session could be created ({len(errors)} error(s)): {errors[0]}")
+
+        report["elapsed_s"] = round(time.time() - started, 2)
+        return report
+
+    def _resolve_tenant(self, spec) -> Optional[object]:
+        if isinstance(spec, int) or str(spec).isdigit():
+            return self.nb_client.get_tenant_by_id(int(spec))
+        candidates = self.nb_client.get_tenant_by_name(str(spec))
+        exact = [t for t in candidates if spec.lower() in (t.name.lower(), t.slug.lower())]
+        if len(exact) == 1:
+            return exact[0]
+        return candidates[0] if len(candidates) == 1 else None
+
+    @staticmethod
+    def _filter_ixps(common_ixps: List[Dict], wanted) -> List[Dict]:
+        if not wanted:
+            return common_ixps
+        ids = {int(w) for w in wanted if isinstance(w, int) or str(w).isdigit()}
+        names = {str(w).lower() for w in wanted if not (isinstance(w, int) or str(w).isdigit())}
+        return [ix for ix in common_ixps if ix['ix_id'] in ids or ix['ix_name'].lower() in names]
+
+    @staticmethod
+    def _session_row(session: Dict, action: str) -> Dict[str, Any]:
+        return {"ix_id": session['data']['ix_id'], "ix_name": session['data']['ix_name'],
+                "remote_ip": session['ip_str'], "action": action}
+
+    @classmethod
+    def _planned_row(cls, item: Dict, action: str) -> Dict[str, Any]:
+        row = cls._session_row(item['original_data'], action)
+        row.update({
+            "remote_ip": item['target_ip_with_cidr'],
+            "device": item['device_name'],
+            "site": item['site_name'],
+            "prefix_limit": item['prefix_limit'],
+            "as_set": item['as_set'],
+        })
+        return row
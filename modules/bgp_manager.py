@@ -1,21 +1,55 @@
-from typing import Optional
+from typing import Optional, Dict, Iterable, List, Tuple
+
+from modules.ip_manager import FILTER_CHUNK_SIZE, normalize_ip, is_rejected_write
+from modules.request_scheduler import TransientError
 
 class BGPManager:
     """Dedicated manager for BGP Session operations in NetBox."""
     def __init__(self, nb_client):
         self.nb = nb_client.nb
+        self.identity = nb_client.identity_map
 
     def get_session_by_ip(self, ip_address: str) -> Optional[object]:
         """Checks if a BGP session exists involving this IP address."""
         try:
-            ip_obj = self.nb.ipam.ip_addresses.get(address=ip_address)
+            # the IP object is usually already known from the validation step
+            ip_obj = self.identity.get_or_load(
+                "ipam.ip_addresses", normalize_ip(ip_address),
+                lambda: self.nb.ipam.ip_addresses.get(address=ip_address)
+            )
             if not ip_obj: return None
             # Filter by remote_address_id
-            sessions = self.nb.plugins.bgp.session.filter(remote_address_id=ip_obj.id)
-            session_list = list(sessions)
-            return session_list[0] if session_list else None
+            def load():
+                session_list = list(self.nb.plugins.bgp.session.filter(remote_address_id=ip_obj.id))
+                return session_list[0] if session_list else None
+            return self.identity.get_or_load("plugins.bgp.session", ip_obj.id, load)
+        except TransientError: raise
         except Exception: return None
 
+    def get_sessions_by_ip_ids(self, ip_ids: Iterable[int]) -> Dict[int, object]:
+        """
+        Bulk version of get_session_by_ip for already resolved IP objects.
+        One multi-value 'remote_address_id=' query, returns {remote IP id: session}.
+        """
+        ids = sorted(set(ip_ids))
+        sessions, unknown = {}, []
+        for ip_id in ids:
+            session = self.identity.get("plugins.bgp.session", ip_id)
+            if session is self.identity.MISSING:
+                unknown.append(ip_id)
+            elif session:
+                sessions[ip_id] = session
+
+        for i in range(0, len(unknown), FILTER_CHUNK_SIZE):
+            chunk = unknown[i:i + FILTER_CHUNK_SIZE]
+            found = {}
+            for s in self.nb.plugins.bgp.session.filter(remote_address_id=chunk):
+                if s.remote_address:
+                    found.setdefault(s.remote_address.id, s)
+            self.identity.put_many("plugins.bgp.session", {ip_id: found.get(ip_id) for ip_id in chunk})
+            sessions.update(found)
+        return sessions
+
     def create_bgp_session(self, 
                            name: str, 
                            site_id: int, 
@@ -35,6 +69,89 @@ class BGPManager:
                            description: str = "") -> object:
         
         #Creates a BGP Session with full custom fields support.
+        data = self.build_session_payload(
+            name=name, site_id=site_id, device_id=device_id,
+            local_ip_id=local_ip_id, remote_ip_id=remote_ip_id,
+            local_as_id=local_as_id, remote_as_id=remote_as_id,
+            tenant_id=tenant_id, peer_group_id=peer_group_id, address_family=address_family,
+            as_set=as_set, prefix_limit=prefix_limit, sync_pdb=sync_pdb, md5_key=md5_key,
+            peer_type=peer_type, description=description,
+        )
+        session = self.nb.plugins.bgp.session.create(**data)
+        self.identity.put("plugins.bgp.session", remote_ip_id, session)
+        return session
+
+    def create_bgp_sessions(self, sessions: List[Dict], fallback: bool = True) -> List[Tuple[Optional[object], Optional[Exception]]]:
+        """
+        Bulk version of create_bgp_session: one list-body POST for all sessions
+        (each item holds the create_bgp_session keyword arguments).
+        If NetBox rejects the batch (4xx), falls back to one request per item (fallback=False: raises instead);
+        any other error is raised. Returns (session, None) or (None, error) per item, in input order.
+        """
+        if not sessions:
+            return []
+        payloads = [self.build_session_payload(**kwargs) for kwargs in sessions]
+        try:
+            created = self.nb.plugins.bgp.session.create(payloads)
+            results = [(s, None) for s in created]
+        except Exception as e:
+            if not fallback or not is_rejected_write(e):
+                raise
+            results = []
+            for payload in payloads:
+                try:
+                    results.append((self.nb.plugins.bgp.session.create(**payload), None))
+                except Exception as e:
+                    results.append((None, e))
+
+        self.identity.put_many("plugins.bgp.session", {
+            kwargs["remote_ip_id"]: session for kwargs, (session, _) in zip(sessions, results) if session
+        })
+        return results
+
+    def update_sessions(self, updates: List[Dict], batch_size: int = 200) -> List[Tuple[Optional[object], Optional[Exception]]]:
+        """
+        Bulk PATCH of existing sessions; each item is {'id': session ID, <changed fields>}.
+        One list-body request per 'batch_size' items, a batch rejected by NetBox (4xx) is retried item by item;
+        any other failure (timeout, 5xx, TransientError) is the error of every item of the batch.
+        Returns (session, None) or (None, error) per item, in input order.
+        """
+        results = []
+        for i in range(0, len(updates), batch_size):
+            chunk = updates[i:i + batch_size]
+            try:
+                results.extend((s, None) for s in self.nb.plugins.bgp.session.update(chunk))
+            except Exception as e:
+                if not is_rejected_write(e):
+                    # the upstream is failing: one request per item would only add load
+                    results.extend((None, e) for _ in chunk)
+                    continue
+                for item in chunk:
+                    try:
+                        results.extend((s, None) for s in self.nb.plugins.bgp.session.update([item]))
+                    except Exception as e:
+                        results.append((None, e))
+        return results
+
+    @staticmethod
+    def build_session_payload(name: str, 
+                              site_id: int, 
+                              device_id: int, 
+                              local_ip_id: int, 
+                              remote_ip_id: int, 
+                              local_as_id: int, 
+                              remote_as_id: int, 
+                              tenant_id: int,
+                              peer_group_id: int,
+                              address_family: str, 
+                              as_set: str = "",
+                              prefix_limit: int = 0,
+                              sync_pdb: bool = False,
+                              md5_key: str = "",
+                              peer_type: str = "peer_ixp",
+                              description: str = "") -> Dict:
+        
+        # Request body of a BGP Session with full custom fields support.
         try:
             limit_val = int(prefix_limit)
         except (ValueError, TypeError):
@@ -78,5 +195,4 @@ class BGPManager:
             "description": description,
             "custom_fields": custom_fields
         }
-
-        return self.nb.plugins.bgp.session.create(**data)
\ No newline at end of file
+        return data
\ No newline at end of file
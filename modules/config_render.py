@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple
+from typing import Optional, Dict, List, Any, Iterator, Callable
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.prompt import Prompt
+from rich.table import Table
+from rich.markup import escape
+
+from modules.base_tool import BaseTool
+from modules.models import RouterSession
+
+# Bump when a template changes: every device is rendered again
+RENDER_VERSION = 2
+MANIFEST = ".manifest.json"
+# Below this many changed devices the rendering stays in-process (a process pool costs more than it saves)
+PARALLEL_MIN_DEVICES = 64
+
+# The AS-SET of a session is referenced as an import policy / filter named IRR-<AS-SET>-IN;
+# the policies themselves come from the prefix list tooling (e.g. bgpq4), not from here.
+
+
+def _policy(as_set: Optional[str]) -> Optional[str]:
+    if not as_set:
+        return None
+    # 'RIPE::AS-FOO AS-BAR' -> 'IRR-AS-FOO-IN' (the first set is the one PeeringDB lists first)
+    name = as_set.split()[0].split("::")[-1].upper()
+    return f"IRR-{re.sub(r'[^A-Z0-9-]', '-', name)}-IN"
+
+
+def _ident(value: str) -> str:
+    # names usable as IOS-XR neighbor-groups / BIRD symbols
+    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_") or "peers"
+
+
+def _quote(value: str) -> str:
+    return value.replace('"', "'")
+
+
+def _groups(sessions: List[RouterSession]) -> Dict[str, str]:
+    # identifier -> peer group name, in session order; the file defines every group it references
+    groups: Dict[str, str] = {}
+    for s in sessions:
+        if s.peer_group:
+            groups.setdefault(_ident(s.peer_group), s.peer_group)
+    return groups
+
+
+def _junos(device: str, sessions: List[RouterSession]) -> List[str]:
+    # GTSM is a loopback firewall filter on Junos, not a neighbor option: not rendered here
+    lines = ["protocols {", "    bgp {"]
+    groups: Dict[str, List[RouterSession]] = {}
+    for s in sessions:
+        groups.setdefault(s.peer_group or "peers", []).append(s)
+    for group, members in groups.items():
+        lines.append(f'        group "{_quote(group)}" {{')
+        lines.append("            type external;")
+        for s in members:
+            family = "inet6" if s.family == 6 else "inet"
+            lines.append(f"            neighbor {s.remote_host} {{")
+            lines.append(f'                description "{_quote(s.description or s.name)}";')
+            lines.append(f"                local-address {s.local_host};")
+            lines.append(f"                peer-as {s.remote_asn};")
+            if s.md5:
+                lines.append(f'                authentication-key "{_quote(s.md5)}";')
+            if _policy(s.as_set):
+                lines.append(f"                import {_policy(s.as_set)};")
+            if s.prefix_limit:
+                lines += [f"                family {family} {{", "                    unicast {",
+                          "                        prefix-limit {",
+                          f"                            maximum {s.prefix_limit};",
+                          "                            teardown idle-timeout 30;",
+                          "                        }", "                    }", "                }"]
+            if s.bfd:
+                lines.append("                bfd-liveness-detection { minimum-interval 300; multiplier 3; }")
+            lines.append("            }")
+        lines.append("        }")
+    lines += ["    }", "}"]
+    return lines
+
+
+def _iosxr(device: str, sessions: List[RouterSession]) -> List[str]:
+    lines = [f"router bgp {sessions[0].local_asn}"]
+    for ident, group in _groups(sessions).items():
+        lines += [f" neighbor-group {ident}", f"  description peer group {group}", " !"]
+    for s in sessions:
+        afi = "ipv6" if s.family == 6 else "ipv4"
+        lines.append(f" neighbor {s.remote_host}")
+        lines.append(f"  remote-as {s.remote_asn}")
+        if s.peer_group:
+            lines.append(f"  use neighbor-group {_ident(s.peer_group)}")
+        lines.append(f"  description {s.description or s.name}")
+        if s.md5:
+            lines.append(f"  password clear {s.md5}")
+        if s.gtsm:
+            lines.append("  ttl-security")
+        if s.bfd:
+            lines += ["  bfd fast-detect", "  bfd minimum-interval 300", "  bfd multiplier 3"]
+        lines.append(f"  address-family {afi} unicast")
+        if _policy(s.as_set):
+            lines.append(f"   route-policy {_policy(s.as_set)} in")
+        if s.prefix_limit:
+            lines.append(f"   maximum-prefix {s.prefix_limit} 90")
+        lines += ["  !", " !"]
+    lines.append("!")
+    return lines
+
+
+def _bird(device: str, sessions: List[RouterSession]) -> List[str]:
+    lines = []
+    for ident, group in _groups(sessions).items():
+        lines += [f"template bgp {ident} {{", f'    description "peer group {_quote(group)}";', "}", ""]
+    for s in sessions:
+        channel = "ipv6" if s.family == 6 else "ipv4"
+        template = f" from {_ident(s.peer_group)}" if s.peer_group else ""
+        # symbols must not start with a digit
+        lines.append(f"protocol bgp AS{s.remote_asn}_v{s.family}_{s.id}{template} {{")
+        lines.append(f'    description "{_quote(s.description or s.name)}";')
+        lines.append(f"    local {s.local_host} as {s.local_asn};")
+        lines.append(f"    neighbor {s.remote_host} as {s.remote_asn};")
+        if s.md5:
+            lines.append(f'    password "{_quote(s.md5)}";')
+        if s.gtsm:
+            lines.append("    ttl security on;")
+        if s.bfd:
+            lines.append("    bfd on;")
+        lines.append(f"    {channel} {{")
+        if _policy(s.as_set):
+            lines.append(f"        import filter {_ident(_policy(s.as_set))};")
+        if s.prefix_limit:
+            lines.append(f"        import limit {s.prefix_limit} action restart;")
+        lines += ["    };", "}", ""]
+    return lines
+
+
+# platform -> (template, file extension, comment prefix); the extensions differ per platform,
+# so files of another platform are never taken for current ones
+PLATFORMS: Dict[str, tuple] = {
+    "junos": (_junos, ".junos.conf", "#"),
+    "iosxr": (_iosxr, ".cfg", "!"),
+    "bird": (_bird, ".bird.conf", "#"),
+}
+
+
+def session_order(s: RouterSession):
+    return s.peer_group or "", s.family, s.remote_ip, s.id
+
+
+def device_hash(platform: str, sessions: List[RouterSession]) -> str:
+    """Content hash of everything a device's file is rendered from (sessions sorted by session_order)."""
+    payload = json.dumps([RENDER_VERSION, platform, [astuple(s) for s in sessions]], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_device(platform: str, device: str, sessions: List[RouterSession], digest: str) -> str:
+    """The BGP neighbor configuration of one device. Module level, so it runs in the worker processes."""
+    template, _, comment = PLATFORMS[platform]
+    header = [f"{comment} BGP sessions of {device} ({len(sessions)}), generated from NetBox",
+              f"{comment} inputs: {digest}", ""]
+    return "\n".join(header + template(device, sessions)) + "\n"
+
+
+def _render_many(platform: str, jobs: List[tuple]) -> List[str]:
+    return [render_device(platform, *job) for job in jobs]
+
+
+class ConfigRenderer:
+    """
+    Incremental generator of per-device BGP neighbor configs (Junos, IOS-XR or BIRD).
+
+    Every run streams the sessions from NetBox as compact records and groups them per device.
+    Each device's session set is content-hashed; only devices whose hash differs from the
+    manifest of the previous run are rendered (in a process pool when there are many),
+    files of devices without sessions are removed. Files are replaced atomically and the
+    manifest is written last, so an interrupted run is simply completed by the next one.
+    """
+    def __init__(self, nb_client, output_dir: str, platform: str = "junos", workers: Optional[int] = None):
+        if platform not in PLATFORMS:
+            raise ValueError(f"Unknown platform: {platform} (choose from {', '.join(PLATFORMS)})")
+        self.nb_client = nb_client
+        self.output_dir = output_dir
+        self.platform = platform
+        self.workers = workers or os.cpu_count() or 1
+
+    def iter_sessions(self) -> Iterator[RouterSession]:
+        yield from self.nb_client.stream("plugins/bgp/session", decode=RouterSession.from_json,
+                                         read_ahead=4, parallel=2)
+
+    def file_name(self, device: str) -> str:
+        return re.sub(r"[^A-Za-z0-9._-]", "_", device) + PLATFORMS[self.platform][1]
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST), encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, name: str, text: str):
+        path = os.path.join(self.output_dir, name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def run(self, force: bool = False, on_device: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
+        """
+        One incremental pass. 'force' renders every device, changed or not (files of removed devices
+        are still deleted); 'on_device(device, sessions)' is called for each rendered file. Returns the summary.
+        """
+        started = time.time()
+        os.makedirs(self.output_dir, exist_ok=True)
+        by_device: Dict[str, List[RouterSession]] = {}
+        for session in self.iter_sessions():
+            by_device.setdefault(session.device, []).append(session)
+        fetched = time.time()
+
+        # loaded even when forced: the files of devices gone since the last run must still be removed
+        last_run = self._load_manifest()
+        written = last_run.get("devices", {})
+        # another platform's files are all outdated (removed below), none of them is reused
+        previous = written if last_run.get("platform") == self.platform else {}
+        manifest, jobs = {}, []
+        for device, sessions in sorted(by_device.items()):
+            sessions.sort(key=session_order)
+            digest = device_hash(self.platform, sessions)
+            manifest[device] = {"hash": digest, "file": self.file_name(device), "sessions": len(sessions)}
+            old = previous.get(device)
+            if force or not old or old["hash"] != digest or not os.path.exists(os.path.join(self.output_dir, old["file"])):
+                jobs.append((device, sessions, digest))
+
+        if len(jobs) >= PARALLEL_MIN_DEVICES and self.workers > 1:
+            # a few devices per task keeps the pickling overhead down
+            size = max(1, len(jobs) // (self.workers * 4))
+            batches = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                texts = [text for batch in executor.map(_render_many, [self.platform] * len(batches), batches)
+                         for text in batch]
+        else:
+            texts = _render_many(self.platform, jobs)
+
+        for (device, sessions, _), text in zip(jobs, texts):
+            self._write(manifest[device]["file"], text)
+            if on_device:
+                on_device(device, len(sessions))
+
+        # every file of the last run that this run did not produce: devices without sessions, platform switches
+        current = {entry["file"] for entry in manifest.values()}
+        removed = sorted({entry["file"] for entry in written.values()} - current)
+        for name in removed:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except FileNotFoundError:
+                pass
+        self._write(MANIFEST, json.dumps({"platform": self.platform, "version": RENDER_VERSION,
+                                          "devices": manifest}, indent=1))
+
+        return {
+            "platform": self.platform,
+            "devices": len(manifest),
+            "sessions": sum(entry["sessions"] for entry in manifest.values()),
+            "rendered": [device for device, _, _ in jobs],
+            "unchanged": len(manifest) - len(jobs),
+            "removed": removed,
+            "fetch_s": round(fetched - started, 3),
+            "elapsed_s": round(time.time() - started, 3),
+        }
+
+
+class ConfigRenderTool(BaseTool):
+
+    @property
+    def name(self):
+        return "Render Router BGP Configs"
+
+    def run(self):
+        from modules.netbox_client import get_shared_client
+
+        console = Console(emoji=False)
+        console.clear()
+        console.print(Panel("[bold cyan]CONFIG RENDER: BGP neighbors per device from NetBox[/bold cyan]", border_style="cyan"))
+
+        platform = Prompt.ask("Platform", choices=list(PLATFORMS), default="junos")
+        output_dir = Prompt.ask("Output directory", default=os.path.join(os.getcwd(), "configs", platform))
+        force = Prompt.ask("Render every device (ignore the previous run)?", choices=["y", "n"], default="n") == "y"
+
+        renderer = ConfigRenderer(get_shared_client(), output_dir, platform)
+        with console.status("[bold green]Loading sessions and rendering changed devices...[/bold green]"):
+            summary = renderer.run(force=force)
+
+        table = Table(title=f"{summary['devices']} device(s), {summary['sessions']} session(s)",
+                      show_header=True, header_style="bold magenta")
+        table.add_column("Rendered device")
+        table.add_column("File")
+        for device in summary["rendered"][:50]:
+            table.add_row(escape(device), escape(renderer.file_name(device)))
+        if summary["rendered"]:
+            console.print(table)
+        if len(summary["rendered"]) > 50:
+            console.print(f"[dim]... and {len(summary['rendered']) - 50} more[/dim]")
+        console.print(f"[green]{len(summary['rendered'])} rendered, {summary['unchanged']} unchanged, "
+                      f"{len(summary['removed'])} removed in {summary['elapsed_s']}s "
+                      f"(NetBox: {summary['fetch_s']}s) -> {escape(output_dir)}[/green]")
+        input("\nPress Enter to return...")
@@ -0,0 +1,191 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.instrumentation import TRACER, normalize_endpoint
+from modules.request_scheduler import RequestScheduler
+
+# Connection pool tuning: few hosts (PeeringDB, NetBox), several parallel requests per host.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chores-toolbox", "http_cache.sqlite3")
+
+# One scheduler per process: every session shares the per-host budgets
+SCHEDULER = RequestScheduler.from_env(POOL_MAXSIZE)
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+class ScheduledAdapter(HTTPAdapter):
+    """HTTPAdapter whose requests go through the request scheduler (budgets, retries, backoff)."""
+    def __init__(self, scheduler: RequestScheduler, service: str, **kwargs):
+        self.scheduler = scheduler
+        self.service = service
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        return self.scheduler.send(request, functools.partial(HTTPAdapter.send, self, request, **kwargs), self.service)
+
+
+def create_session(pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                   service: str = "http", scheduler: Optional[RequestScheduler] = None) -> requests.Session:
+    """Creates a keep-alive requests.Session with a tuned connection pool, scheduled by SCHEDULER."""
+    session = requests.Session()
+    adapter = ScheduledAdapter(scheduler or SCHEDULER, service,
+                               pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = "chores-toolbox"
+    return session
+
+
+def get_shared_session() -> requests.Session:
+    """Process-wide session, so every client reuses the same TCP+TLS connections."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = TRACER.instrument_session(create_session(service="peeringdb"), "peeringdb")
+        return _shared_session
+
+
+class ResponseCache:
+    """
+    Persistent (SQLite) HTTP response cache.
+    Keeps the body together with ETag / Last-Modified validators,
+    and evicts the least recently used entries above 'max_bytes'.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 64 * 1024 * 1024):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+                " stored_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.db.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            with self.db:
+                self.db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return {"body": row[0], "etag": row[1], "last_modified": row[2], "stored_at": row[3]}
+
+    def put(self, key: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, body, etag, last_modified, stored_at, last_access, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now, now, len(body)),
+            )
+            self._evict()
+
+    def touch(self, key: str):
+        # A 304 revalidation makes the stored body fresh again.
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute("UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+
+    def delete(self, key: str):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM responses")
+
+
+class CachedHttpClient:
+    """
+    JSON GET helper on top of the shared session and the response cache.
+    Fresh entries (younger than the endpoint TTL) cost nothing,
+    stale ones are revalidated with If-None-Match / If-Modified-Since.
+    Empty answers ({"data": []}) are only fresh for 'empty_ttl': the object may be created any minute.
+    """
+    def __init__(self, session: Optional[requests.Session] = None,
+                 cache: Optional[ResponseCache] = None,
+                 ttls: Optional[Dict[str, int]] = None,
+                 default_ttl: int = 0,
+                 empty_ttl: int = 0):
+        self.session = session or get_shared_session()
+        self.cache = cache
+        # endpoint (last URL path segment) -> TTL in seconds
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.empty_ttl = empty_ttl
+
+    @staticmethod
+    def cache_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        return f"{url}?{urlencode(sorted((params or {}).items()), doseq=True)}"
+
+    def ttl_for(self, url: str, payload: Any = None) -> int:
+        ttl = self.ttls.get(url.rstrip("/").rsplit("/", 1)[-1], self.default_ttl)
+        if isinstance(payload, dict) and payload.get("data") == []:
+            return min(ttl, self.empty_ttl)
+        return ttl
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> Any:
+        if not self.cache:
+            response = self.session.get(url, params=params, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+        key = self.cache_key(url, params)
+        entry = self.cache.get(key)
+        payload = None
+        if entry:
+            try:
+                payload = json.loads(entry["body"])
+            except json.JSONDecodeError:
+                # truncated / corrupt body: drop it and fetch again (without its validators)
+                self.cache.delete(key)
+                entry = None
+        fresh = bool(entry) and time.time() - entry["stored_at"] < self.ttl_for(url, payload)
+        if TRACER.enabled:
+            TRACER.record_cache("peeringdb", normalize_endpoint(url), hit=fresh)
+        if fresh:
+            return payload
+
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry:
+            self.cache.touch(key)
+            return payload
+
+        response.raise_for_status()
+        self.cache.put(key, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.json()
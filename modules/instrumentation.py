@@ -0,0 +1,179 @@
+import contextvars
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Any
+from urllib.parse import urlparse
+
+# Latency histogram bucket upper bounds (ms)
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+
+def normalize_endpoint(url: str) -> str:
+    # 'https://nb/api/ipam/ip-addresses/123/?x=1' -> 'ipam/ip-addresses/{id}'
+    path = urlparse(url).path
+    path = re.sub(r"^/api/", "", path).strip("/")
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's context (e.g. the trace phase)."""
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _Stat:
+    __slots__ = ("calls", "errors", "bytes", "cache_hits", "cache_misses", "retries", "latencies", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = 0
+        self.latencies: List[float] = []
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+
+class Tracer:
+    """
+    API call tracing for the NetBox and PeeringDB clients.
+    Aggregates per (service, endpoint, phase): calls, latency histogram, bytes,
+    cache hits and retries. Disabled by default; every hook returns immediately then.
+    The phase is a context variable: threads (batch workers, shards) each tag their own calls,
+    pools created with ContextThreadPoolExecutor inherit the phase of the submitting thread.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.keep_events = False
+        self._lock = threading.Lock()
+        self._phase = contextvars.ContextVar("trace_phase", default="-")
+        self._stats: Dict[tuple, _Stat] = {}
+        self.events: List[Dict[str, Any]] = []
+
+    def enable(self, keep_events: bool = False):
+        self.enabled = True
+        self.keep_events = keep_events
+
+    @contextmanager
+    def phase(self, name: str):
+        # Wizard phase tag (intersection, validation, dry_run, apply...) for everything recorded inside
+        if not self.enabled:
+            yield
+            return
+        token = self._phase.set(name)
+        try:
+            yield
+        finally:
+            self._phase.reset(token)
+
+    def _stat(self, service: str, endpoint: str) -> _Stat:
+        key = (service, endpoint, self._phase.get())
+        stat = self._stats.get(key)
+        if stat is None:
+            stat = self._stats[key] = _Stat()
+        return stat
+
+    def record_call(self, service: str, method: str, url: str, latency: float, nbytes: int, status: int):
+        if not self.enabled:
+            return
+        endpoint = normalize_endpoint(url)
+        latency_ms = latency * 1000
+        with self._lock:
+            stat = self._stat(service, endpoint)
+            stat.calls += 1
+            stat.bytes += nbytes
+            stat.latencies.append(latency_ms)
+            if status >= 400:
+                stat.errors += 1
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if latency_ms <= bound:
+                    stat.buckets[i] += 1
+                    break
+            if self.keep_events:
+                self.events.append({
+                    "ts": time.time(), "service": service, "method": method, "endpoint": endpoint,
+                    "phase": self._phase.get(), "latency_ms": round(latency_ms, 2), "bytes": nbytes,
+                    "status": status, "thread": threading.current_thread().name,
+                })
+
+    def record_cache(self, service: str, endpoint: str, hit: bool):
+        if not self.enabled:
+            return
+        with self._lock:
+            stat = self._stat(service, endpoint)
+            if hit:
+                stat.cache_hits += 1
+            else:
+                stat.cache_misses += 1
+
+    def record_retry(self, service: str, url: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stat(service, normalize_endpoint(url)).retries += 1
+
+    def session_hook(self, service: str):
+        """requests 'response' hook that records every call made through a session."""
+        def hook(response, *args, **kwargs):
+            if self.enabled:
+                self.record_call(service, response.request.method, response.url,
+                                 response.elapsed.total_seconds(), len(response.content or b""), response.status_code)
+            return response
+        return hook
+
+    def instrument_session(self, session, service: str):
+        session.hooks.setdefault("response", []).append(self.session_hook(service))
+        return session
+
+    def summary(self) -> List[Dict[str, Any]]:
+        rows = []
+        with self._lock:
+            for (service, endpoint, phase), stat in sorted(self._stats.items()):
+                ordered = sorted(stat.latencies)
+
+                def pct(p):
+                    return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2) if ordered else 0.0
+
+                rows.append({
+                    "service": service, "endpoint": endpoint, "phase": phase,
+                    "calls": stat.calls, "errors": stat.errors, "bytes": stat.bytes,
+                    "total_ms": round(sum(ordered), 2), "p50_ms": pct(50), "p95_ms": pct(95),
+                    "cache_hits": stat.cache_hits, "cache_misses": stat.cache_misses, "retries": stat.retries,
+                    "histogram": {str(b): n for b, n in zip(LATENCY_BUCKETS_MS, stat.buckets) if n},
+                })
+        return rows
+
+    def write_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"summary": self.summary(), "events": self.events}, fh, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.events.clear()
+
+
+# Process-wide tracer, shared by all clients
+TRACER = Tracer()
+
+
+def print_summary(console, tracer: Optional[Tracer] = None):
+    from rich.table import Table
+
+    tracer = tracer or TRACER
+    table = Table(title="API Call Profile", show_header=True, header_style="bold magenta")
+    for column in ("Service", "Endpoint", "Phase", "Calls", "p50 ms", "p95 ms", "Total ms", "KB", "Cache hit/miss", "Retries"):
+        table.add_column(column, justify="right" if column not in ("Service", "Endpoint", "Phase") else "left")
+
+    for row in tracer.summary():
+        table.add_row(
+            row["service"], row["endpoint"], row["phase"], str(row["calls"]),
+            str(row["p50_ms"]), str(row["p95_ms"]), str(row["total_ms"]), f"{row['bytes'] / 1024:.1f}",
+            f"{row['cache_hits']}/{row['cache_misses']}", str(row["retries"]),
+        )
+    console.print(table)
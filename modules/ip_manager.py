@@ -1,58 +1,211 @@
-from typing import Optional, Dict
+import ipaddress
+from typing import Optional, Dict, List, Iterable, Tuple
+
+import pynetbox
+
+# Candidate parent prefix lengths for the bulk subnet lookup (IXP peering LANs).
+# Anything outside of these falls back to the per-IP 'contains' query.
+PARENT_PREFIX_LENGTHS = {
+    4: range(16, 31),
+    6: (32, 40, 48, 56, 64, 96, 112, 116, 120, 124, 126),
+}
+# Max. number of values in one multi-value filter (keeps the URL length sane)
+FILTER_CHUNK_SIZE = 100
+
+
+def normalize_ip(address: str) -> str:
+    # '2001:7F8:0::1/64' -> '2001:7f8::1'
+    return ipaddress.ip_address(str(address).split('/')[0]).compressed
+
+
+def is_rejected_write(error: Exception) -> bool:
+    """
+    True if NetBox explicitly refused a write (4xx): the batch was rolled back, so the items
+    may be sent again one by one. A timeout or 5xx may follow a commit, replaying it duplicates.
+    """
+    req = getattr(error, "req", None)
+    return isinstance(error, pynetbox.RequestError) and req is not None and 400 <= req.status_code < 500
+
+
+def _chunks(values: List, size: int = FILTER_CHUNK_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
 
 class IPManager:
     """
     Dedicated manager for IP Address operations in NetBox.
     Handles searching, validation, and creation.
     """
-    def __init__(self, nb_client):
+    def __init__(self, nb_client, prefix_index=None):
         self.nb = nb_client.nb
+        self.identity = nb_client.identity_map
+        # Optional PrefixIndex: answers longest-prefix-match locally instead of asking NetBox
+        self.prefix_index = prefix_index
 
     def get_ip_address(self, address: str) -> Optional[object]:
         # Checks if an IP address exists in NetBox IPAM.
-        return self.nb.ipam.ip_addresses.get(address=address)
+        return self.identity.get_or_load(
+            "ipam.ip_addresses", normalize_ip(address),
+            lambda: self.nb.ipam.ip_addresses.get(address=address)
+        )
+
+
+    def get_ip_addresses(self, addresses: Iterable[str]) -> Dict[str, object]:
+        """
+        Bulk version of get_ip_address: one multi-value 'address=' query.
+        Returns {normalized host address: IP object} for the addresses that exist.
+        """
+        wanted = sorted({normalize_ip(a) for a in addresses if a})
+        result, unknown = {}, []
+        for address in wanted:
+            ip_obj = self.identity.get("ipam.ip_addresses", address)
+            if ip_obj is self.identity.MISSING:
+                unknown.append(address)
+            elif ip_obj:
+                result[address] = ip_obj
+
+        for chunk in _chunks(unknown):
+            found = {}
+            for ip_obj in self.nb.ipam.ip_addresses.filter(address=chunk):
+                found.setdefault(normalize_ip(ip_obj.address), ip_obj)
+            # remember the misses as well, the creation will overwrite them
+            self.identity.put_many("ipam.ip_addresses", {address: found.get(address) for address in chunk})
+            result.update(found)
+        return result
 
+    def get_prefixes_for_ips(self, addresses: Iterable[str]) -> Dict[str, object]:
+        """
+        Bulk version of get_prefix_for_ip.
+        Asks for every possible parent network of all addresses with one multi-value 'prefix=' query,
+        then picks the longest match locally. Addresses without a hit are checked one by one.
+        """
+        hosts = {normalize_ip(a): ipaddress.ip_address(normalize_ip(a)) for a in addresses if a}
+        result = {}
+        if self.prefix_index:
+            self.prefix_index.ensure_fresh()
+            for address in list(hosts):
+                parent = self.prefix_index.lookup(address)
+                if parent:
+                    result[address] = parent
+                    del hosts[address]
+
+        candidates = set()
+        # the rest (or everything without an index) with one multi-value query
+        for host in hosts.values():
+            for length in PARENT_PREFIX_LENGTHS[host.version]:
+                candidates.add(str(ipaddress.ip_network(f"{host}/{length}", strict=False)))
+
+        networks = []
+        for chunk in _chunks(sorted(candidates)):
+            for prefix in self.nb.ipam.prefixes.filter(prefix=chunk):
+                networks.append((ipaddress.ip_network(str(prefix.prefix)), prefix))
+
+        for address, host in hosts.items():
+            matches = [(net, p) for net, p in networks if net.version == host.version and host in net]
+            if matches:
+                result[address] = max(matches, key=lambda m: m[0].prefixlen)[1]
+            else:
+                parent = self.get_prefix_for_ip(address)
+                if parent:
+                    result[address] = parent
+        return result
 
     def get_prefix_for_ip(self, ip_address: str) -> Optional[object]:
         # Finds the parent Prefix for a given IP address.
-        prefixes = self.nb.ipam.prefixes.filter(contains=ip_address)
-        # sort by smallest mask size
-        sorted_prefixes = sorted(prefixes, key=lambda p: int(str(p.prefix).split('/')[1]), reverse=True)
-        # Return the longest prefix
-        return sorted_prefixes[0] if sorted_prefixes else None
+        if self.prefix_index:
+            self.prefix_index.ensure_fresh()
+            parent = self.prefix_index.lookup(ip_address)
+            if parent:
+                return parent
+        def load():
+            prefixes = self.nb.ipam.prefixes.filter(contains=ip_address)
+            # sort by smallest mask size
+            sorted_prefixes = sorted(prefixes, key=lambda p: int(str(p.prefix).split('/')[1]), reverse=True)
+            # Return the longest prefix
+            return sorted_prefixes[0] if sorted_prefixes else None
+        return self.identity.get_or_load("ipam.prefixes", normalize_ip(ip_address), load)
 
 
     def get_device_site_from_ip(self, ip_address: str) -> Optional[Dict]:
         # Tries to find the Device and Site associated with a Local IP.
-        ip_obj = self.get_ip_address(ip_address)
-        
+        device_id = self.device_id_of(self.get_ip_address(ip_address))
+        if device_id is None:
+            return None
+        return self.device_context(self.get_device(device_id))
+
+    def get_device(self, device_id: int) -> Optional[object]:
+        return self.identity.get_or_load(
+            "dcim.devices", device_id,
+            lambda: self.nb.dcim.devices.get(id=device_id)
+        )
+
+    @staticmethod
+    def device_id_of(ip_obj) -> Optional[int]:
+        # Device of the interface the IP is assigned to (None for VM interfaces or unassigned IPs)
         if not ip_obj or not ip_obj.assigned_object:
             return None
-            
         interface = ip_obj.assigned_object
-        
-        # Check if it is a Device interface
         if hasattr(interface, 'device'):
-            device = interface.device
-            full_device = self.nb.dcim.devices.get(id=device.id)
-            return {
-                "device_id": full_device.id,
-                "device_name": full_device.name,
-                "site_id": full_device.site.id,
-                "site_name": full_device.site.name
-            }
+            return interface.device.id
         return None
 
-    def create_ip_address(self, address: str, tenant_id: int, description: str = "") -> Optional[object]:
-        #Creates a new IP Address object in NetBox based on company policy.
-        data = {
+    @staticmethod
+    def device_context(full_device) -> Optional[Dict]:
+        if not full_device:
+            return None
+        return {
+            "device_id": full_device.id,
+            "device_name": full_device.name,
+            "site_id": full_device.site.id,
+            "site_name": full_device.site.name
+        }
+
+    @staticmethod
+    def build_ip_payload(address: str, tenant_id: int, description: str = "") -> Dict:
+        # IP Address object based on company policy.
+        return {
             "address": address,
             "status": "active",
             "tenant": tenant_id,
             "description": description,
         }
+
+    def create_ip_address(self, address: str, tenant_id: int, description: str = "") -> Optional[object]:
+        #Creates a new IP Address object in NetBox based on company policy.
+        data = self.build_ip_payload(address, tenant_id, description)
         
         try:
-            return self.nb.ipam.ip_addresses.create(**data)
+            new_ip = self.nb.ipam.ip_addresses.create(**data)
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
+        # write: the cached "not found" answer is no longer true
+        self.identity.put("ipam.ip_addresses", normalize_ip(address), new_ip)
+        return new_ip
+
+    def create_ip_addresses(self, items: List[Tuple[str, int, str]], fallback: bool = True) -> List[Tuple[Optional[object], Optional[Exception]]]:
+        """
+        Bulk version of create_ip_address: one list-body POST for all (address, tenant_id, description).
+        If NetBox rejects the batch (4xx), falls back to one request per item (fallback=False: raises instead);
+        any other error is raised. Returns (IP object, None) or (None, error) per item, in input order.
+        """
+        if not items:
+            return []
+        payloads = [self.build_ip_payload(*item) for item in items]
+        try:
+            created = self.nb.ipam.ip_addresses.create(payloads)
+            results = [(ip_obj, None) for ip_obj in created]
+        except Exception as e:
+            if not fallback or not is_rejected_write(e):
+                raise
+            # NetBox rolled back the whole batch, so it is safe to retry item by item
+            results = []
+            for payload in payloads:
+                try:
+                    results.append((self.nb.ipam.ip_addresses.create(**payload), None))
+                except Exception as e:
+                    results.append((None, e))
+
+        self.identity.put_many("ipam.ip_addresses", {
+            normalize_ip(payload["address"]): ip_obj for payload, (ip_obj, _) in zip(payloads, results) if ip_obj
+        })
+        return results
@@ -0,0 +1,292 @@
+import bz2
+import gzip
+import lzma
+import math
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Set, FrozenSet, Iterable, Iterator, Any
+
+DEFAULT_IRR_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chores-toolbox", "irr_index.sqlite3")
+
+# Bytes of RPSL text handed to one worker (cut at an object boundary)
+CHUNK_SIZE = 32 * 1024 * 1024
+# Suggested limit = prefixes seen in the IRR * HEADROOM (rounded up), at least MIN_LIMIT
+HEADROOM = 1.25
+MIN_LIMIT = 10
+# as-set nesting deeper than this is treated as a loop
+MAX_DEPTH = 200
+
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+_ASN = re.compile(r"^AS(\d+)$")
+_SPLIT = re.compile(r"[\s,]+")
+_INF = float("inf")
+
+
+def _clean_name(name: str) -> str:
+    # 'RIPE::AS-Foo' (PeeringDB source prefix) -> 'AS-FOO'
+    return name.split("::")[-1].strip().upper()
+
+
+def _attributes(block: bytes) -> Iterator[Tuple[str, str]]:
+    # RPSL attribute lines, continuation lines (leading space, tab or '+') joined to their attribute
+    key, value = None, []
+    for line in block.decode("latin-1").splitlines():
+        if not line or line[0] in "%#":
+            continue
+        if line[0] in " \t+":
+            if key:
+                value.append(line[1:])
+            continue
+        if key:
+            yield key, " ".join(value)
+        head, _, rest = line.partition(":")
+        key, value = head.strip().lower(), [rest]
+    if key:
+        yield key, " ".join(value)
+
+
+def parse_rpsl(data: bytes) -> Tuple[List[Tuple[str, str]], List[Tuple[int, int, str]]]:
+    """
+    Parses a run of RPSL objects (separated by blank lines).
+    Returns (as-set, member) pairs and (origin, family, prefix) route entries; other classes are skipped
+    by looking at the first line only. Runs in the worker processes, so it is module level.
+    """
+    members, routes = [], []
+    for block in data.split(b"\n\n"):
+        block = block.lstrip(b"\n")
+        head = block[:8].lower()
+        if head.startswith(b"as-set:"):
+            name = None
+            for key, value in _attributes(block):
+                value = value.split("#", 1)[0]
+                if key == "as-set":
+                    name = _clean_name(value)
+                elif key == "members" and name:
+                    members.extend((name, _clean_name(m)) for m in _SPLIT.split(value) if m)
+        elif head.startswith((b"route:", b"route6:")):
+            prefix, origin = None, None
+            for key, value in _attributes(block):
+                value = value.split("#", 1)[0].strip()
+                if key in ("route", "route6"):
+                    prefix = value.lower()
+                elif key == "origin":
+                    match = _ASN.match(value.upper())
+                    origin = int(match.group(1)) if match else None
+            if prefix and origin is not None:
+                routes.append((origin, 6 if ":" in prefix else 4, prefix))
+    return members, routes
+
+
+def _parse_range(path: str, start: int, end: int):
+    # Uncompressed dumps are read by the worker itself, through mmap (no copy through the pipe)
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return parse_rpsl(mm[start:end])
+
+
+def _parse_bytes(data: bytes):
+    return parse_rpsl(data)
+
+
+class IrrIndex:
+    """
+    Local IRR engine: as-set membership and route/route6 origins from RPSL dumps (RADB, RIPE, ...),
+    kept in a compact SQLite index. Used to suggest prefix limits for peers without PeeringDB limits:
+    the peer's as-set is expanded recursively and the registered prefixes of the member ASNs counted.
+
+    Building streams the dumps (plain files memory-mapped, .gz/.bz2/.xz decompressed on the fly)
+    in object-aligned chunks through a process pool; only 'read_ahead' chunks are in flight at a time.
+    """
+    def __init__(self, path: str = DEFAULT_IRR_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # as-set -> fully expanded member ASNs
+        self._memo: Dict[str, FrozenSet[int]] = {}
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._create_schema(self.db)
+
+    @classmethod
+    def from_env(cls) -> Optional["IrrIndex"]:
+        # Optional: only used once an index has been built (main.py irr-build)
+        path = os.getenv("IRR_INDEX", DEFAULT_IRR_INDEX_PATH)
+        return cls(path) if os.path.exists(path) else None
+
+    @staticmethod
+    def _create_schema(db: sqlite3.Connection):
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS members (as_set TEXT NOT NULL, member TEXT NOT NULL,"
+                       " PRIMARY KEY (as_set, member)) WITHOUT ROWID")
+            db.execute("CREATE TABLE IF NOT EXISTS routes (origin INTEGER NOT NULL, family INTEGER NOT NULL,"
+                       " prefix TEXT NOT NULL, PRIMARY KEY (origin, family, prefix)) WITHOUT ROWID")
+
+    # --- Building ---
+
+    @staticmethod
+    def _chunks(path: str) -> Iterator[Tuple[Any, tuple]]:
+        """(function, args) parse tasks for one dump, every chunk ends at an object boundary."""
+        opener = _OPENERS.get(os.path.splitext(path)[1])
+        if opener is None:
+            size = os.path.getsize(path)
+            if not size:
+                return
+            with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                while start < size:
+                    cut = mm.find(b"\n\n", min(start + CHUNK_SIZE, size))
+                    end = size if cut < 0 else cut + 2
+                    yield _parse_range, (path, start, end)
+                    start = end
+            return
+
+        with opener(path, "rb") as fh:
+            tail = b""
+            while True:
+                data = fh.read(CHUNK_SIZE)
+                if not data:
+                    break
+                data = tail + data
+                cut = data.rfind(b"\n\n")
+                if cut < 0:
+                    tail = data
+                    continue
+                tail = data[cut + 2:]
+                yield _parse_bytes, (data[:cut + 2],)
+            if tail:
+                yield _parse_bytes, (tail,)
+
+    def build(self, paths: Iterable[str], workers: Optional[int] = None, read_ahead: Optional[int] = None,
+              on_chunk=None) -> Dict[str, int]:
+        """
+        (Re)builds the index from RPSL dumps. Written to a side file and swapped in at the end,
+        so readers (other operators) never see a half-built index.
+        'on_chunk(members, routes)' is called after each parsed chunk.
+        """
+        workers = workers or os.cpu_count() or 1
+        read_ahead = max(read_ahead or 2 * workers, 1)
+        building = f"{self.path}.building"
+        if os.path.exists(building):
+            os.remove(building)
+        db = sqlite3.connect(building)
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        self._create_schema(db)
+
+        counts = {"chunks": 0, "members": 0, "routes": 0}
+
+        def store(result):
+            members, routes = result
+            with db:
+                db.executemany("INSERT OR IGNORE INTO members (as_set, member) VALUES (?, ?)", members)
+                db.executemany("INSERT OR IGNORE INTO routes (origin, family, prefix) VALUES (?, ?, ?)", routes)
+            counts["chunks"] += 1
+            counts["members"] += len(members)
+            counts["routes"] += len(routes)
+            if on_chunk:
+                on_chunk(len(members), len(routes))
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for path in paths:
+                    for func, args in self._chunks(path):
+                        pending.append(executor.submit(func, *args))
+                        if len(pending) >= read_ahead:
+                            store(pending.popleft().result())
+                while pending:
+                    store(pending.popleft().result())
+        finally:
+            db.close()
+
+        with self._lock:
+            self.db.close()
+            os.replace(building, self.path)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self._memo.clear()
+        return counts
+
+    # --- Lookups ---
+
+    def _members(self, as_set: str) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self.db.execute("SELECT member FROM members WHERE as_set = ?", (as_set,))]
+
+    def _expand(self, name: str, active: Dict[str, int]) -> Tuple[FrozenSet[int], float]:
+        # DFS; returns (ASNs, lowest depth of an as-set on the current path that was referenced again).
+        # A set is memoized only if no loop through its ancestors cut its expansion short.
+        memo = self._memo.get(name)
+        if memo is not None:
+            return memo, _INF
+        if name in active:
+            return frozenset(), active[name]
+        if len(active) >= MAX_DEPTH:
+            return frozenset(), 0
+        depth = active[name] = len(active)
+        asns: Set[int] = set()
+        low = _INF
+        for member in self._members(name):
+            match = _ASN.match(member)
+            if match:
+                asns.add(int(match.group(1)))
+            else:
+                sub, sub_low = self._expand(member, active)
+                asns |= sub
+                low = min(low, sub_low)
+        del active[name]
+        result = frozenset(asns)
+        if low >= depth:
+            self._memo[name] = result
+        return result, low
+
+    def expand(self, as_set: str) -> FrozenSet[int]:
+        """All member ASNs of an as-set (or of 'AS123' itself), nested sets resolved, loops ignored."""
+        name = _clean_name(as_set or "")
+        if not name:
+            return frozenset()
+        match = _ASN.match(name)
+        if match:
+            return frozenset({int(match.group(1))})
+        return self._expand(name, {})[0]
+
+    def prefix_counts(self, asns: Iterable[int]) -> Tuple[int, int]:
+        """Distinct registered (IPv4, IPv6) prefixes originated by the ASNs."""
+        asns = sorted(set(asns))
+        if not asns:
+            return 0, 0
+        with self._lock, self.db:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (asn INTEGER PRIMARY KEY)")
+            self.db.execute("DELETE FROM wanted")
+            self.db.executemany("INSERT INTO wanted (asn) VALUES (?)", ((a,) for a in asns))
+            counts = dict(self.db.execute(
+                "SELECT family, COUNT(DISTINCT prefix) FROM routes JOIN wanted ON routes.origin = wanted.asn"
+                " GROUP BY family"
+            ).fetchall())
+        return counts.get(4, 0), counts.get(6, 0)
+
+    @staticmethod
+    def _limit(count: int) -> int:
+        return max(math.ceil(count * HEADROOM), MIN_LIMIT) if count else 0
+
+    def suggest_limits(self, as_set_v4: Optional[str], as_set_v6: Optional[str], asn: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Suggested (IPv4, IPv6) prefix limits: the prefixes registered for the as-set members
+        (and the peer's own ASN) plus headroom. 0 where the IRR knows nothing.
+        """
+        own = {asn} if asn else set()
+        v4, _ = self.prefix_counts(self.expand(as_set_v4) | own)
+        _, v6 = self.prefix_counts(self.expand(as_set_v6) | own)
+        return self._limit(v4), self._limit(v6)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sets = self.db.execute("SELECT COUNT(DISTINCT as_set) FROM members").fetchone()[0]
+            routes = self.db.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+        return {"as_sets": sets, "routes": routes}
+
+    def close(self):
+        self.db.close()
@@ -1,6 +1,12 @@
+import asyncio
+import logging
+import os
 import time
 import re
+import threading
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.table import Table
@@ -8,10 +14,20 @@ from rich.markup import escape
 from rich import print
 
 from modules.peeringdb_client import PeeringDBClient
-from modules.netbox_client import NetBoxClient
-from modules.ip_manager import IPManager
+from modules.peeringdb_mirror import PeeringDBMirror
+from modules.netbox_client import get_shared_client
+from modules.ip_manager import IPManager, normalize_ip, is_rejected_write, FILTER_CHUNK_SIZE
 from modules.bgp_manager import BGPManager
-from modules.utils import get_validated_prefix_limits, select_tenant
+from modules.async_clients import AsyncIPManager
+from modules.apply_executor import ApplyExecutor
+from modules.prefix_index import PrefixIndex
+from modules.tenant_index import TenantIndex, AsnTenantMap
+from modules.port_inventory import LocalPortInventory
+from modules.irr_index import IrrIndex
+from modules.request_scheduler import TransientError
+from modules.instrumentation import TRACER, ContextThreadPoolExecutor
+from modules.live_table import LiveTable
+from modules.utils import get_validated_prefix_limits, select_tenant, select_as_set
 from modules.base_peering import BasePeeringController
 from modules.base_tool import BaseTool
 from modules.strategies import StrictAlphanumericStrategy, UnderscoreStrategy
@@ -19,9 +35,12 @@ from modules.strategies import StrictAlphanumericStrategy, UnderscoreStrategy
 # Configuration
 MY_ASN = 5405
 PEER_GROUP_NAME = "Peering - IXP"
+# Remote IPs validated in the first (progressively displayed) chunk
+FIRST_CHUNK_SIZE = 10
 
+log = logging.getLogger(__name__)
 console = Console(emoji=False) 
-pdb_client = PeeringDBClient()
+pdb_client = PeeringDBClient(mirror=PeeringDBMirror.from_env())
 
 
 class IxpPeeringController(BasePeeringController):
@@ -30,13 +49,355 @@ class IxpPeeringController(BasePeeringController):
     Örökli a szerszámokat, és hozzáteszi az IXP-specifikus tudást.
     """
 
+    # Upper bound for one PeeringDB fan-out (the HTTP calls have their own 10s timeout)
+    FETCH_TIMEOUT = 30
+
     def fetch_common_ixps(self, target_asn: int):
         self.target_asn = target_asn
         # Figyeld meg: a 'pdb'-t nem paraméterként kapja, hanem előveszi a táskájából (self)!
-        target_ixps = self.pdb.get_ixp_presence(target_asn)
-        my_ixps = self.pdb.get_ixp_presence(MY_ASN)
+        # The two presence lists are independent, so they are fetched in parallel.
+        # Our own footprint comes from the process-wide TTL cache of pdb_client (usually no call at all).
+        results = self._fetch_concurrently({
+            "target": (self.pdb.get_ixp_presence, target_asn),
+            "mine": (self.pdb.get_ixp_presence_map, MY_ASN),
+        })
+        return self._intersect(results["target"], results["mine"])
+
+    def fetch_peer_overview(self, target_asn: int):
+        """
+        Fetches the ASN details and both IXP presence lists at the same time.
+        Returns (net_info, common_ixps); common_ixps is empty if the ASN is unknown.
+        """
+        self.target_asn = target_asn
+        results = self._fetch_concurrently({
+            "net": (self.pdb.get_asn_details, target_asn),
+            "target": (self.pdb.get_ixp_presence, target_asn),
+            "mine": (self.pdb.get_ixp_presence_map, MY_ASN),
+        }, stop_if_empty="net")
+
+        if not results.get("net"):
+            return None, []
+        return results["net"], self._intersect(results["target"], results["mine"])
+
+    def _fetch_concurrently(self, calls, stop_if_empty=None):
+        # Runs {key: (func, arg)} in a thread pool. If the 'stop_if_empty' call returns nothing,
+        # the rest is cancelled, there is no point in waiting for them.
+        executor = ContextThreadPoolExecutor(max_workers=len(calls))
+        futures = {executor.submit(func, arg): key for key, (func, arg) in calls.items()}
+        results = {}
+        try:
+            for future in as_completed(futures, timeout=self.FETCH_TIMEOUT):
+                key = futures[future]
+                results[key] = future.result()
+                if key == stop_if_empty and not results[key]:
+                    break
+            return results
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def remote_ips(selected_ixps):
+        """(IXP, remote IP) pairs to validate, in display order."""
+        return [(ix_data, ip) for ix_data in selected_ixps
+                for ip in [ix_data['remote_ip4'], ix_data['remote_ip6']] if ip]
+
+    def validate_resources(self, selected_ixps, ip_mgr, bgp_mgr, on_row=None):
+        """
+        Checks every remote IP of the selected IXPs against NetBox in bulk:
+        one query for the IPs, then (in parallel) one for their sessions and one for the parents
+        of the missing IPs, per FILTER_CHUNK_SIZE IPs; the chunks run concurrently.
+        Returns one dict per remote IP (same layout the wizard used before).
+        'on_row(index, row)' is called whenever a row learns something: after the IP query
+        ('bgp_exists' / 'has_subnet' still None = unknown), and again when it is complete.
+        """
+        candidates = self.remote_ips(selected_ixps)
+        results = [{'data': ix_data, 'ip_obj': None, 'ip_str': ip, 'exists': None,
+                    'bgp_exists': None, 'has_subnet': None} for ix_data, ip in candidates]
+
+        def notify(indices):
+            if on_row:
+                for i in indices:
+                    on_row(i, results[i])
+
+        def check_chunk(indices):
+            ip_objs = ip_mgr.get_ip_addresses(results[i]['ip_str'] for i in indices)
+            found = [i for i in indices if normalize_ip(results[i]['ip_str']) in ip_objs]
+            missing = [i for i in indices if normalize_ip(results[i]['ip_str']) not in ip_objs]
+            for i in indices:
+                nb_ip = ip_objs.get(normalize_ip(results[i]['ip_str']))
+                results[i].update(ip_obj=nb_ip, exists=bool(nb_ip))
+                if nb_ip:
+                    results[i]['has_subnet'] = True
+                else:
+                    results[i]['bgp_exists'] = False
+            notify(indices)
+            first_answer.set()
+
+            def sessions():
+                by_ip = bgp_mgr.get_sessions_by_ip_ids(results[i]['ip_obj'].id for i in found)
+                for i in found:
+                    results[i]['bgp_exists'] = results[i]['ip_obj'].id in by_ip
+                notify(found)
+
+            def parents():
+                by_host = ip_mgr.get_prefixes_for_ips(results[i]['ip_str'] for i in missing)
+                for i in missing:
+                    results[i]['has_subnet'] = normalize_ip(results[i]['ip_str']) in by_host
+                notify(missing)
+
+            stages = [stage for stage, rows in ((sessions, found), (parents, missing)) if rows]
+            if len(stages) == 2:
+                with ContextThreadPoolExecutor(max_workers=2) as pool:
+                    for future in [pool.submit(stage) for stage in stages]:
+                        future.result()
+            elif stages:
+                stages[0]()
+
+        # above one chunk a small first one: the first rows are known after one short round trip
+        first = FIRST_CHUNK_SIZE if len(results) > FILTER_CHUNK_SIZE else len(results)
+        bounds = [0] + list(range(first, len(results), FILTER_CHUNK_SIZE)) + [len(results)]
+        chunks = [list(range(start, end)) for start, end in zip(bounds, bounds[1:]) if end > start]
+        first_answer = threading.Event()
+        if len(chunks) > 1:
+            with ContextThreadPoolExecutor(max_workers=min(len(chunks), 4)) as pool:
+                futures = [pool.submit(check_chunk, chunks[0])]
+                # the big chunks would slow the first answer down, they start once it is in
+                while not first_answer.wait(0.05) and not futures[0].done():
+                    pass
+                futures += [pool.submit(check_chunk, chunk) for chunk in chunks[1:]]
+                for future in futures:
+                    future.result()
+        elif chunks:
+            check_chunk(chunks[0])
+        return results
+
+    def plan_sessions(self, actionable_sessions, net_info, tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+                      limit_v4: int, limit_v6: int, ip_mgr, port_inventory=None, on_session=None):
+        """
+        Dry Run: calculates the final parameters of every actionable session
+        (limits, AS-SET, names, local device/site and mask). Nothing is written to NetBox.
+        Sync wrapper around plan_sessions_async.
+        """
+        return asyncio.run(self.plan_sessions_async(
+            actionable_sessions, net_info, tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+            limit_v4, limit_v6, ip_mgr, port_inventory, on_session
+        ))
+
+    async def plan_sessions_async(self, actionable_sessions, net_info, tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+                                  limit_v4: int, limit_v6: int, ip_mgr, port_inventory=None, on_session=None):
+        """
+        Local context of every session: from the LocalPortInventory when it knows our port on the IXP
+        (no NetBox read at all), otherwise resolved concurrently: the local IPs with one bulk query,
+        then every distinct device at the same time.
+        'on_session(index, prepared)' is called as soon as a session is planned (inventory hits first).
+        """
+        # (local ip) -> (device/site context, local IP id, prefix length)
+        local_by_ip = {}
+        prepared = [None] * len(actionable_sessions)
+
+        def prepare(i):
+            session = actionable_sessions[i]
+            prepared[i] = self._prepare_session(session, net_info, tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+                                                limit_v4, limit_v6,
+                                                *local_by_ip.get(self._local_ip(session), (None, None, None)))
+            if on_session:
+                on_session(i, prepared[i])
+
+        if port_inventory:
+            await asyncio.to_thread(port_inventory.ensure_fresh)
+            for session in actionable_sessions:
+                local_ip = self._local_ip(session)
+                port = local_ip and port_inventory.get(session['data']['ix_id'], 6 if ':' in local_ip else 4, local_ip)
+                if port:
+                    local_by_ip[local_ip] = (port.context(), port.ip_id, port.prefixlen)
+
+        # local ip -> sessions waiting for it
+        waiting = {}
+        for i, session in enumerate(actionable_sessions):
+            local_ip = self._local_ip(session)
+            if local_ip and local_ip not in local_by_ip:
+                waiting.setdefault(local_ip, []).append(i)
+            else:
+                prepare(i)
+
+        if waiting:
+            aio_ip = AsyncIPManager(ip_mgr)
+            await aio_ip.get_ip_addresses(sorted(waiting))
+
+            async def resolve(local_ip):
+                local_ctx = await aio_ip.get_device_site_from_ip(local_ip)
+                local_ip_obj = ip_mgr.get_ip_address(local_ip)
+                if local_ctx and local_ip_obj:
+                    local_by_ip[local_ip] = (local_ctx, local_ip_obj.id, int(str(local_ip_obj.address).split('/')[-1]))
+                for i in waiting[local_ip]:
+                    prepare(i)
+
+            await asyncio.gather(*(resolve(local_ip) for local_ip in sorted(waiting)))
+
+        return prepared
+
+    @staticmethod
+    def _local_ip(session):
+        data = session['data']
+        return data['local_ip6'] if ':' in session['ip_str'] else data['local_ip4']
+
+    def _prepare_session(self, session, net_info, tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+                         limit_v4, limit_v6, local_ctx, local_ip_id, local_prefixlen):
+        data = session['data']
+        ip_str = session['ip_str']
+        
+        # 1. Determine IP Version and Limits
+        is_v6 = ':' in ip_str
+        addr_family = "6u" if is_v6 else "4u"
+        prefix_limit = limit_v6 if is_v6 else limit_v4
+        
+        # 2. AS-SET Selection logic
+        final_as_set = select_as_set(net_info.get('irr_as_set'), is_v6)
+        
+        # 3. Name Sanitization
+        raw_name = tenant.name
+        strategy = StrictAlphanumericStrategy()
+        clean_name = strategy.sanitize(raw_name)
+        
+        # 4. Description & Session Name Generation
+        session_name = raw_name 
+        bgp_desc = f"[peer_type=peer_ixp,peer_as={self.target_asn},peer_name={clean_name}]"
+        ip_desc = f"{tenant.name} - {data['ix_name']}"
+
+        # 5. Local Context & Mask (resolved by the caller)
+        target_ip_with_cidr = ip_str 
+        site_name = "[red]???[/red]"
+        device_name = "[red]???[/red]"
+        ready_to_deploy = False
+
+        if local_ip_id and local_ctx:
+            target_ip_with_cidr = f"{ip_str}/{local_prefixlen}"
+            site_name = local_ctx['site_name']
+            device_name = local_ctx['device_name']
+            ready_to_deploy = True
+    
+        # Store everything in a prepared dict
+        return {
+            'original_data': session,
+            'is_v6': is_v6,
+            'target_ip_with_cidr': target_ip_with_cidr,
+            'site_name': site_name,
+            'device_name': device_name,
+            'local_ctx': local_ctx,           
+            'local_ip_id': local_ip_id,
+            # Store ID context
+            'my_asn_id': my_asn_obj.id,
+            'peer_asn_id': peer_asn_obj.id,
+            'peer_group_id': peer_group_id,
+            'tenant_id': tenant.id,
+            
+            'prefix_limit': int(prefix_limit),
+            'as_set': final_as_set,
+            'addr_family': addr_family,
+            'session_name': session_name,
+            'bgp_desc': bgp_desc,
+            'ip_desc': ip_desc,
+            'ready': ready_to_deploy
+        }
+
+    def apply_sessions(self, deployable_sessions, ip_mgr, bgp_mgr, sync_pdb: bool, md5_key: str,
+                       executor=None, on_result=None):
+        """
+        Creates the planned changes with two bulk writes: all missing remote IPs, then all sessions.
+        If a bulk write is rejected (4xx, NetBox rolls it back), the items not done yet are applied one by one,
+        in parallel by 'executor' (ApplyExecutor): remote IP, then session within each item. Any other bulk
+        failure (timeout, 5xx) may have been committed: its items are reported failed, never replayed.
+        'on_result(result)' is called as each item is finished.
+        Returns one result dict per planned item:
+        {'item', 'ip_obj', 'ip_created', 'ip_error', 'session', 'session_error'}
+        """
+        executor = executor or ApplyExecutor()
+        results = [{'item': item, 'ip_obj': item['original_data']['ip_obj'], 'ip_created': False,
+                    'ip_error': None, 'session': None, 'session_error': None}
+                   for item in deployable_sessions]
+
+        def ip_args(r):
+            return r['item']['target_ip_with_cidr'], r['item']['tenant_id'], r['item']['ip_desc']
+
+        def session_kwargs(r):
+            return dict(
+                name=r['item']['session_name'],
+                site_id=r['item']['local_ctx']['site_id'],
+                device_id=r['item']['local_ctx']['device_id'],
+                tenant_id=r['item']['tenant_id'],
+                local_ip_id=r['item']['local_ip_id'],
+                remote_ip_id=r['ip_obj'].id,
+                local_as_id=r['item']['my_asn_id'],
+                remote_as_id=r['item']['peer_asn_id'],
+                peer_group_id=r['item']['peer_group_id'],
+                address_family=r['item']['addr_family'],
+                as_set=r['item']['as_set'],
+                prefix_limit=r['item']['prefix_limit'],
+                sync_pdb=sync_pdb,
+                md5_key=md5_key,
+                description=r['item']['bgp_desc']
+            )
+
+        def set_ip(r, new_ip, error):
+            r['ip_obj'], r['ip_created'], r['ip_error'] = new_ip, bool(new_ip), error
+            if new_ip:
+                r['item']['original_data']['ip_obj'] = new_ip
+
+        pending = results
+        stage = "ip"
+        try:
+            # 1. Remote IPs (only the missing ones)
+            needs_ip = [r for r in results if not r['ip_obj']]
+            for r, (new_ip, error) in zip(needs_ip, ip_mgr.create_ip_addresses([ip_args(r) for r in needs_ip], fallback=False)):
+                set_ip(r, new_ip, error)
+            pending = [r for r in results if r['ip_obj']]
+
+            # 2. BGP Sessions, mapped to the (new) remote IP IDs
+            stage = "session"
+            for r, (bgp_s, error) in zip(pending, bgp_mgr.create_bgp_sessions([session_kwargs(r) for r in pending], fallback=False)):
+                r['session'], r['session_error'] = bgp_s, error
+            pending = []
+        except Exception as e:
+            if is_rejected_write(e):
+                # NetBox rolled the batch back: the rest item by item, items in parallel
+                log.warning("Bulk %s create rejected, applying item by item: %s", stage, e)
+            else:
+                # timeout / 5xx: the batch may be committed, replaying it would create duplicates
+                log.warning("Bulk %s create failed, outcome unknown, not retried: %s", stage, e)
+                if stage == "ip":
+                    for r in pending:
+                        if not r['ip_obj']:
+                            set_ip(r, None, e)
+                    # sessions of the items with an existing IP were not sent yet
+                    pending = [r for r in pending if r['ip_obj']]
+                else:
+                    for r in pending:
+                        r['session_error'] = e
+                    pending = []
 
-        my_ixps_map = {ix['ix_id']: ix for ix in my_ixps}
+        def chain(r):
+            if not r['ip_obj']:
+                try:
+                    set_ip(r, executor.call(ip_mgr.create_ip_address, *ip_args(r)), None)
+                except Exception as e:
+                    set_ip(r, None, e)
+                    return r
+            try:
+                r['session'] = executor.call(bgp_mgr.create_bgp_session, **session_kwargs(r))
+            except Exception as e:
+                r['session_error'] = e
+            return r
+
+        if on_result:
+            pending_ids = {id(r) for r in pending}
+            for r in results:
+                if id(r) not in pending_ids:
+                    on_result(r)
+        executor.map(chain, pending, on_result=lambda r, _: on_result(r) if on_result else None)
+        return results
+
+    @staticmethod
+    def _intersect(target_ixps, my_ixps_map):
         common_list = []
         
         for remote_ix in target_ixps:
@@ -72,16 +433,88 @@ def display_asn_details(net_info):
     
     console.print(Panel(grid, title=f"AS{net_info.get('asn')} Details", border_style="green"))
 
+PENDING = "[dim]⏳[/dim]"
+
+
+def status_cells(session):
+    # one validation row; None = that lookup has not answered yet
+    if session['exists'] is None:
+        ip_status = bgp_status = PENDING
+    elif session['exists']:
+        ip_status = "[green]✅ Found[/green]"
+        if session['bgp_exists'] is None:
+            bgp_status = PENDING
+        elif session['bgp_exists']:
+            bgp_status = f"[green]✅ Found[/green]"
+        else:
+            bgp_status = "[yellow]⚠️ Missing[/yellow]"
+    else:
+        bgp_status = "[dim]-[/dim]"
+        if session['has_subnet'] is None:
+            ip_status = PENDING
+        elif session['has_subnet']:
+            ip_status = "[yellow]⚠️ Missing[/yellow]"
+        else:
+            ip_status = "[bold red]❌ No subnet![/bold red]"
+    return escape(session['data']['ix_name']), session['ip_str'], ip_status, bgp_status
+
+
+def preview_cells(item, md5_password):
+    # one dry run row
+    loc_info = f"{item['target_ip_with_cidr']}\n[dim]on {item['device_name']}[/dim]"
+    return (escape(item['original_data']['data']['ix_name']), loc_info, str(item['prefix_limit']),
+            item['as_set'], "Yes" if md5_password else "-")
+
+
 # beginning of the wizard
 class IxpPeeringTool(BaseTool):
 
+    def __init__(self):
+        # Kept between menu iterations, rebuilt by its own refresh policy
+        self._prefix_index = None
+        self._tenant_index = None
+        self._port_inventory = None
+        self._irr_index = None
+        # Persisted ASN -> tenant choices
+        self._asn_tenants = AsnTenantMap.from_env()
+
+    def get_prefix_index(self, nb_client):
+        # Local LPM index of the IXP LAN prefixes, only if a role or tag scope is configured
+        role = os.getenv("NETBOX_IXP_PREFIX_ROLE")
+        tag = os.getenv("NETBOX_IXP_PREFIX_TAG")
+        if not role and not tag:
+            return None
+        if self._prefix_index is None:
+            self._prefix_index = PrefixIndex(nb_client, role=role, tag=tag)
+        return self._prefix_index
+
+    def get_tenant_index(self, nb_client):
+        # Local fuzzy tenant search, loaded on the first tenant lookup
+        if self._tenant_index is None:
+            self._tenant_index = TenantIndex(nb_client)
+        return self._tenant_index
+
+    def get_port_inventory(self, nb_client):
+        # Our IXP ports (local IP, device, site, mask), persisted between runs
+        if self._port_inventory is None:
+            self._port_inventory = LocalPortInventory.from_env(nb_client, pdb_client, MY_ASN)
+        return self._port_inventory
+
+    def get_irr_index(self):
+        # Local IRR index for missing prefix limits, only once it has been built (main.py irr-build)
+        if self._irr_index is None:
+            self._irr_index = IrrIndex.from_env()
+        return self._irr_index
+
     @property
     def name(self):
         return "Create Peering at IXP"
 
     def run(self):
         # Inicializálás
-        nb_client = NetBoxClient()
+        # The client is reused between menu iterations, only the per-run object cache starts empty
+        nb_client = get_shared_client()
+        nb_client.identity_map.reset()
         
         # ITT A LÉNYEG: Létrehozzuk a "Szakembert" (Controller)
         controller = IxpPeeringController(nb_client, pdb_client)
@@ -98,19 +531,31 @@ class IxpPeeringTool(BaseTool):
             time.sleep(1.5)
             return
 
-        net_info = pdb_client.get_asn_details(target_asn)
+        # ITT HÍVJUK MEG A CONTROLLERT (és a View rajzolja a spinnert)
+        # ASN details and both IXP lists are fetched in parallel: ~one round trip instead of three
+        with console.status(f"[bold green]Fetching PeeringDB data & calculating intersection...[/bold green]", spinner="dots"), \
+                TRACER.phase("intersection"):
+            # A Controller dolgozik, a View vár
+            try:
+                net_info, common_ixps = controller.fetch_peer_overview(target_asn)
+            except FuturesTimeoutError:
+                net_info, common_ixps = None, None
+            except TransientError as e:
+                # rate limited / unavailable: the ASN may well exist, do not say "not found"
+                console.print(f"[bold red]❌ PeeringDB/NetBox temporarily unavailable ({escape(str(e))}), try again later.[/bold red]")
+                input("Press Enter...")
+                return
+
+        if common_ixps is None:
+            console.print(f"[bold red]❌ PeeringDB did not answer in {controller.FETCH_TIMEOUT}s, try again later.[/bold red]")
+            input("Press Enter...")
+            return
+
         if not net_info:
             console.print(f"[bold red]❌ ASN {target_asn} not found in PeeringDB![/bold red]")
             input("Press Enter...")
             return
 
-        # ITT HÍVJUK MEG A CONTROLLERT (és a View rajzolja a spinnert)
-        common_ixps = []
-        with console.status(f"[bold green]Calculating intersection...[/bold green]", spinner="dots"):
-            # A Controller dolgozik, a View vár
-            common_ixps = controller.fetch_common_ixps(target_asn)
-            time.sleep(0.5) 
-
         # Show Details
         display_asn_details(net_info)
 
@@ -124,18 +569,17 @@ class IxpPeeringTool(BaseTool):
         console.print(f"\n[bold cyan]=== SELECT IXP SESSION(S) ===[/bold cyan]")
         console.print(f"Found [bold]{len(common_ixps)}[/bold] common exchange points.\n")
 
-        table = Table(show_header=True, header_style="bold cyan")
-        table.add_column("#", style="dim", width=4)
-        table.add_column("IXP Name")
-        table.add_column("IPv4 Pair", style="green")
-        table.add_column("IPv6 Pair", style="green")
+        # paged: with hundreds of IXPs only one screen is rendered at a time
+        table = LiveTable([("#", {"style": "dim", "width": 4}), ("IXP Name", {}),
+                           ("IPv4 Pair", {"style": "green"}), ("IPv6 Pair", {"style": "green"})],
+                          show_header=True, header_style="bold cyan")
 
         for idx, item in enumerate(common_ixps, 1):
             v4 = f"{item['local_ip4']} -> {item['remote_ip4']}" if item['local_ip4'] and item['remote_ip4'] else "[dim]N/A[/dim]"
             v6 = f"{item['local_ip6']} -> {item['remote_ip6']}" if item['local_ip6'] and item['remote_ip6'] else "[dim]N/A[/dim]"
             table.add_row(str(idx), escape(item['ix_name']), v4, v6)
 
-        console.print(table)
+        table.print(console)
         
         # 3. Selection
         console.print("\n[dim]Enter numbers (e.g. '1,3,5') or 'all'.[/dim]")
@@ -156,62 +600,34 @@ class IxpPeeringTool(BaseTool):
             return
 
         # extract and fix prefix-limits
-        final_limit_v4, final_limit_v6 = get_validated_prefix_limits(net_info)
+        final_limit_v4, final_limit_v6, limit_sources = get_validated_prefix_limits(net_info, self.get_irr_index())
 
         # 4. NetBox Validation
         console.print(f"\n[bold cyan]=== VALIDATING RESOURCES FROM NETBOX===[/bold cyan]")
         
         # A klienst már fent létrehoztuk, nem kell újra
-        ip_mgr = IPManager(nb_client)
+        ip_mgr = IPManager(nb_client, prefix_index=self.get_prefix_index(nb_client))
         bgp_mgr = BGPManager(nb_client)
         
         console.print("[dim]ℹ️  Note: 'Missing IP' is normal; the script will create it for you.\n    However, if the [bold]Subnet[/bold] itself is missing, you must create it manually in NetBox first.[/dim]\n")
         
-        valid_sessions = []
-        status_table = Table(show_header=True, header_style="bold white")
-        status_table.add_column("IXP")
-        status_table.add_column("Remote IP")
-        status_table.add_column("IP Status", style="bold")
-        status_table.add_column("BGP Session", style="bold")
-        
-        for idx in selected_indices:
-            ix_data = common_ixps[idx - 1]
-            
-            ips_to_check = [ip for ip in [ix_data['remote_ip4'], ix_data['remote_ip6']] if ip]
-            
-            for ip in ips_to_check:
-                nb_ip = ip_mgr.get_ip_address(ip)
-                bgp_exists = False
-                has_subnet = False
-                
-                if nb_ip:
-                    ip_status = "[green]✅ Found[/green]"
-                    has_subnet = True
-                    if bgp_mgr.get_session_by_ip(ip):
-                        bgp_status = f"[green]✅ Found[/green]"
-                        bgp_exists = True
-                    else:
-                        bgp_status = "[yellow]⚠️ Missing[/yellow]"
-                else:
-                    bgp_status = "[dim]-[/dim]"
-                    if ip_mgr.get_prefix_for_ip(ip):
-                        ip_status = "[yellow]⚠️ Missing[/yellow]"
-                        has_subnet = True
-                    else:
-                        ip_status = "[bold red]❌ No subnet![/bold red]"
-                        has_subnet = False
-                valid_sessions.append({
-                    'data': ix_data, 
-                    'ip_obj': nb_ip, 
-                    'ip_str': ip, 
-                    'exists': bool(nb_ip), 
-                    'bgp_exists': bgp_exists,
-                    'has_subnet': has_subnet
-                })
-                
-                status_table.add_row(escape(ix_data['ix_name']), ip, ip_status, bgp_status)
+        status_table = LiveTable([("IXP", {}), ("Remote IP", {}), ("IP Status", {"style": "bold"}),
+                                  ("BGP Session", {"style": "bold"})], show_header=True, header_style="bold white")
+
+        selected_ixps = [common_ixps[idx - 1] for idx in selected_indices]
+        # every row is shown right away and filled in as its lookups answer
+        for ix_data, ip in controller.remote_ips(selected_ixps):
+            status_table.add_row(escape(ix_data['ix_name']), ip, PENDING, PENDING, pending=True)
+
+        def on_row(index, session):
+            complete = session['bgp_exists'] is not None and session['has_subnet'] is not None
+            status_table.update_row(index, *status_cells(session), pending=not complete)
+
+        with Live(status_table, console=console, refresh_per_second=8, transient=True), \
+                TRACER.phase("validation"):
+            valid_sessions = controller.validate_resources(selected_ixps, ip_mgr, bgp_mgr, on_row=on_row)
 
-        console.print(status_table)
+        status_table.print(console)
 
         # build the final session list
         actionable_sessions = [s for s in valid_sessions if not s['bgp_exists'] and s['has_subnet']]
@@ -222,7 +638,14 @@ class IxpPeeringTool(BaseTool):
 
         # 5. Tenant checking and assignment
         console.print(f"\n[bold cyan]=== TENANT ASSIGNMENT ===[/bold cyan]")
-        selected_tenant = select_tenant(nb_client, net_info.get('name'))
+        with TRACER.phase("tenant"):
+            selected_tenant = select_tenant(nb_client, net_info.get('name'), self.get_tenant_index(nb_client),
+                                            target_asn, self._asn_tenants)
+
+        if not selected_tenant:
+            console.print("[dim]Aborted.[/dim]")
+            input("Press Enter...")
+            return
 
         console.print(f"[bold green]🔒 Selected: {escape(selected_tenant.name)}[/bold green]")
 
@@ -232,7 +655,8 @@ class IxpPeeringTool(BaseTool):
         peer_asn_obj = None
         
         while not peer_asn_obj:
-            peer_asn_obj = nb_client.get_asn_for_tenant(target_asn, selected_tenant.id)
+            with TRACER.phase("preflight"):
+                peer_asn_obj = nb_client.get_asn_for_tenant(target_asn, selected_tenant.id)
             
             if peer_asn_obj:
                 console.print(f"[green]✅ Remote AS exists in NetBox: {target_asn} (NB ID: {peer_asn_obj.id})[/green]")
@@ -246,8 +670,9 @@ class IxpPeeringTool(BaseTool):
                 console.print("[dim]Aborted by user.[/dim]")
                 return
         
-        console.print(f"[green]IPv4 Limit: {final_limit_v4} (from PeeringDB)[green]")
-        console.print(f"[green]IPv6 Limit: {final_limit_v6} (from PeeringDB)[green]")
+        for family, limit in (("IPv4", final_limit_v4), ("IPv6", final_limit_v6)):
+            origin = f"from {limit_sources[family]}" if limit_sources[family] else "no limit"
+            console.print(f"[green]{family} Limit: {limit} ({origin})[/green]")
 
         should_sync = Prompt.ask("\nEnable 'Sync from PeeringDB'?", choices=["y", "n"], default="y") == "y"
         
@@ -259,86 +684,28 @@ class IxpPeeringTool(BaseTool):
 
 
         # 7. Execution: PREPARE DATA FIRST (Dry Run Logic Optimization)
-        my_asn_obj = nb_client.get_my_asn_object(MY_ASN)
-        peer_group_id = nb_client.get_peer_group_id(PEER_GROUP_NAME)
-
-        prepared_sessions = []
-        
-        with console.status("[bold green]Calculating final parameters (Dry Run)...[/bold green]"):
-            for session in actionable_sessions:
-                data = session['data']
-                ip_str = session['ip_str']
-                
-                # 1. Determine IP Version and Limits
-                is_v6 = ':' in ip_str
-                addr_family = "6u" if is_v6 else "4u"
-                prefix_limit = final_limit_v6 if is_v6 else final_limit_v4
-                
-                # 2. AS-SET Selection logic
-                raw_as_set_str = net_info.get('irr_as_set') or ""
-                as_set_parts = raw_as_set_str.strip().split(' ')
-                
-                final_as_set = as_set_parts[0] if as_set_parts else ""
-                if as_set_parts:
-                    candidates = as_set_parts[:2] 
-                    for candidate in candidates:
-                        if is_v6 and "V6" in candidate.upper():
-                            final_as_set = candidate
-                            break
-                
-                # 3. Name Sanitization
-                raw_name = selected_tenant.name
-                strategy = StrictAlphanumericStrategy()
-                clean_name = strategy.sanitize(raw_name)
-                
-                # 4. Description & Session Name Generation
-                session_name = raw_name 
-                bgp_desc = f"[peer_type=peer_ixp,peer_as={target_asn},peer_name={clean_name}]"
-                ip_desc = f"{selected_tenant.name} - {data['ix_name']}"
-
-                # 5. Resolve Local Context & Mask
-                local_ip_str = data['local_ip4'] if not is_v6 else data['local_ip6']
-                local_ctx = ip_mgr.get_device_site_from_ip(local_ip_str)
-                local_ip_obj = ip_mgr.get_ip_address(local_ip_str)
-                
-                target_ip_with_cidr = ip_str 
-                site_name = "[red]???[/red]"
-                device_name = "[red]???[/red]"
-                ready_to_deploy = False
-
-                if local_ip_obj and local_ctx:
-                    try:
-                        mask = local_ip_obj.address.split('/')[-1]
-                        target_ip_with_cidr = f"{ip_str}/{mask}"
-                        site_name = local_ctx['site_name']
-                        device_name = local_ctx['device_name']
-                        ready_to_deploy = True
-                    except Exception:
-                        pass
-            
-                # Store everything in a prepared dict
-                prepared_sessions.append({
-                    'original_data': session,
-                    'is_v6': is_v6,
-                    'target_ip_with_cidr': target_ip_with_cidr,
-                    'site_name': site_name,
-                    'device_name': device_name,
-                    'local_ctx': local_ctx,           
-                    'local_ip_obj': local_ip_obj,
-                    # Store ID context
-                    'my_asn_id': my_asn_obj.id,
-                    'peer_asn_id': peer_asn_obj.id,
-                    'peer_group_id': peer_group_id,
-                    'tenant_id': selected_tenant.id,
-                    
-                    'prefix_limit': int(prefix_limit),
-                    'as_set': final_as_set,
-                    'addr_family': addr_family,
-                    'session_name': session_name,
-                    'bgp_desc': bgp_desc,
-                    'ip_desc': ip_desc,
-                    'ready': ready_to_deploy
-                })
+        preview_columns = [("IXP Name", {"style": "cyan"}), ("Remote IP / Device", {"style": "green"}),
+                           ("Limit", {"justify": "right"}), ("AS-SET", {"style": "yellow"}), ("MD5", {"style": "red"})]
+        planning = LiveTable(preview_columns, title="Planning BGP Sessions (Dry Run)...",
+                             show_header=True, header_style="bold magenta")
+        for session in actionable_sessions:
+            planning.add_row(escape(session['data']['ix_name']), session['ip_str'], PENDING, PENDING, PENDING, pending=True)
+
+        def on_session(index, item):
+            if item['ready']:
+                planning.update_row(index, *preview_cells(item, md5_password))
+            else:
+                planning.update_row(index, escape(item['original_data']['data']['ix_name']), item['target_ip_with_cidr'],
+                                    "-", "-", "[red]no local IP[/red]")
+
+        with Live(planning, console=console, refresh_per_second=8, transient=True), \
+                TRACER.phase("dry_run"):
+            my_asn_obj = nb_client.get_my_asn_object(MY_ASN)
+            peer_group_id = nb_client.get_peer_group_id(PEER_GROUP_NAME)
+            prepared_sessions = controller.plan_sessions(
+                actionable_sessions, net_info, selected_tenant, peer_asn_obj, my_asn_obj, peer_group_id,
+                final_limit_v4, final_limit_v6, ip_mgr, self.get_port_inventory(nb_client), on_session=on_session
+            )
         
         deployable_sessions = [p for p in prepared_sessions if p['ready']]
 
@@ -348,78 +715,57 @@ class IxpPeeringTool(BaseTool):
             return
 
         # --- DISPLAY DRY RUN TABLE ---
-        preview_table = Table(title="Planned BGP Sessions (Dry Run)", show_header=True, header_style="bold magenta")
-        preview_table.add_column("IXP Name", style="cyan")
-        preview_table.add_column("Remote IP / Device", style="green") 
-        preview_table.add_column("Limit", justify="right")
-        preview_table.add_column("AS-SET", style="yellow")
-        preview_table.add_column("MD5", style="red")
-
+        preview_table = LiveTable(preview_columns, title="Planned BGP Sessions (Dry Run)",
+                                  show_header=True, header_style="bold magenta")
         for item in deployable_sessions:
-            ix_name = item['original_data']['data']['ix_name']
-            md5_status = "Yes" if md5_password else "-"
-            
-            loc_info = f"{item['target_ip_with_cidr']}\n[dim]on {item['device_name']}[/dim]"
-            
-            preview_table.add_row(
-                escape(ix_name), 
-                loc_info, 
-                str(item['prefix_limit']), 
-                item['as_set'], 
-                md5_status
-            )
+            preview_table.add_row(*preview_cells(item, md5_password))
 
-        console.print(preview_table)
+        preview_table.print(console)
 
         if Prompt.ask(f"Do you want to apply these {len(deployable_sessions)} changes to NetBox?", choices=["y", "n"]) == "y":
             console.print("\n[yellow]🚀 Launching Creation...[/yellow]")
-            
-            for item in deployable_sessions:
+
+            with console.status("[bold green]Creating remote IPs and BGP sessions (bulk)...[/bold green]") as status, \
+                    TRACER.phase("apply"):
+                done = []
+
+                def on_result(result):
+                    done.append(result)
+                    status.update(f"[bold green]Creating remote IPs and BGP sessions... "
+                                  f"{len(done)}/{len(deployable_sessions)}[/bold green]")
+
+                apply_results = controller.apply_sessions(deployable_sessions, ip_mgr, bgp_mgr, should_sync, md5_password,
+                                                          on_result=on_result)
+
+            for result in apply_results:
+                item = result['item']
                 data = item['original_data']['data']
-                session = item['original_data']
                 
                 console.print(f"\n[bold white]--- {escape(data['ix_name'])} ---[/bold white]")
                 console.print(f"     📍 Site: [bold]{item['site_name']}[/bold] | Device: [bold]{item['device_name']}[/bold]")
 
-                # B) Create Remote IP
-                remote_ip_obj = session['ip_obj']
-                if not session['exists']:
-                    console.print(f"   Creating Remote IP [cyan]{item['target_ip_with_cidr']}[/cyan]...")
-                    new_ip = ip_mgr.create_ip_address(item['target_ip_with_cidr'], item['tenant_id'], item['ip_desc'])
-                    if new_ip:
-                        console.print(f"     [green]✅ IP Created (ID: {new_ip.id})[/green]")
-                        item['original_data']['ip_obj'] = new_ip 
-                    else:
-                        console.print(f"     [bold red]❌ IP Creation Failed. Skipping BGP.[/bold red]")
-                        continue
+                # B) Remote IP
+                if result['ip_created']:
+                    console.print(f"   Remote IP [cyan]{item['target_ip_with_cidr']}[/cyan]: [green]✅ IP Created (ID: {result['ip_obj'].id})[/green]")
+                elif result['ip_obj']:
+                    console.print(f"   [dim]IP exists (ID: {result['ip_obj'].id}).[/dim]")
                 else:
-                    console.print(f"   [dim]IP exists (ID: {remote_ip_obj.id}).[/dim]")
+                    console.print(f"   [bold red]❌ IP Creation Failed for {item['target_ip_with_cidr']}: {escape(str(result['ip_error']))}. Skipping BGP.[/bold red]")
+                    continue
 
-                # C) Create BGP Session
-                console.print(f"   Creating BGP Session: [bold cyan]{escape(item['session_name'])}[/]...")
-                try:
-                    bgp_s = bgp_mgr.create_bgp_session(
-                        name=item['session_name'],
-                        site_id=item['local_ctx']['site_id'],
-                        device_id=item['local_ctx']['device_id'],
-                        tenant_id=item['tenant_id'],
-                        local_ip_id=item['local_ip_obj'].id,
-                        remote_ip_id=item['original_data']['ip_obj'].id, 
-                        local_as_id=item['my_asn_id'],
-                        remote_as_id=item['peer_asn_id'],
-                        peer_group_id=item['peer_group_id'],
-                        address_family=item['addr_family'],
-                        as_set=item['as_set'], 
-                        prefix_limit=item['prefix_limit'],
-                        sync_pdb=should_sync,
-                        md5_key=md5_password,
-                        description=item['bgp_desc']
-                    )
-                    console.print(f"     [bold green]✅ BGP Session Created (ID: {bgp_s.id})[/bold green]")
-                except Exception as e:
-                    console.print(f"     [bold red]💥 Creation Failed: {e}[/bold red]")
+                # C) BGP Session
+                if result['session']:
+                    console.print(f"   BGP Session [bold cyan]{escape(item['session_name'])}[/]: [bold green]✅ Created (ID: {result['session'].id})[/bold green]")
+                else:
+                    console.print(f"   [bold red]💥 BGP Session Creation Failed: {escape(str(result['session_error']))}[/bold red]")
 
         else:
             console.print("[dim]Aborted.[/dim]")
-        
+
+        stats = nb_client.identity_map.stats()
+        console.print(f"\n[dim]NetBox object cache: {stats['hits']} hits / {stats['misses']} misses[/dim]")
+        if "persistent" in stats:
+            cache = stats["persistent"]
+            console.print(f"[dim]Persistent NetBox cache: {cache['objects']} objects, {cache['hits']} hits, "
+                          f"synced {cache['age']}s ago{'' if cache['enabled'] else ' (disabled)'}[/dim]")
         input("\nPress Enter to return...")
\ No newline at end of file
@@ -0,0 +1,91 @@
+import threading
+from typing import Optional, List, Tuple, Dict, Any
+
+from rich.console import Console
+from rich.prompt import Prompt
+from rich.table import Table
+
+# Rows per page when a table is printed / the height of the live window;
+# both are capped by the terminal height.
+PAGE_SIZE = 50
+# Lines kept free for the header, caption and the prompt under the table
+_CHROME = 8
+
+
+class LiveTable:
+    """
+    Rich table that can be filled while the lookups are still running (render it in a rich Live)
+    and printed page by page once complete.
+
+    Rows are kept as tuples of markup strings; only the visible window is turned into a
+    rich Table, so the render time and the terminal output do not grow with the row count.
+    While live the window follows the first row that is still pending ('⏳' placeholders
+    added with pending=True and completed by update_row).
+    """
+    def __init__(self, columns: List[Tuple[str, Dict[str, Any]]], title: Optional[str] = None,
+                 page_size: int = PAGE_SIZE, **table_kwargs):
+        # (header, add_column kwargs) pairs
+        self.columns = columns
+        self.title = title
+        self.page_size = page_size
+        self.table_kwargs = table_kwargs
+        self.rows: List[tuple] = []
+        self.pending = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add_row(self, *cells: str, pending: bool = False) -> int:
+        with self._lock:
+            self.rows.append(cells)
+            if pending:
+                self.pending.add(len(self.rows) - 1)
+            return len(self.rows) - 1
+
+    def update_row(self, index: int, *cells: str, pending: bool = False):
+        with self._lock:
+            self.rows[index] = cells
+            if pending:
+                self.pending.add(index)
+            else:
+                self.pending.discard(index)
+
+    def window_size(self, height: int) -> int:
+        return max(5, min(self.page_size, height - _CHROME))
+
+    def render(self, start: int, size: int) -> Table:
+        """Table of rows [start, start + size), with a 'rows a-b of n' caption if not all shown."""
+        with self._lock:
+            rows = self.rows[start:start + size]
+            total, pending = len(self.rows), len(self.pending)
+        caption = []
+        if len(rows) < total:
+            caption.append(f"rows {start + 1}-{start + len(rows)} of {total}")
+        if pending:
+            caption.append(f"{pending} pending")
+        table = Table(title=self.title, caption=" · ".join(caption) or None, **self.table_kwargs)
+        for header, kwargs in self.columns:
+            table.add_column(header, **kwargs)
+        for row in rows:
+            table.add_row(*row)
+        return table
+
+    def __rich_console__(self, console: Console, options):
+        # called by Live on every refresh: only the window is rendered
+        size = self.window_size(options.height or console.height)
+        with self._lock:
+            first = min(self.pending) if self.pending else len(self.rows)
+            start = max(0, min(first, len(self.rows) - size))
+        yield self.render(start, size)
+
+    def print(self, console: Console, paged: bool = True):
+        """Prints the table; above one page, page by page (Enter: next page, 'q': skip the rest)."""
+        size = self.window_size(console.height) if paged else len(self.rows)
+        for start in range(0, max(len(self.rows), 1), max(size, 1)):
+            console.print(self.render(start, size))
+            if start + size < len(self.rows):
+                answer = Prompt.ask(f"[dim]Enter: next {min(size, len(self.rows) - start - size)} rows, "
+                                    f"'q': skip the rest[/dim]", default="", show_default=False, console=console)
+                if answer.strip().lower() == "q":
+                    break
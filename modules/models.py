@@ -0,0 +1,291 @@
+import ipaddress
+import sys
+from dataclasses import dataclass
+from typing import Optional, Dict, Tuple, Any
+
+# Compact, immutable records for the fleet-scale paths (reconciliation, batch runs).
+# Decoded straight from the API JSON: addresses are stored as integers, repeated names
+# (IXPs, devices) are interned, and nested objects are reduced to the fields we use.
+
+
+def encode_ip(address: str) -> Tuple[int, int, int]:
+    """'192.0.2.1/24' -> (int value, prefix length, family); a bare host gets /32 or /128."""
+    iface = ipaddress.ip_interface(address)
+    return int(iface.ip), iface.network.prefixlen, iface.version
+
+
+def decode_ip(value: int, family: int) -> str:
+    return str(ipaddress.IPv4Address(value) if family == 4 else ipaddress.IPv6Address(value))
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+def _nested_id(value: Any) -> Optional[int]:
+    # NetBox nests related objects ({'id': 1, ...}); brief payloads or ID-only writes may give a bare int
+    if isinstance(value, dict):
+        return value.get("id")
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class IxpPresence:
+    """One PeeringDB netixlan entry: an ASN's port on an IXP LAN."""
+    id: int
+    ix_id: int
+    ix_name: str
+    asn: int
+    ip4: Optional[int]
+    ip6: Optional[int]
+
+    @classmethod
+    def from_json(cls, entry: Dict[str, Any]) -> "IxpPresence":
+        return cls(
+            id=entry["id"],
+            ix_id=entry["ix_id"],
+            ix_name=_intern(entry.get("name") or entry.get("ix_name")),
+            asn=entry["asn"],
+            ip4=encode_ip(entry["ipaddr4"])[0] if entry.get("ipaddr4") else None,
+            ip6=encode_ip(entry["ipaddr6"])[0] if entry.get("ipaddr6") else None,
+        )
+
+    @property
+    def ipaddr4(self) -> Optional[str]:
+        return decode_ip(self.ip4, 4) if self.ip4 is not None else None
+
+    @property
+    def ipaddr6(self) -> Optional[str]:
+        return decode_ip(self.ip6, 6) if self.ip6 is not None else None
+
+    def addresses(self):
+        # (family, int address) pairs that are set
+        return [(family, ip) for family, ip in ((4, self.ip4), (6, self.ip6)) if ip is not None]
+
+
+@dataclass(frozen=True, slots=True)
+class Tenant:
+    """NetBox tenancy.tenants object (full or 'brief' payload)."""
+    id: int
+    name: str
+    slug: str
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Tenant":
+        return cls(data["id"], data["name"], data["slug"])
+
+
+@dataclass(frozen=True, slots=True)
+class IpAddress:
+    """NetBox ipam.ip_addresses object (full or 'brief' payload)."""
+    id: int
+    ip: int
+    prefixlen: int
+    family: int
+    tenant_id: Optional[int] = None
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "IpAddress":
+        ip, prefixlen, family = encode_ip(data["address"])
+        return cls(data["id"], ip, prefixlen, family, _nested_id(data.get("tenant")))
+
+    @property
+    def host(self) -> str:
+        return decode_ip(self.ip, self.family)
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}/{self.prefixlen}"
+
+
+@dataclass(frozen=True, slots=True)
+class Prefix:
+    """NetBox ipam.prefixes object (full or 'brief' payload)."""
+    id: int
+    network: int
+    prefixlen: int
+    family: int
+    site_id: Optional[int] = None
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Prefix":
+        network, prefixlen, family = encode_ip(data["prefix"])
+        # NetBox 4.2+ replaced 'site' with a generic scope
+        site = data.get("site") or (data.get("scope") if data.get("scope_type") == "dcim.site" else None)
+        return cls(data["id"], network, prefixlen, family, _nested_id(site))
+
+    def contains(self, ip: int, family: int) -> bool:
+        bits = 32 if self.family == 4 else 128
+        return family == self.family and ip >> (bits - self.prefixlen) == self.network >> (bits - self.prefixlen)
+
+
+@dataclass(frozen=True, slots=True)
+class LocalPort:
+    """Our own port on one IXP LAN (per address family): local IP, interface, device and site."""
+    ix_id: int
+    family: int
+    ix_name: str
+    ip: int
+    prefixlen: int
+    ip_id: int
+    interface_id: Optional[int]
+    interface_name: Optional[str]
+    device_id: int
+    device_name: str
+    site_id: int
+    site_name: str
+
+    @property
+    def host(self) -> str:
+        return decode_ip(self.ip, self.family)
+
+    def context(self) -> Dict[str, Any]:
+        # same layout as IPManager.device_context
+        return {"device_id": self.device_id, "device_name": self.device_name,
+                "site_id": self.site_id, "site_name": self.site_name}
+
+
+@dataclass(frozen=True, slots=True)
+class BgpSession:
+    """netbox-bgp session, reduced to what the reconciliation needs."""
+    id: int
+    name: str
+    device: Optional[str]
+    remote_asn: int
+    remote_ip: int
+    family: int
+    local_address_id: Optional[int]
+    remote_address_id: Optional[int]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> Optional["BgpSession"]:
+        remote_address, remote_as = data.get("remote_address"), data.get("remote_as")
+        if not remote_address or not remote_as:
+            return None
+        ip, _, family = encode_ip(remote_address["address"])
+        device = data.get("device")
+        return cls(
+            id=data["id"],
+            name=data.get("name") or "",
+            device=_intern(device["name"]) if device else None,
+            remote_asn=remote_as["asn"],
+            remote_ip=ip,
+            family=family,
+            local_address_id=_nested_id(data.get("local_address")),
+            remote_address_id=remote_address["id"],
+        )
+
+    @property
+    def remote_host(self) -> str:
+        return decode_ip(self.remote_ip, self.family)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionPolicy:
+    """netbox-bgp session reduced to the PeeringDB-driven policy fields (prefix limit, AS-SET)."""
+    id: int
+    name: str
+    remote_asn: int
+    family: int
+    remote_address_id: int
+    prefix_limit: Optional[int]
+    as_set: Optional[str]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> Optional["SessionPolicy"]:
+        remote_address, remote_as = data.get("remote_address"), data.get("remote_as")
+        if not remote_address or not remote_as:
+            return None
+        custom_fields = data.get("custom_fields") or {}
+        limit = custom_fields.get("prefix_limit")
+        return cls(
+            id=data["id"],
+            name=data.get("name") or "",
+            remote_asn=remote_as["asn"],
+            family=encode_ip(remote_address["address"])[2],
+            remote_address_id=remote_address["id"],
+            prefix_limit=int(limit) if limit not in (None, "") else None,
+            as_set=custom_fields.get("as_set") or None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RouterSession:
+    """netbox-bgp session with everything a router config needs (modules.config_render)."""
+    id: int
+    name: str
+    device: str
+    local_asn: int
+    remote_asn: int
+    family: int
+    local_ip: int
+    remote_ip: int
+    peer_group: Optional[str]
+    description: str
+    prefix_limit: Optional[int]
+    as_set: Optional[str]
+    md5: Optional[str]
+    bfd: bool
+    gtsm: bool
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> Optional["RouterSession"]:
+        device, local_as, remote_as = data.get("device"), data.get("local_as"), data.get("remote_as")
+        local_address, remote_address = data.get("local_address"), data.get("remote_address")
+        status = data.get("status")
+        if isinstance(status, dict):
+            status = status.get("value")
+        if not (device and local_as and remote_as and local_address and remote_address) or status not in (None, "active"):
+            return None
+        custom_fields = data.get("custom_fields") or {}
+        limit = custom_fields.get("prefix_limit")
+        remote_ip, _, family = encode_ip(remote_address["address"])
+        peer_group = data.get("peer_group")
+        return cls(
+            id=data["id"],
+            name=data.get("name") or "",
+            device=_intern(device["name"]),
+            local_asn=local_as["asn"],
+            remote_asn=remote_as["asn"],
+            family=family,
+            local_ip=encode_ip(local_address["address"])[0],
+            remote_ip=remote_ip,
+            peer_group=_intern(peer_group["name"]) if peer_group else None,
+            description=data.get("description") or "",
+            prefix_limit=int(limit) if limit not in (None, "") else None,
+            as_set=custom_fields.get("as_set") or None,
+            md5=custom_fields.get("md5") or None,
+            bfd=bool(custom_fields.get("bfd")),
+            gtsm=bool(custom_fields.get("gtsm")),
+        )
+
+    @property
+    def local_host(self) -> str:
+        return decode_ip(self.local_ip, self.family)
+
+    @property
+    def remote_host(self) -> str:
+        return decode_ip(self.remote_ip, self.family)
+
+
+@dataclass(frozen=True, slots=True)
+class PlannedChange:
+    """One difference between NetBox and PeeringDB, i.e. a change to make on one (IXP, ASN, family)."""
+    kind: str
+    ix_id: Optional[int]
+    ix_name: str
+    asn: int
+    family: int
+    session: Optional[BgpSession] = None
+    peeringdb_ips: Tuple[int, ...] = ()
+
+    def as_row(self) -> Dict[str, Any]:
+        session = self.session
+        return {
+            "kind": self.kind, "ix_id": self.ix_id, "ix_name": self.ix_name, "asn": self.asn, "family": self.family,
+            "session_id": session.id if session else None,
+            "session_name": session.name if session else None,
+            "device": session.device if session else None,
+            "netbox_ip": session.remote_host if session else None,
+            "peeringdb_ip": ", ".join(decode_ip(ip, self.family) for ip in sorted(self.peeringdb_ips)) or None,
+        }
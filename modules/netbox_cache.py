@@ -0,0 +1,214 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, Iterable
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chores-toolbox", "netbox_cache.sqlite3")
+
+CHANGELOG = "core/object-changes"
+
+# changelog object type -> identity map endpoint; only these endpoints are persisted
+CHANGE_TYPES = {
+    "ipam.ipaddress": "ipam.ip_addresses",
+    "ipam.prefix": "ipam.prefixes",
+    "ipam.asn": "ipam.asns",
+    "tenancy.tenant": "tenancy.tenants",
+    "dcim.device": "dcim.devices",
+    "netbox_bgp.bgpsession": "plugins.bgp.session",
+}
+# Endpoints keyed by something other than the object (the prefix lookup is keyed by host IP):
+# any new, changed or deleted object may change any answer, so every change drops all of them
+DERIVED_KEYS = {"ipam.prefixes"}
+
+_MISSING = object()
+
+
+class NetBoxReadCache:
+    """
+    Persistent second level behind the IdentityMap: the NetBox objects the tools read
+    (IPs, prefixes, ASNs, tenants, devices, BGP sessions) are kept in SQLite across runs.
+
+    Entries are never trusted blindly: before answering, the cache replays the NetBox change log
+    (core/object-changes) since its checkpoint, at most 'max_staleness' seconds apart, and drops
+    every entry whose object was changed or deleted, and the 'not found' entries of every endpoint
+    with a change (an edited object may now match a key that was cached as missing).
+    The dropped keys are simply loaded from NetBox again. WAL mode lets several operators on
+    one host share the file; the checkpoint lives in the file, so a sync by one serves all.
+    """
+    MISSING = _MISSING
+
+    def __init__(self, nb_client, path: str = DEFAULT_CACHE_PATH, max_staleness: int = 60,
+                 max_age: int = 7 * 24 * 3600, retention: int = 30 * 24 * 3600):
+        self.nb_client = nb_client
+        self.max_staleness = max_staleness
+        # upper bound for changes the log does not show (e.g. a renamed site nested in a device)
+        self.max_age = max_age
+        # older checkpoints may point behind the change log retention: start over
+        self.retention = retention
+        self.enabled = True
+        self.error: Optional[str] = None
+        self.hits = 0
+        self.dropped = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                " endpoint TEXT NOT NULL, key TEXT NOT NULL, object_id INTEGER, data TEXT,"
+                " stored_at REAL NOT NULL, PRIMARY KEY (endpoint, key))"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS idx_objects_id ON objects (endpoint, object_id)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        # a file pointed at another NetBox instance is useless
+        if self._meta("base_url") != nb_client.nb.base_url:
+            with self._lock, self.db:
+                self.db.execute("DELETE FROM objects")
+                self.db.execute("DELETE FROM meta")
+                self.db.execute("INSERT INTO meta (key, value) VALUES ('base_url', ?)", (nb_client.nb.base_url,))
+        self.synced_at = self._meta("synced_at") or 0.0
+
+    @classmethod
+    def from_env(cls, nb_client) -> Optional["NetBoxReadCache"]:
+        # Optional: only enabled when NETBOX_CACHE points to a db file.
+        path = os.getenv("NETBOX_CACHE")
+        if not path:
+            return None
+        return cls(nb_client, path, max_staleness=int(os.getenv("NETBOX_CACHE_STALENESS", "60")))
+
+    def _meta(self, key: str) -> Any:
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items())
+
+    # --- Change log ---
+
+    def sync(self) -> int:
+        """Replays the change log since the checkpoint. Returns the number of dropped entries."""
+        checkpoint = self._meta("checkpoint")
+        started = time.time()
+        if checkpoint is None or started - (self._meta("synced_at") or 0) > self.retention:
+            # nothing known about the time before the checkpoint: start empty from the newest change
+            latest = next(self.nb_client.stream(CHANGELOG, page_size=1, ordering="-id"), None)
+            with self._lock, self.db:
+                dropped = self.db.execute("DELETE FROM objects").rowcount
+                self._set_meta(checkpoint=latest["id"] if latest else 0, synced_at=started)
+            self.synced_at = started
+            return dropped
+
+        by_id, touched, last = set(), set(), checkpoint
+        for change in self.nb_client.stream(CHANGELOG, ordering="id", id__gt=checkpoint):
+            last = max(last, change["id"])
+            endpoint = CHANGE_TYPES.get(change.get("changed_object_type"))
+            if not endpoint:
+                continue
+            # any action may make a cached 'not found' wrong: an update can move an IP to the
+            # searched address, a resized or deleted prefix changes the longest match of a host
+            touched.add(endpoint)
+            by_id.add((endpoint, change["changed_object_id"]))
+
+        with self._lock, self.db:
+            dropped = 0
+            if by_id:
+                dropped += self.db.executemany(
+                    "DELETE FROM objects WHERE endpoint = ? AND object_id = ?", sorted(by_id)
+                ).rowcount
+            for endpoint in touched:
+                if endpoint in DERIVED_KEYS:
+                    dropped += self.db.execute("DELETE FROM objects WHERE endpoint = ?", (endpoint,)).rowcount
+                else:
+                    dropped += self.db.execute(
+                        "DELETE FROM objects WHERE endpoint = ? AND object_id IS NULL", (endpoint,)
+                    ).rowcount
+            self._set_meta(checkpoint=last, synced_at=started)
+        self.synced_at = started
+        self.dropped += dropped
+        return dropped
+
+    def is_stale(self) -> bool:
+        return time.time() - self.synced_at > self.max_staleness
+
+    def ensure_fresh(self) -> bool:
+        """Syncs when the last sync (by anyone using the file) is too old. False if the cache is off."""
+        if not self.enabled:
+            return False
+        if self.is_stale():
+            with self._sync_lock:
+                # another operator (process) may have synced in the meantime
+                self.synced_at = max(self.synced_at, self._meta("synced_at") or 0.0)
+                if self.is_stale():
+                    try:
+                        self.sync()
+                    except Exception as e:
+                        # without the change log nothing bounds the staleness: stop answering
+                        self.enabled = False
+                        self.error = str(e)
+                        print(f"⚠️ NetBox cache disabled, the change log is not readable: {e}")
+        return self.enabled
+
+    # --- Lookups (called by the IdentityMap) ---
+
+    def _endpoint(self, endpoint: str):
+        # 'plugins.bgp.session' -> nb.plugins.bgp.session
+        return functools.reduce(getattr, endpoint.split("."), self.nb_client.nb)
+
+    def lookup(self, endpoint: str, key: Any) -> Any:
+        """The cached Record, None for a cached 'not found', MISSING if unknown."""
+        if endpoint not in CHANGE_TYPES.values() or not self.ensure_fresh():
+            return _MISSING
+        with self._lock:
+            row = self.db.execute(
+                "SELECT data FROM objects WHERE endpoint = ? AND key = ? AND stored_at > ?",
+                (endpoint, json.dumps(key), time.time() - self.max_age),
+            ).fetchone()
+        if row is None:
+            return _MISSING
+        self.hits += 1
+        if row[0] is None:
+            return None
+        ep = self._endpoint(endpoint)
+        return ep.return_obj(json.loads(row[0]), ep.api, ep)
+
+    def store(self, endpoint: str, key: Any, value: Any):
+        self.store_many(endpoint, [(key, value)])
+
+    def store_many(self, endpoint: str, items: Iterable[tuple]):
+        """(key, Record or None) pairs; endpoints outside CHANGE_TYPES are ignored."""
+        if endpoint not in CHANGE_TYPES.values() or not self.enabled:
+            return
+        now = time.time()
+        rows = [(endpoint, json.dumps(key), getattr(value, "id", None),
+                 json.dumps(dict(value), default=str) if value is not None else None, now) for key, value in items]
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO objects (endpoint, key, object_id, data, stored_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def invalidate(self, endpoint: Optional[str] = None, key: Any = _MISSING):
+        with self._lock, self.db:
+            if endpoint is None:
+                self.db.execute("DELETE FROM objects")
+            elif key is not _MISSING:
+                self.db.execute("DELETE FROM objects WHERE endpoint = ? AND key = ?", (endpoint, json.dumps(key)))
+            else:
+                self.db.execute("DELETE FROM objects WHERE endpoint = ?", (endpoint,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            objects = self.db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        return {"objects": objects, "hits": self.hits, "dropped": self.dropped, "enabled": self.enabled,
+                "age": int(time.time() - self.synced_at) if self.synced_at else None}
+
+    def close(self):
+        self.db.close()
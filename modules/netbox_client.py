@@ -1,6 +1,103 @@
 import pynetbox
 import os
-from typing import List, Optional
+import threading
+from collections import deque
+from typing import List, Optional, Any, Callable, Dict, Iterator
+
+from modules.http_transport import create_session
+from modules.instrumentation import TRACER, ContextThreadPoolExecutor
+from modules.netbox_cache import NetBoxReadCache
+from modules.request_scheduler import TransientError
+
+# one sentinel for both cache levels
+_MISSING = NetBoxReadCache.MISSING
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+class IdentityMap:
+    """
+    Unit-of-work cache for NetBox objects, shared by NetBoxClient, IPManager and BGPManager.
+    Keyed by (endpoint, lookup key), so each object is fetched at most once per run.
+    'None' answers are remembered too; writes must invalidate the affected keys.
+    An optional 'backing' store (NetBoxReadCache) is asked on a miss and written through on put,
+    so objects also survive between runs.
+    """
+    MISSING = _MISSING
+
+    def __init__(self, backing=None):
+        self.backing = backing
+        self._store: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str, key: Any, default: Any = _MISSING) -> Any:
+        with self._lock:
+            value = self._store.get((endpoint, key), _MISSING)
+        if value is _MISSING and self.backing is not None:
+            value = self.backing.lookup(endpoint, key)
+            if value is not _MISSING:
+                with self._lock:
+                    self._store.setdefault((endpoint, key), value)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if TRACER.enabled:
+            # 'ipam.ip_addresses' -> 'ipam/ip-addresses', same key as the HTTP calls
+            TRACER.record_cache("netbox", endpoint.replace(".", "/").replace("_", "-"), hit=value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def put(self, endpoint: str, key: Any, value: Any):
+        with self._lock:
+            self._store[(endpoint, key)] = value
+        if self.backing is not None:
+            self.backing.store(endpoint, key, value)
+
+    def put_many(self, endpoint: str, items: Dict[Any, Any]):
+        # bulk loads: one transaction in the backing store instead of one per key
+        with self._lock:
+            for key, value in items.items():
+                self._store[(endpoint, key)] = value
+        if self.backing is not None:
+            self.backing.store_many(endpoint, items.items())
+
+    def get_or_load(self, endpoint: str, key: Any, loader: Callable[[], Any]) -> Any:
+        value = self.get(endpoint, key)
+        if value is _MISSING:
+            value = loader()
+            self.put(endpoint, key, value)
+        return value
+
+    def invalidate(self, endpoint: Optional[str] = None, key: Any = _MISSING):
+        # Drops one key, one whole endpoint, or everything
+        with self._lock:
+            if endpoint is None:
+                self._store.clear()
+            elif key is not _MISSING:
+                self._store.pop((endpoint, key), None)
+            else:
+                for k in [k for k in self._store if k[0] == endpoint]:
+                    del self._store[k]
+        if self.backing is not None:
+            self.backing.invalidate(endpoint, key)
+
+    def reset(self):
+        # Start of a new unit of work (e.g. the next wizard run on a reused client)
+        with self._lock:
+            self._store.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"hits": self.hits, "misses": self.misses, "objects": len(self._store)}
+        if self.backing is not None:
+            stats["persistent"] = self.backing.stats()
+        return stats
+
 
 class NetBoxClient:
     """
@@ -13,6 +110,65 @@ class NetBoxClient:
         if not url or not token:
             raise ValueError("Missing NETBOX_URL or NETBOX_TOKEN env vars")
         self.nb = pynetbox.api(url, token=token)
+        # pooled keep-alive session, every call is visible to the tracer (--profile)
+        self.nb.http_session = TRACER.instrument_session(create_session(service="netbox"), "netbox")
+        # shared with IPManager / BGPManager; backed by the persistent read cache if NETBOX_CACHE is set
+        self.identity_map = IdentityMap()
+        self.identity_map.backing = NetBoxReadCache.from_env(self)
+
+    def _get_page(self, url: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        headers = {"accept": "application/json", "authorization": f"Token {self.nb.token}"}
+        response = self.nb.http_session.get(url, params=params, headers=headers, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def stream(self, path: str, decode: Optional[Callable[[Dict[str, Any]], Any]] = None, brief: bool = False,
+               page_size: int = 1000, read_ahead: int = 2, parallel: int = 1, **filters) -> Iterator[Any]:
+        """
+        Streams a list endpoint (e.g. 'plugins/bgp/session') page by page, without pynetbox Records.
+        Yields the JSON objects, or decode(obj) (e.g. a modules.models record; None results are skipped).
+
+        The first page gives the total count, the rest is fetched by offset in the background:
+        at most 'read_ahead' pages are in flight or buffered, by 'parallel' threads. Pages are
+        yielded in order, so memory stays at a few pages whatever the size of the result.
+        List filter values are sent as repeated parameters, like pynetbox does.
+        """
+        url = f"{self.nb.base_url}/{path.strip('/')}/"
+        params = {**filters, "limit": page_size}
+        if brief:
+            params["brief"] = 1
+
+        def emit(results):
+            for obj in results:
+                if decode is None:
+                    yield obj
+                else:
+                    record = decode(obj)
+                    if record is not None:
+                        yield record
+
+        first = self._get_page(url, dict(params, offset=0))
+        offsets = list(range(page_size, first.get("count") or 0, page_size))
+        yield from emit(first["results"])
+        del first
+        if not offsets:
+            return
+
+        read_ahead = max(read_ahead, parallel, 1)
+        executor = ContextThreadPoolExecutor(max_workers=max(parallel, 1), thread_name_prefix="nb-page")
+        pending = deque()
+        try:
+            for offset in offsets:
+                pending.append(executor.submit(self._get_page, url, dict(params, offset=offset)))
+                if len(pending) >= read_ahead:
+                    yield from emit(pending.popleft().result()["results"])
+            while pending:
+                yield from emit(pending.popleft().result()["results"])
+        finally:
+            # the consumer may stop early: drop the pages nobody will read
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
 
     def get_tenant_by_name(self, name_fragment: str) -> List[object]:
         """Searches for tenants using NetBox 'q' search + Python filtering."""
@@ -20,8 +176,20 @@ class NetBoxClient:
         try:
             api_results = self.nb.tenancy.tenants.filter(q=name_fragment)
             return [t for t in api_results if name_fragment.lower() in t.name.lower() or name_fragment.lower() in t.slug.lower()]
+        except TransientError: raise
         except Exception: return []
 
+    def get_tenant_by_id(self, tenant_id: int) -> Optional[object]:
+        try:
+            return self.identity_map.get_or_load(
+                "tenancy.tenants", tenant_id, lambda: self.nb.tenancy.tenants.get(id=tenant_id)
+            )
+        except TransientError:
+            # not a true negative, the caller must not treat it as "not found"
+            raise
+        except Exception:
+            return None
+
     def get_asn_for_tenant(self, asn: int, tenant_id: int) -> Optional[object]:
         """
         Checks if the ASN object exists AND belongs to the specific Tenant.
@@ -32,6 +200,8 @@ class NetBoxClient:
             res = self.nb.ipam.asns.filter(asn=asn, tenant_id=tenant_id)
             as_list = list(res)
             return as_list[0] if as_list else None
+        except TransientError:
+            raise
         except Exception:
             return None
             
@@ -40,18 +210,33 @@ class NetBoxClient:
         Gets our own ASN object (e.g., 5405). This usually belongs to our own Tenant.
         """
         try:
-            res = self.nb.ipam.asns.filter(asn=asn)
-            as_list = list(res)
-            return as_list[0] if as_list else None
+            def load():
+                as_list = list(self.nb.ipam.asns.filter(asn=asn))
+                return as_list[0] if as_list else None
+            return self.identity_map.get_or_load("ipam.asns", asn, load)
+        except TransientError:
+            raise
         except Exception:
             return None
 
     def get_peer_group_id(self, name: str = "Peers") -> Optional[int]:
         """Finds the ID of a BGP Peer Group by name."""
         try:
-            res = self.nb.plugins.bgp.peer_group.filter(name=name)
-            pg_list = list(res)
-            return pg_list[0].id if pg_list else None
+            def load():
+                pg_list = list(self.nb.plugins.bgp.peer_group.filter(name=name))
+                return pg_list[0].id if pg_list else None
+            return self.identity_map.get_or_load("plugins.bgp.peer_group", name, load)
+        except TransientError:
+            raise
         except Exception:
             return None
-        
\ No newline at end of file
+        
+
+
+def get_shared_client() -> NetBoxClient:
+    """Process-wide NetBoxClient: the pynetbox API object and its connection pool are built once."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = NetBoxClient()
+        return _shared_client
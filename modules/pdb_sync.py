@@ -0,0 +1,94 @@
+from typing import Optional, Dict, List, Any, Iterator, Callable
+
+from modules.bgp_manager import BGPManager
+from modules.ip_manager import is_rejected_write
+from modules.models import SessionPolicy
+from modules.utils import extract_prefix_limits, select_as_set
+
+
+class PdbSyncJob:
+    """
+    Keeps the PeeringDB-driven fields (prefix limit, AS-SET) of every session marked
+    'sync_from_pdb' current. Fleet-wide in a few bulk requests: the sessions are streamed
+    as compact records, their networks fetched with 'asn__in=' batches, and only the
+    changed custom fields are written back with bulk PATCH.
+    """
+    def __init__(self, nb_client, pdb_client, dry_run: bool = False):
+        self.nb_client = nb_client
+        self.pdb = pdb_client
+        self.bgp_mgr = BGPManager(nb_client)
+        self.dry_run = dry_run
+
+    def iter_sessions(self) -> Iterator[SessionPolicy]:
+        yield from self.nb_client.stream("plugins/bgp/session", decode=SessionPolicy.from_json,
+                                         read_ahead=4, parallel=2, cf_sync_from_pdb="true")
+
+    @staticmethod
+    def changed_fields(session: SessionPolicy, net: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The custom fields to update, with the wizard's rules (limit per family, V6 AS-SET for IPv6).
+        A limit or AS-SET missing from PeeringDB keeps the current value, it is never cleared.
+        """
+        limit_v4, limit_v6 = extract_prefix_limits(net)
+        is_v6 = session.family == 6
+        limit = limit_v6 if is_v6 else limit_v4
+        as_set = select_as_set(net.get('irr_as_set'), is_v6)
+        changes = {}
+        if limit and limit != session.prefix_limit:
+            changes["prefix_limit"] = limit
+        if as_set and as_set != session.as_set:
+            changes["as_set"] = as_set
+        return changes
+
+    def run(self, on_change: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        One full pass. 'on_change(row)' is called for every changed session once it is written
+        (or planned, with dry_run). Returns the summary with all rows.
+        """
+        sessions = list(self.iter_sessions())
+        networks = self.pdb.get_networks(s.remote_asn for s in sessions)
+
+        rows: List[Dict[str, Any]] = []
+        planned: List[SessionPolicy] = []
+        not_in_pdb = 0
+        for session in sessions:
+            net = networks.get(session.remote_asn)
+            if not net:
+                not_in_pdb += 1
+                continue
+            changes = self.changed_fields(session, net)
+            if not changes:
+                continue
+            planned.append(session)
+            rows.append({
+                "session_id": session.id, "session_name": session.name, "asn": session.remote_asn,
+                "family": session.family, "status": "planned", "error": None,
+                "changes": {field: {"old": getattr(session, field), "new": value} for field, value in changes.items()},
+            })
+
+        if not self.dry_run and rows:
+            results = self.bgp_mgr.update_sessions([
+                {"id": row["session_id"], "custom_fields": {f: c["new"] for f, c in row["changes"].items()}}
+                for row in rows
+            ])
+            for session, row, (updated, error) in zip(planned, rows, results):
+                row["status"], row["error"] = ("updated", None) if updated else ("failed", str(error))
+                # not refused by NetBox (throttled, 5xx, timeout): the next run simply applies it
+                row["retryable"] = error is not None and not is_rejected_write(error)
+                # the cached session still has the old custom fields
+                self.nb_client.identity_map.invalidate("plugins.bgp.session", session.remote_address_id)
+
+        for row in rows:
+            if on_change:
+                on_change(row)
+
+        return {
+            "sessions": len(sessions),
+            "networks": len(networks),
+            "not_in_peeringdb": not_in_pdb,
+            "changed": sum(1 for r in rows if r["status"] in ("planned", "updated")),
+            "failed": sum(1 for r in rows if r["status"] == "failed"),
+            "retryable": sum(1 for r in rows if r.get("retryable")),
+            "dry_run": self.dry_run,
+            "rows": rows,
+        }
@@ -1,59 +1,167 @@
+import os
+import threading
+import time
 import requests
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterable
+
+from modules.http_transport import CachedHttpClient, ResponseCache, DEFAULT_CACHE_PATH
+from modules.models import IxpPresence
+from modules.request_scheduler import TransientError
+
+# ASNs per 'asn__in=' request (keeps the URL well under the usual limits)
+NET_BATCH_SIZE = 150
 
 class PeeringDBClient:
 
     # interact with the public PeeringDB API.
     BASE_URL = "https://www.peeringdb.com/api"
 
+    # How long a cached response is served without asking PeeringDB (~ one shift)
+    CACHE_TTLS = {
+        "net": 8 * 3600,
+        "netixlan": 8 * 3600,
+    }
+    # ...but a "not found" only briefly: a network / IXP port registered in the meantime must show up
+    EMPTY_CACHE_TTL = 300
+
+    # Our own IXP footprint rarely changes, it is kept in memory for this long
+    PRESENCE_MAP_TTL = 3600
+
+    def __init__(self, mirror=None, mirror_max_age: int = 3600, http: Optional[CachedHttpClient] = None):
+        # Optional PeeringDBMirror: if set (and loaded), lookups are answered from the local SQLite indexes.
+        self.mirror = mirror
+        self.mirror_max_age = mirror_max_age
+        # Pooled keep-alive transport with the persistent response cache
+        self.http = http or CachedHttpClient(
+            cache=ResponseCache(os.getenv("PEERINGDB_CACHE", DEFAULT_CACHE_PATH)),
+            ttls=self.CACHE_TTLS,
+            empty_ttl=self.EMPTY_CACHE_TTL,
+        )
+        # asn -> (fetched_at, {ix_id: presence entry})
+        self._presence_maps = {}
+        self._presence_lock = threading.Lock()
+
     def get_asn_details(self, asn: int) -> Optional[Dict[str, Any]]:
 
         # Fetch ASN details, prefix limits, and IRR AS-SET
+        if self.mirror and self.mirror.ready(self.mirror_max_age):
+            return self.mirror.get_net(asn)
+
         url = f"{self.BASE_URL}/net"
         params = {"asn": asn}
 
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self.http.get_json(url, params=params, timeout=10)
 
             if data['data']:
                 # return the first matching network object
                 return data['data'][0]
             return None
 
+        except TransientError:
+            # rate limited / unavailable is not 'no such network'
+            raise
         except requests.RequestException as e:
             print(f"Error fetching data from PeeringDB: {e}")
             return None
 
+    def get_networks(self, asns: Iterable[int], batch_size: int = NET_BATCH_SIZE) -> Dict[int, Dict[str, Any]]:
+        """
+        Bulk version of get_asn_details: one 'asn__in=' request per 'batch_size' ASNs.
+        Returns {asn: net}; ASNs without a PeeringDB record are left out.
+        Raises requests.RequestException, so a failed batch is not mistaken for missing networks.
+        """
+        asns = sorted(set(asns))
+        if self.mirror and self.mirror.ready(self.mirror_max_age):
+            nets = (self.mirror.get_net(asn) for asn in asns)
+            return {net["asn"]: net for net in nets if net}
+
+        networks = {}
+        for i in range(0, len(asns), batch_size):
+            chunk = asns[i:i + batch_size]
+            data = self.http.get_json(f"{self.BASE_URL}/net",
+                                      params={"asn__in": ",".join(map(str, chunk))}, timeout=60)
+            for net in data['data']:
+                networks[net["asn"]] = net
+        return networks
+
     def get_ixp_presence(self, asn: int) -> List[Dict[str, Any]]:
         """
         Fetches all IXP connections (netixlan) for a given ASN.
         Returns a list of dictionaries containing IXP name, IP addresses
         """
-        url = f"{self.BASE_URL}/netixlan"
-        params = {"asn": asn}
-        ixp_list = []
-
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if data['data']:
-                for entry in data['data']:
-                    ixp_list.append({
-                        "id": entry["id"],
-                        "ix_name": entry["name"],  # e.g., "DE-CIX Frankfurt"
-                        "ix_id": entry["ix_id"],   # PeeringDB ID of the IXP
-                        "ipaddr4": entry["ipaddr4"],
-                        "ipaddr6": entry["ipaddr6"],
-                        "asn": entry["asn"]
-                    })
-            
-            # Sort alphabetically by IXP name for a better output
-            return sorted(ixp_list, key=lambda x: x['ix_name'])
+            return self.fetch_ixp_presence(asn)
 
+        except TransientError:
+            # rate limited / unavailable is not 'no such network'
+            raise
         except requests.RequestException as e:
             print(f"Error fetching IXP data: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def fetch_ixp_presence(self, asn: int) -> List[Dict[str, Any]]:
+        """
+        get_ixp_presence that raises requests.RequestException, for the callers
+        that must not mistake a failed lookup for an ASN without IXPs.
+        """
+        if self.mirror and self.mirror.ready(self.mirror_max_age):
+            return self._to_ixp_list(self.mirror.get_netixlans(asn))
+
+        data = self.http.get_json(f"{self.BASE_URL}/netixlan", params={"asn": asn}, timeout=10)
+        return self._to_ixp_list(data['data'])
+
+    def get_ix_members(self, ix_id: int) -> List[IxpPresence]:
+        """
+        All networks (netixlan entries) connected to one IXP, in one request, as compact records.
+        Raises requests.RequestException, so a failed shard is not mistaken for an empty IXP.
+        """
+        if self.mirror and self.mirror.ready(self.mirror_max_age):
+            entries = self.mirror.get_netixlans_by_ix(ix_id)
+        else:
+            entries = self.http.get_json(f"{self.BASE_URL}/netixlan", params={"ix_id": ix_id}, timeout=30)['data']
+        return [IxpPresence.from_json(entry) for entry in entries]
+
+    def get_ixp_presence_map(self, asn: int, max_age: Optional[int] = None, refresh: bool = False,
+                             strict: bool = False) -> Dict[int, Dict[str, Any]]:
+        """
+        Memoized IXP presence of an ASN as {ix_id: entry}.
+        Built once and reused until it is older than 'max_age' (or refresh=True).
+        strict=True: a failed PeeringDB request raises instead of giving an empty map.
+        """
+        max_age = self.PRESENCE_MAP_TTL if max_age is None else max_age
+        with self._presence_lock:
+            cached = self._presence_maps.get(asn)
+            if cached and not refresh and time.time() - cached[0] < max_age:
+                return cached[1]
+
+            fetch = self.fetch_ixp_presence if strict else self.get_ixp_presence
+            presence_map = {ix['ix_id']: ix for ix in fetch(asn)}
+            # an empty answer is most likely a failed request, do not pin it for an hour
+            if presence_map:
+                self._presence_maps[asn] = (time.time(), presence_map)
+            return presence_map
+
+    def refresh_ixp_presence(self, asn: Optional[int] = None):
+        # Drops the memoized presence of one ASN (or all of them)
+        with self._presence_lock:
+            if asn is None:
+                self._presence_maps.clear()
+            else:
+                self._presence_maps.pop(asn, None)
+
+    @staticmethod
+    def _to_ixp_list(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ixp_list = []
+        for entry in entries or []:
+            ixp_list.append({
+                "id": entry["id"],
+                "ix_name": entry["name"],  # e.g., "DE-CIX Frankfurt"
+                "ix_id": entry["ix_id"],   # PeeringDB ID of the IXP
+                "ipaddr4": entry["ipaddr4"],
+                "ipaddr6": entry["ipaddr6"],
+                "asn": entry["asn"]
+            })
+
+        # Sort alphabetically by IXP name for a better output
+        return sorted(ixp_list, key=lambda x: x['ix_name'])
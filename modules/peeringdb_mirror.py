@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional, Dict, List, Any, Callable
+
+import requests
+
+from modules.http_transport import get_shared_session
+
+
+class PeeringDBMirror:
+    """
+    Local SQLite mirror of the PeeringDB objects the wizard needs
+    (net, ix, ixlan, ixpfx, netixlan).
+    The initial bulk load (a full download or a dump) is an explicit step ('main.py pdb-mirror'),
+    afterwards the lookups keep it current with '?since=' incremental syncs.
+    """
+    BASE_URL = "https://www.peeringdb.com/api"
+
+    # tag -> indexed columns (besides 'id'); the full object is kept as JSON in 'data'
+    TABLES = {
+        "net": ["asn", "name", "irr_as_set"],
+        "ix": ["name"],
+        "ixlan": ["ix_id"],
+        "ixpfx": ["ixlan_id", "prefix", "protocol"],
+        "netixlan": ["net_id", "ix_id", "ixlan_id", "asn", "name", "ipaddr4", "ipaddr6"],
+    }
+    INDEXES = {
+        "net": ["asn"],
+        "ixlan": ["ix_id"],
+        "ixpfx": ["ixlan_id"],
+        "netixlan": ["asn", "ix_id", "net_id"],
+    }
+
+    def __init__(self, db_path: str, base_url: str = BASE_URL,
+                 fetcher: Optional[Callable[[str, Dict[str, Any]], List[Dict[str, Any]]]] = None):
+        self.db_path = db_path
+        self.base_url = base_url
+        # fetcher(tag, params) -> list of objects; injectable for offline use
+        self.fetcher = fetcher or self._http_fetch
+        self.session = get_shared_session()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        # one connection shared between threads, so access is serialized
+        self._lock = threading.RLock()
+        self._initialized = False
+        self._hinted = False
+        self._create_schema()
+
+    @classmethod
+    def from_env(cls) -> Optional["PeeringDBMirror"]:
+        # The mirror is optional: only enabled when PEERINGDB_MIRROR points to a db file.
+        path = os.getenv("PEERINGDB_MIRROR")
+        return cls(path) if path else None
+
+    def _create_schema(self):
+        with self.db:
+            for tag, columns in self.TABLES.items():
+                cols = ", ".join(columns)
+                self.db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {tag} (id INTEGER PRIMARY KEY, {cols}, data TEXT NOT NULL)"
+                )
+            for tag, columns in self.INDEXES.items():
+                for col in columns:
+                    self.db.execute(f"CREATE INDEX IF NOT EXISTS idx_{tag}_{col} ON {tag} ({col})")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (tag TEXT PRIMARY KEY, last_sync INTEGER NOT NULL)"
+            )
+
+    # --- Loading / Syncing ---
+
+    def _http_fetch(self, tag: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = self.session.get(f"{self.base_url}/{tag}", params=params, timeout=120)
+        response.raise_for_status()
+        return response.json().get("data", [])
+
+    def _apply(self, tag: str, objects: List[Dict[str, Any]]) -> int:
+        # Upserts live objects and drops the ones PeeringDB reports as deleted.
+        columns = self.TABLES[tag]
+        placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+        upserts, deletes = [], []
+        for obj in objects:
+            if obj.get("status") == "deleted":
+                deletes.append((obj["id"],))
+                continue
+            upserts.append([obj["id"]] + [obj.get(c) for c in columns] + [json.dumps(obj)])
+
+        with self._lock, self.db:
+            if deletes:
+                self.db.executemany(f"DELETE FROM {tag} WHERE id = ?", deletes)
+            if upserts:
+                self.db.executemany(
+                    f"INSERT OR REPLACE INTO {tag} (id, {', '.join(columns)}, data) VALUES ({placeholders})",
+                    upserts,
+                )
+        return len(upserts) + len(deletes)
+
+    def _set_last_sync(self, tag: str, ts: int):
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO sync_state (tag, last_sync) VALUES (?, ?)", (tag, ts))
+
+    def last_sync(self, tag: str) -> Optional[int]:
+        with self._lock:
+            row = self.db.execute("SELECT last_sync FROM sync_state WHERE tag = ?", (tag,)).fetchone()
+        return row["last_sync"] if row else None
+
+    def load_dump(self, dump: Any, synced_at: Optional[int] = None) -> Dict[str, int]:
+        """
+        Bulk loads a PeeringDB dump, either a path to a JSON file or the parsed dict.
+        Format: {"net": {"data": [...]}, "netixlan": {"data": [...]}, ...}
+        """
+        if isinstance(dump, str):
+            with open(dump, "r", encoding="utf-8") as fh:
+                dump = json.load(fh)
+
+        synced_at = synced_at or int(time.time())
+        counts = {}
+        for tag in self.TABLES:
+            if tag not in dump:
+                continue
+            payload = dump[tag]
+            objects = payload.get("data", []) if isinstance(payload, dict) else payload
+            counts[tag] = self._apply(tag, objects)
+            self._set_last_sync(tag, synced_at)
+        return counts
+
+    def sync(self, full: bool = False, on_tag: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """
+        Initial bulk load for empty tables, '?since=' incremental update otherwise.
+        Every object type is committed on its own, an interrupted first load resumes with the rest.
+        'on_tag(tag, rows)' is called after each type. Returns the number of changed rows per object type.
+        """
+        counts = {}
+        for tag in self.TABLES:
+            # remember the start time, so changes made during the fetch are picked up next time
+            started = int(time.time())
+            since = None if full else self.last_sync(tag)
+            params = {"depth": 0}
+            if since:
+                params["since"] = since
+            counts[tag] = self._apply(tag, self.fetcher(tag, params))
+            self._set_last_sync(tag, started)
+            if on_tag:
+                on_tag(tag, counts[tag])
+        return counts
+
+    def is_initialized(self) -> bool:
+        # every object type had its bulk load (download or dump)
+        if not self._initialized:
+            self._initialized = all(self.last_sync(tag) for tag in self.TABLES)
+        return self._initialized
+
+    def ready(self, max_age: int = 3600) -> bool:
+        """
+        True if the lookups can be answered from the mirror (refreshed incrementally when stale).
+        An empty mirror is never downloaded here, inside a lookup: the caller asks PeeringDB instead.
+        """
+        if not self.is_initialized():
+            if not self._hinted:
+                self._hinted = True
+                print(f"PeeringDB mirror {self.db_path} is empty, run 'main.py pdb-mirror' once; "
+                      f"asking the PeeringDB API until then", file=sys.stderr)
+            return False
+        self.sync_if_stale(max_age)
+        return True
+
+    def is_stale(self, max_age: int) -> bool:
+        oldest = min((self.last_sync(tag) or 0) for tag in self.TABLES)
+        return time.time() - oldest > max_age
+
+    def sync_if_stale(self, max_age: int = 3600) -> bool:
+        # A failed refresh is not fatal: the previous snapshot is still usable.
+        if not self.is_stale(max_age):
+            return False
+        try:
+            self.sync()
+            return True
+        except requests.RequestException as e:
+            print(f"Error syncing PeeringDB mirror, using the local snapshot: {e}", file=sys.stderr)
+            return False
+
+    # --- Lookups ---
+
+    def get_net(self, asn: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.db.execute("SELECT data FROM net WHERE asn = ? LIMIT 1", (asn,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_netixlans(self, asn: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.db.execute("SELECT data FROM netixlan WHERE asn = ? ORDER BY id", (asn,)).fetchall()
+        return [json.loads(r["data"]) for r in rows]
+
+    def get_netixlans_by_ix(self, ix_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.db.execute("SELECT data FROM netixlan WHERE ix_id = ? ORDER BY id", (ix_id,)).fetchall()
+        return [json.loads(r["data"]) for r in rows]
+
+    def get_ixpfxs(self, ix_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT ixpfx.data FROM ixpfx JOIN ixlan ON ixpfx.ixlan_id = ixlan.id WHERE ixlan.ix_id = ?",
+                (ix_id,),
+            ).fetchall()
+        return [json.loads(r["data"]) for r in rows]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import astuple, fields
+from typing import Optional, Dict, List, Any
+
+from modules.ip_manager import IPManager, FILTER_CHUNK_SIZE, normalize_ip
+from modules.models import LocalPort, encode_ip
+
+DEFAULT_INVENTORY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chores-toolbox", "local_ports.sqlite3")
+
+# After a failed rebuild the (stale) inventory is used this long before the next attempt
+BUILD_RETRY_DELAY = 300
+
+_COLUMNS = [f.name for f in fields(LocalPort)]
+
+
+class LocalPortInventory:
+    """
+    Persisted index of our own IXP ports: (ix_id, family) -> local IP, interface, device, site, mask.
+    Built in one bulk pass (our PeeringDB presence, one IP query, one device query) and kept in SQLite,
+    so planning a session needs no NetBox read for the local side. Rebuilt when older than 'max_age'
+    or on demand (build()).
+    """
+    def __init__(self, nb_client, pdb_client, my_asn: int, path: str = DEFAULT_INVENTORY_PATH,
+                 max_age: int = 24 * 3600):
+        self.nb_client = nb_client
+        self.pdb = pdb_client
+        self.my_asn = my_asn
+        self.max_age = max_age
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS ports ("
+                " ix_id INTEGER NOT NULL, family INTEGER NOT NULL, ix_name TEXT, ip TEXT NOT NULL,"
+                " prefixlen INTEGER NOT NULL, ip_id INTEGER NOT NULL, interface_id INTEGER, interface_name TEXT,"
+                " device_id INTEGER NOT NULL, device_name TEXT, site_id INTEGER NOT NULL, site_name TEXT,"
+                " PRIMARY KEY (ix_id, family))"
+            )
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        self.built_at = 0.0
+        self._retry_at = 0.0
+        self._ports: Dict[tuple, LocalPort] = {}
+        self._read()
+
+    @classmethod
+    def from_env(cls, nb_client, pdb_client, my_asn: int) -> "LocalPortInventory":
+        return cls(nb_client, pdb_client, my_asn, os.getenv("LOCAL_PORT_INVENTORY", DEFAULT_INVENTORY_PATH))
+
+    def _read(self):
+        ports = {}
+        for row in self.db.execute(f"SELECT {', '.join(_COLUMNS)} FROM ports"):
+            values = dict(zip(_COLUMNS, row))
+            # IPv6 values do not fit SQLite integers, addresses are stored as text
+            values["ip"] = int(values["ip"])
+            values["ix_name"] = sys.intern(values["ix_name"] or "")
+            port = LocalPort(**values)
+            ports[(port.ix_id, port.family)] = port
+        built = self.db.execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        self._ports, self.built_at = ports, built[0] if built else 0.0
+
+    def build(self) -> List[LocalPort]:
+        """
+        One bulk pass over PeeringDB (our netixlans) and NetBox (our IPs and their devices).
+        Raises, keeping the previous inventory and its age, when PeeringDB fails or nothing resolves.
+        """
+        # strict: a failed PeeringDB request must not look like "no ports"
+        presence = self.pdb.get_ixp_presence_map(self.my_asn, refresh=True, strict=True)
+        if not presence:
+            raise RuntimeError(f"AS{self.my_asn} has no IXP presence in PeeringDB, the port inventory is kept as is")
+        ip_mgr = IPManager(self.nb_client)
+        local = [(ix_id, ix, family, ip) for ix_id, ix in presence.items()
+                 for family, ip in ((4, ix['ipaddr4']), (6, ix['ipaddr6'])) if ip]
+        ip_objs = ip_mgr.get_ip_addresses(ip for *_, ip in local)
+
+        device_ids = sorted({IPManager.device_id_of(o) for o in ip_objs.values()} - {None})
+        devices = {}
+        for i in range(0, len(device_ids), FILTER_CHUNK_SIZE):
+            for device in self.nb_client.nb.dcim.devices.filter(id=device_ids[i:i + FILTER_CHUNK_SIZE]):
+                devices[device.id] = device
+        self.nb_client.identity_map.put_many("dcim.devices", devices)
+
+        ports = []
+        for ix_id, ix, family, ip in local:
+            ip_obj = ip_objs.get(normalize_ip(ip))
+            device = devices.get(IPManager.device_id_of(ip_obj))
+            if not device or not device.site:
+                continue
+            value, prefixlen, _ = encode_ip(str(ip_obj.address))
+            interface = ip_obj.assigned_object
+            ports.append(LocalPort(
+                ix_id=ix_id, family=family, ix_name=sys.intern(ix['ix_name']), ip=value, prefixlen=prefixlen,
+                ip_id=ip_obj.id, interface_id=interface.id, interface_name=getattr(interface, "name", None),
+                device_id=device.id, device_name=device.name, site_id=device.site.id, site_name=device.site.name,
+            ))
+
+        if not ports:
+            raise RuntimeError(f"None of our {len(local)} IXP address(es) resolved to a NetBox device, "
+                               f"the port inventory is kept as is")
+
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM ports")
+            self.db.executemany(
+                f"INSERT INTO ports ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [tuple(str(v) if name == "ip" else v for name, v in zip(_COLUMNS, astuple(p))) for p in ports],
+            )
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (time.time(),))
+            self._read()
+        return ports
+
+    def is_stale(self) -> bool:
+        return time.time() - self.built_at > self.max_age
+
+    def ensure_fresh(self):
+        # parallel planners (batch mode) wait for one rebuild instead of each doing their own
+        if self.is_stale() and time.time() >= self._retry_at:
+            with self._build_lock:
+                if self.is_stale() and time.time() >= self._retry_at:
+                    try:
+                        self.build()
+                    except Exception as e:
+                        # the planner reads NetBox for the ports missing here; try again a bit later
+                        self._retry_at = time.time() + BUILD_RETRY_DELAY
+                        print(f"⚠️ Local port inventory not rebuilt: {e}", file=sys.stderr)
+
+    def get(self, ix_id: int, family: int, address: Optional[str] = None) -> Optional[LocalPort]:
+        """
+        Our port on the IXP. With 'address' (our IP as PeeringDB has it now) an entry for another
+        address is treated as outdated and not returned.
+        """
+        port = self._ports.get((ix_id, family))
+        if port and address and encode_ip(address)[0] != port.ip:
+            return None
+        return port
+
+    def ports(self) -> List[LocalPort]:
+        return sorted(self._ports.values(), key=lambda p: (p.ix_name or "", p.family))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ports": len(self._ports), "age": int(time.time() - self.built_at) if self.built_at else None}
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,95 @@
+import ipaddress
+import time
+from typing import Optional, Dict, Any
+
+from modules.models import Prefix
+
+
+class _Node:
+    # Binary trie node; __slots__ keeps one node at ~3 pointers
+    __slots__ = ("zero", "one", "value")
+
+    def __init__(self):
+        self.zero = None
+        self.one = None
+        self.value = None
+
+
+class PrefixIndex:
+    """
+    In-memory longest-prefix-match index over NetBox prefixes.
+    One binary radix tree per address family, keyed by the integer value of the network,
+    so lookups never touch the API. Optionally scoped by role / tag (e.g. only the IXP LANs).
+    """
+    WIDTH = {4: 32, 6: 128}
+
+    def __init__(self, nb_client=None, role: Optional[str] = None, tag: Optional[str] = None, max_age: int = 900):
+        self.nb_client = nb_client
+        self.filters = {}
+        if role:
+            self.filters["role"] = role
+        if tag:
+            self.filters["tag"] = tag
+        self.max_age = max_age
+        self.loaded_at = 0.0
+        self.size = 0
+        self._roots = {4: _Node(), 6: _Node()}
+
+    def insert(self, prefix: str, value: Any):
+        network = ipaddress.ip_network(str(prefix), strict=False)
+        if self._insert(self._roots, network.version, int(network.network_address), network.prefixlen, value):
+            self.size += 1
+
+    def _insert(self, roots, family: int, key: int, prefixlen: int, value: Any) -> bool:
+        # Returns True if the prefix was not in the tree yet
+        width = self.WIDTH[family]
+        node = roots[family]
+        for bit in range(width - 1, width - 1 - prefixlen, -1):
+            if (key >> bit) & 1:
+                if node.one is None:
+                    node.one = _Node()
+                node = node.one
+            else:
+                if node.zero is None:
+                    node.zero = _Node()
+                node = node.zero
+        is_new = node.value is None
+        node.value = value
+        return is_new
+
+    def lookup(self, ip: str) -> Optional[Any]:
+        # Walks down the tree as far as the address bits allow, remembering the last (longest) match
+        host = ipaddress.ip_address(str(ip).split('/')[0])
+        width = self.WIDTH[host.version]
+        key = int(host)
+        node = self._roots[host.version]
+        best = node.value
+        for bit in range(width - 1, -1, -1):
+            node = node.one if (key >> bit) & 1 else node.zero
+            if node is None:
+                break
+            if node.value is not None:
+                best = node.value
+        return best
+
+    def load(self):
+        """(Re)builds the index from NetBox with one streamed, filtered prefix listing (brief records)."""
+        # built on the side and swapped in, so concurrent lookups never see a half-built tree
+        roots = {4: _Node(), 6: _Node()}
+        size = 0
+        for prefix in self.nb_client.stream("ipam/prefixes", decode=Prefix.from_json, brief=True,
+                                            parallel=4, read_ahead=8, **self.filters):
+            size += self._insert(roots, prefix.family, prefix.network, prefix.prefixlen, prefix)
+        self._roots, self.size = roots, size
+        self.loaded_at = time.time()
+
+    def is_stale(self) -> bool:
+        return time.time() - self.loaded_at > self.max_age
+
+    def ensure_fresh(self):
+        # Refresh policy: rebuild when older than max_age
+        if self.is_stale():
+            self.load()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"prefixes": self.size, "age": int(time.time() - self.loaded_at) if self.loaded_at else None}
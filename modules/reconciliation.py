@@ -0,0 +1,277 @@
+import csv
+import ipaddress
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import as_completed
+from typing import Optional, Dict, List, Any, Iterator
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.prompt import Prompt
+from rich.table import Table
+from rich.markup import escape
+
+from modules.base_tool import BaseTool
+from modules.ip_manager import IPManager, normalize_ip
+from modules.models import BgpSession, PlannedChange
+from modules.instrumentation import ContextThreadPoolExecutor
+
+# Diff categories
+MISSING = "missing"          # we peer with the ASN at this IXP, but not on this address family
+IP_CHANGED = "ip_changed"    # the ASN is still at the IXP, with another IP on the same family
+STALE = "stale"              # the remote IP is registered to a different ASN now
+ORPHANED = "orphaned"        # the ASN is not at this IXP anymore, or we are not (no IXP in the row)
+
+DIFF_FIELDS = ["kind", "ix_id", "ix_name", "asn", "family", "session_id", "session_name",
+               "device", "netbox_ip", "peeringdb_ip"]
+
+
+class DiffWriter:
+    """
+    Streams diff rows to a JSON (array) or CSV file as they are produced,
+    so the full diff never has to be kept in memory. Thread-safe.
+    """
+    def __init__(self, path: str, fmt: str = "json"):
+        if fmt not in ("json", "csv"):
+            raise ValueError(f"Unknown diff format: {fmt}")
+        self.fmt = fmt
+        self._fh = open(path, "w", encoding="utf-8", newline="")
+        self._lock = threading.Lock()
+        self._first = True
+        self.counts = {MISSING: 0, IP_CHANGED: 0, STALE: 0, ORPHANED: 0}
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._fh, fieldnames=DIFF_FIELDS)
+            self._csv.writeheader()
+        else:
+            self._fh.write("[\n")
+
+    def write(self, change: PlannedChange):
+        row = change.as_row()
+        with self._lock:
+            self.counts[change.kind] += 1
+            if self.fmt == "csv":
+                self._csv.writerow(row)
+            else:
+                self._fh.write(("" if self._first else ",\n") + json.dumps(row))
+                self._first = False
+
+    def close(self):
+        with self._lock:
+            if self.fmt == "json":
+                self._fh.write("\n]\n")
+            self._fh.close()
+
+
+class ReconciliationEngine:
+    """
+    Fleet-wide PeeringDB <-> NetBox comparison of the IXP peering sessions.
+    Work is sharded per IXP of our PeeringDB presence: each shard streams the sessions on our
+    local addresses there, shards run in parallel and only one shard per worker is held in memory.
+    One more pass over every peer_ixp session finds the rest: a session on another local address
+    but inside an IXP LAN (the network of our address there) is diffed with that IXP, one outside
+    every LAN is orphaned (e.g. left over at an IXP we are not present at anymore).
+    """
+    def __init__(self, nb_client, pdb_client, my_asn: int, workers: int = 4):
+        self.nb_client = nb_client
+        self.ip_mgr = IPManager(nb_client)
+        self.pdb = pdb_client
+        self.my_asn = my_asn
+        self.workers = workers
+
+    def build_shards(self) -> List[Dict[str, Any]]:
+        """
+        One shard per IXP where we are present: our local IP objects and the LANs they are on.
+        A shard with a local IP missing from NetBox gets an 'error' and is not diffed.
+        """
+        # a failed lookup must not look like "present nowhere": every session would be orphaned
+        my_ixps = self.pdb.get_ixp_presence_map(self.my_asn, strict=True)
+        if not my_ixps:
+            raise RuntimeError(f"AS{self.my_asn} has no IXP presence in PeeringDB, nothing to reconcile against")
+        local_ips = [normalize_ip(ip) for ix in my_ixps.values() for ip in (ix['ipaddr4'], ix['ipaddr6']) if ip]
+        ip_objs = self.ip_mgr.get_ip_addresses(local_ips)
+        # the address mask is the peering LAN; without a usable mask (or IP object) the NetBox prefix is
+        masks = {}
+        for address, ip_obj in ip_objs.items():
+            network = ipaddress.ip_interface(str(ip_obj.address)).network
+            if network.num_addresses > 1:
+                masks[address] = network
+        prefixes = self.ip_mgr.get_prefixes_for_ips([ip for ip in local_ips if ip not in masks])
+
+        shards = []
+        for ix_id, ix in sorted(my_ixps.items()):
+            ids, lans, missing, unknown_lans = [], [], [], []
+            for ip in (ix['ipaddr4'], ix['ipaddr6']):
+                if not ip:
+                    continue
+                address = normalize_ip(ip)
+                if address in ip_objs:
+                    ids.append(ip_objs[address].id)
+                else:
+                    missing.append(address)
+                if address in masks:
+                    network = masks[address]
+                elif address in prefixes:
+                    network = ipaddress.ip_network(str(prefixes[address].prefix))
+                else:
+                    unknown_lans.append(address)
+                    continue
+                # (family, first, last) on integer addresses
+                lans.append((network.version, int(network.network_address), int(network.broadcast_address)))
+            shard = {"ix_id": ix_id, "ix_name": ix['ix_name'], "local_ip_ids": ids, "lans": lans,
+                     "unknown_lans": unknown_lans, "extra": []}
+            if missing:
+                shard["error"] = f"local IP(s) {', '.join(missing)} not found in NetBox"
+            shards.append(shard)
+        return shards
+
+    def iter_sessions(self, local_ip_ids: Optional[List[int]] = None) -> Iterator[BgpSession]:
+        # Raw JSON pages decoded into compact records, no pynetbox Record per session
+        filters = {"local_address_id": local_ip_ids} if local_ip_ids is not None else {}
+        yield from self.nb_client.stream("plugins/bgp/session", decode=BgpSession.from_json, read_ahead=4, parallel=2,
+                                         cf_peer_type="peer_ixp", **filters)
+
+    def sweep_sessions(self, shards: List[Dict[str, Any]], writer: DiffWriter) -> int:
+        """
+        Streams every IXP session once, for the ones the shards do not stream themselves.
+        In an IXP LAN: kept in that shard's "extra" list (a renumbered local side, rare);
+        outside every LAN: written as ORPHANED right away. Returns the number of orphans.
+        Orphans are only reported when the LAN of every IXP is known.
+        """
+        by_local_ip = {ip_id: shard for shard in shards for ip_id in shard["local_ip_ids"]}
+        can_orphan = not any(shard["unknown_lans"] for shard in shards)
+        orphaned = 0
+        for session in self.iter_sessions():
+            if session.local_address_id in by_local_ip:
+                continue
+            shard = next((s for s in shards for family, first, last in s["lans"]
+                          if family == session.family and first <= session.remote_ip <= last), None)
+            if shard is not None:
+                if "error" not in shard:
+                    shard["extra"].append(session)
+            elif can_orphan:
+                # not on any IXP we are at (anymore): nothing in PeeringDB backs the session
+                writer.write(PlannedChange(ORPHANED, None, "", session.remote_asn, session.family, session))
+                orphaned += 1
+        return orphaned
+
+    def diff_shard(self, shard: Dict[str, Any]) -> Iterator[PlannedChange]:
+        members = self.pdb.get_ix_members(shard["ix_id"])
+
+        # PeeringDB view of the IXP, on integer addresses: ip -> asn, (asn, family) -> ips
+        ip_owner = {}
+        asn_ips = {}
+        for m in members:
+            for family, ip in m.addresses():
+                ip_owner[(family, ip)] = m.asn
+                asn_ips.setdefault((m.asn, family), set()).add(ip)
+        present_asns = {asn for asn, _ in asn_ips}
+
+        def change(kind, asn, family, session=None, peeringdb_ips=()):
+            return PlannedChange(kind, shard["ix_id"], shard["ix_name"], asn, family, session, tuple(peeringdb_ips))
+
+        # (asn, family) pairs that have a session on this IXP
+        covered = set()
+        for session in itertools.chain(self.iter_sessions(shard["local_ip_ids"]), shard["extra"]):
+            asn, family, ip = session.remote_asn, session.family, session.remote_ip
+            covered.add((asn, family))
+            if ip in asn_ips.get((asn, family), ()):
+                continue
+            if (family, ip) in ip_owner:
+                # the address was handed over to another network
+                yield change(STALE, asn, family, session, asn_ips.get((asn, family), ()))
+            elif asn not in present_asns:
+                yield change(ORPHANED, asn, family, session)
+            elif (asn, family) in asn_ips:
+                yield change(IP_CHANGED, asn, family, session, asn_ips[(asn, family)])
+            else:
+                # the peer dropped this family at the IXP
+                yield change(ORPHANED, asn, family, session)
+
+        peered_asns = {asn for asn, _ in covered}
+        for (asn, family), ips in sorted(asn_ips.items()):
+            if asn in peered_asns and (asn, family) not in covered and asn != self.my_asn:
+                for ip in sorted(ips):
+                    yield change(MISSING, asn, family, peeringdb_ips=(ip,))
+
+    def run(self, writer: DiffWriter, on_shard=None) -> Dict[str, Any]:
+        """
+        Reconciles every shard and streams the rows into 'writer'.
+        'on_shard(shard, rows, error)' is called after each IXP.
+        """
+        shards = self.build_shards()
+        errors = {}
+        unknown = [ip for shard in shards for ip in shard["unknown_lans"]]
+        if unknown:
+            errors["orphaned"] = f"not checked, no NetBox prefix for local IP(s) {', '.join(unknown)}"
+        orphaned = self.sweep_sessions(shards, writer)
+        for shard in shards:
+            if "error" in shard:
+                errors[shard["ix_name"]] = shard["error"]
+                if on_shard:
+                    on_shard(shard, 0, shard["error"])
+
+        def process(shard):
+            count = 0
+            for planned in self.diff_shard(shard):
+                writer.write(planned)
+                count += 1
+            return count
+
+        with ContextThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(process, shard): shard for shard in shards if "error" not in shard}
+            for future in as_completed(futures):
+                shard = futures[future]
+                error: Optional[Exception] = future.exception()
+                if error:
+                    errors[shard["ix_name"]] = str(error)
+                if on_shard:
+                    on_shard(shard, 0 if error else future.result(), error)
+
+        return {"shards": len(shards), "orphaned_outside_ixps": orphaned, "errors": errors,
+                "counts": dict(writer.counts)}
+
+
+class ReconciliationTool(BaseTool):
+
+    @property
+    def name(self):
+        return "Reconcile IXP Sessions with PeeringDB"
+
+    def run(self):
+        from modules.netbox_client import get_shared_client
+        from modules.ixp_peering import pdb_client, MY_ASN
+
+        console = Console(emoji=False)
+        console.clear()
+        console.print(Panel("[bold cyan]RECONCILIATION: NetBox IXP sessions vs. PeeringDB[/bold cyan]", border_style="cyan"))
+
+        fmt = Prompt.ask("Export format", choices=["json", "csv"], default="csv")
+        path = Prompt.ask("Output file", default=os.path.join(os.getcwd(), f"ixp_diff.{fmt}"))
+
+        nb_client = get_shared_client()
+        nb_client.identity_map.reset()
+        engine = ReconciliationEngine(nb_client, pdb_client, MY_ASN)
+        writer = DiffWriter(path, fmt)
+
+        def on_shard(shard, rows, error):
+            if error:
+                console.print(f"[bold red]❌ {escape(shard['ix_name'])}: {escape(str(error))}[/bold red]")
+            elif rows:
+                console.print(f"[yellow]{escape(shard['ix_name'])}: {rows} difference(s)[/yellow]")
+
+        try:
+            with console.status("[bold green]Comparing sessions per IXP...[/bold green]"):
+                summary = engine.run(writer, on_shard=on_shard)
+        finally:
+            writer.close()
+
+        table = Table(title=f"Reconciliation over {summary['shards']} IXP(s)", show_header=True, header_style="bold magenta")
+        table.add_column("Kind")
+        table.add_column("Count", justify="right")
+        for kind, count in summary["counts"].items():
+            table.add_row(kind, str(count))
+        console.print(table)
+        console.print(f"[green]Diff written to {escape(path)}[/green]")
+        input("\nPress Enter to return...")
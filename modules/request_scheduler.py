@@ -0,0 +1,176 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Callable
+from urllib.parse import urlparse
+
+import requests
+
+from modules.instrumentation import TRACER
+
+# Answers that mean "not now" rather than "no": retried, and they shrink the host's concurrency
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Safe to send twice; writes are only retried on 429 (rejected before processing)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class TransientError(requests.RequestException):
+    """
+    The upstream was rate limiting or unavailable for every attempt (429, 5xx, timeout).
+    Unlike an empty answer this says nothing about the data: callers must not map it to 'not found'.
+    """
+    def __init__(self, message: str, host: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.host = host
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Seconds ('120') or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBudget:
+    """
+    Adaptive concurrency limit of one host (AIMD): +1 parallel request per window of successes,
+    halved on a 429/5xx/timeout (at most once per 'hold' seconds, the requests already in flight
+    were sent under the old limit). A Retry-After pauses every request to the host.
+    """
+    def __init__(self, host: str, max_concurrency: int, min_concurrency: int = 1, hold: float = 1.0):
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.hold = hold
+        # optimistic start: the first throttling answer brings it down
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self._decrease_after = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                pause = self.blocked_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    self.requests += 1
+                    return
+                else:
+                    self._cond.wait()
+
+    def release(self, ok: bool, retry_after: Optional[float] = None):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if ok:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            else:
+                self.throttled += 1
+                if now >= self._decrease_after:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._decrease_after = now + self.hold
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": int(self.limit), "in_flight": self.in_flight, "requests": self.requests,
+                "throttled": self.throttled}
+
+
+class RequestScheduler:
+    """
+    Shared by every HTTP session of the process (NetBox, PeeringDB), see ScheduledAdapter.
+    Per-host budgets (adaptive concurrency, Retry-After pauses), retries with jittered
+    exponential backoff, and TransientError once the attempts are used up.
+
+    Per-host maximum: HTTP_HOST_CONCURRENCY="www.peeringdb.com=4,netbox.example.net=16".
+    """
+    def __init__(self, default_concurrency: int, max_attempts: int = 5, backoff_base: float = 0.5,
+                 backoff_cap: float = 30.0, max_retry_after: float = 120.0,
+                 host_concurrency: Optional[Dict[str, int]] = None):
+        self.default_concurrency = default_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # a longer Retry-After is not waited for, the caller gets the TransientError right away
+        self.max_retry_after = max_retry_after
+        self.host_concurrency = host_concurrency or {}
+        self._budgets: Dict[str, HostBudget] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, default_concurrency: int) -> "RequestScheduler":
+        hosts = {}
+        for entry in os.getenv("HTTP_HOST_CONCURRENCY", "").split(","):
+            host, _, value = entry.partition("=")
+            if host.strip() and value.strip().isdigit():
+                hosts[host.strip()] = int(value)
+        return cls(default_concurrency, max_attempts=int(os.getenv("HTTP_MAX_ATTEMPTS", "5")), host_concurrency=hosts)
+
+    def budget(self, host: str) -> HostBudget:
+        # 'host' is host[:port], the env may name either
+        with self._lock:
+            budget = self._budgets.get(host)
+            if budget is None:
+                limit = self.host_concurrency.get(host, self.host_concurrency.get(host.split(":")[0], self.default_concurrency))
+                budget = self._budgets[host] = HostBudget(host, limit)
+            return budget
+
+    def backoff(self, attempt: int) -> float:
+        # "full jitter": workers that failed together do not come back together
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def send(self, request: requests.PreparedRequest, send: Callable[[], requests.Response],
+             service: str = "http") -> requests.Response:
+        host = urlparse(request.url).netloc
+        budget = self.budget(host)
+        idempotent = request.method in IDEMPOTENT_METHODS
+        for attempt in range(1, self.max_attempts + 1):
+            budget.acquire()
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                budget.release(ok=False)
+                # a write may have reached the server, only a failed connect is safe to repeat
+                if attempt == self.max_attempts or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                    raise TransientError(f"{host}: {e.__class__.__name__} after {attempt} attempt(s)", host) from e
+                delay = self.backoff(attempt)
+            else:
+                status = response.status_code
+                if status not in RETRY_STATUSES or (not idempotent and status != 429):
+                    budget.release(ok=True)
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                budget.release(ok=False, retry_after=min(retry_after, self.max_retry_after) if retry_after else None)
+                if attempt == self.max_attempts or (retry_after or 0) > self.max_retry_after:
+                    raise TransientError(f"{host}: HTTP {status} after {attempt} attempt(s)"
+                                         + (f", retry after {retry_after:.0f}s" if retry_after else ""),
+                                         host, status, retry_after)
+                response.close()
+                # with Retry-After the budget itself holds every request to the host back
+                delay = 0.0 if retry_after is not None else self.backoff(attempt)
+            TRACER.record_retry(service, request.url)
+            if delay:
+                time.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {host: budget.stats() for host, budget in self._budgets.items()}
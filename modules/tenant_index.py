@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, List, Set, Any
+
+from modules.models import Tenant
+from modules.strategies import StrictAlphanumericStrategy, UnderscoreStrategy
+
+DEFAULT_ASN_MAP_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chores-toolbox", "asn_tenants.json")
+
+# Legal forms dropped from the end of a name before matching ("IT.Gate S.p.A." ~ "ITGate")
+LEGAL_SUFFIXES = ("spa", "srl", "inc", "ltd", "llc", "limited", "gmbh", "ag", "bv", "nv", "sa", "sas", "sarl",
+                  "ab", "as", "oy", "plc", "corp", "co", "kft", "zrt", "nyrt", "bt", "sro", "spzoo")
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TenantIndex:
+    """
+    Local fuzzy index over all NetBox tenants, loaded with one 'brief' listing.
+    Names are normalized with the naming strategies (punctuation and legal form removed),
+    matched on character trigrams and word tokens, so PeeringDB org names find their tenant
+    without server-side 'q' searches.
+    """
+    MIN_SCORE = 0.35
+
+    def __init__(self, nb_client, max_age: int = 900):
+        self.nb_client = nb_client
+        self.max_age = max_age
+        self.loaded_at = 0.0
+        self._strict = StrictAlphanumericStrategy()
+        self._words = UnderscoreStrategy()
+        self._tenants: Dict[int, Tenant] = {}
+        self._keys: Dict[int, str] = {}
+        self._tokens: Dict[int, Set[str]] = {}
+        self._grams: Dict[str, Set[int]] = {}
+
+    def normalize(self, name: str) -> str:
+        # Only whole trailing words are legal forms: "Telia AS" -> "telia", "Atlas" stays "atlas"
+        words = [w for w in self._words.sanitize(name).lower().split("_") if w]
+        while len(words) > 1:
+            if words[-1] in LEGAL_SUFFIXES:
+                words.pop()
+                continue
+            # dotted forms are split into letters: "S.p.A." -> s, p, a
+            letters = 0
+            while letters < len(words) - 1 and len(words[-1 - letters]) == 1:
+                letters += 1
+            if letters and "".join(words[-letters:]) in LEGAL_SUFFIXES:
+                del words[-letters:]
+                continue
+            break
+        return self._strict.sanitize("".join(words))
+
+    def tokens(self, name: str) -> Set[str]:
+        return {t for t in self._words.sanitize(name).lower().split("_") if len(t) > 2 and t not in LEGAL_SUFFIXES}
+
+    def load(self):
+        """(Re)builds the index; built on the side and swapped in like the prefix index."""
+        tenants, keys, tokens, grams = {}, {}, {}, {}
+        for tenant in self.nb_client.stream("tenancy/tenants", decode=Tenant.from_json, brief=True):
+            tenants[tenant.id] = tenant
+            # the slug often carries the short brand name, it is searchable too
+            keys[tenant.id] = self.normalize(tenant.name)
+            tokens[tenant.id] = self.tokens(tenant.name) | self.tokens(tenant.slug)
+            for gram in _trigrams(keys[tenant.id]):
+                grams.setdefault(gram, set()).add(tenant.id)
+        self._tenants, self._keys, self._tokens, self._grams = tenants, keys, tokens, grams
+        self.loaded_at = time.time()
+
+    def is_stale(self) -> bool:
+        return time.time() - self.loaded_at > self.max_age
+
+    def ensure_fresh(self):
+        if self.is_stale():
+            self.load()
+
+    def get(self, tenant_id: int) -> Optional[Tenant]:
+        return self._tenants.get(tenant_id)
+
+    def search(self, term: str, limit: int = 10) -> List[Tenant]:
+        """Best matches first; an exact normalized match is returned alone."""
+        self.ensure_fresh()
+        key = self.normalize(term)
+        if not key:
+            return []
+        exact = [t for tid, t in self._tenants.items() if self._keys[tid] == key]
+        if exact:
+            return exact
+
+        term_grams = _trigrams(key)
+        term_tokens = self.tokens(term)
+        candidates = set()
+        for gram in term_grams:
+            candidates |= self._grams.get(gram, set())
+
+        scored = []
+        for tid in candidates:
+            tenant_key = self._keys[tid]
+            tenant_grams = _trigrams(tenant_key)
+            score = 2 * len(term_grams & tenant_grams) / (len(term_grams) + len(tenant_grams))
+            if term_tokens and self._tokens[tid]:
+                score = max(score, len(term_tokens & self._tokens[tid]) / len(term_tokens))
+            if len(key) > 3 and (key in tenant_key or tenant_key in key):
+                score = max(score, 0.8)
+            if score >= self.MIN_SCORE:
+                scored.append((score, self._tenants[tid].name, tid))
+
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [self._tenants[tid] for _, _, tid in scored[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tenants": len(self._tenants), "age": int(time.time() - self.loaded_at) if self.loaded_at else None}
+
+
+class AsnTenantMap:
+    """
+    Persisted ASN -> tenant ID choices (JSON file), so a returning peer
+    gets its tenant without any search.
+    """
+    def __init__(self, path: str = DEFAULT_ASN_MAP_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map: Dict[int, int] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    self._map = {int(asn): int(tid) for asn, tid in json.load(fh).items()}
+            except (OSError, ValueError):
+                # a damaged file only costs the remembered choices
+                self._map = {}
+
+    @classmethod
+    def from_env(cls) -> "AsnTenantMap":
+        return cls(os.getenv("TENANT_ASN_MAP", DEFAULT_ASN_MAP_PATH))
+
+    def get(self, asn: int) -> Optional[int]:
+        return self._map.get(asn)
+
+    def remember(self, asn: int, tenant_id: int):
+        with self._lock:
+            if self._map.get(asn) == tenant_id:
+                return
+            self._map[asn] = tenant_id
+            self._save()
+
+    def forget(self, asn: int):
+        with self._lock:
+            if self._map.pop(asn, None) is not None:
+                self._save()
+
+    def _save(self):
+        # written to a temp file and renamed, so a crash never leaves half a file
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({str(k): v for k, v in sorted(self._map.items())}, fh, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,53 @@
+import importlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from modules.base_tool import BaseTool
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Menu entry metadata: enough to draw the menu without importing the tool."""
+    name: str
+    module: str
+    class_name: str
+
+
+# Every menu tool, in menu order. New tools only need a line here,
+# their module (and its pynetbox / requests imports) is loaded when first selected.
+# The name must equal the tool's 'name' property, checked when the tool is loaded.
+TOOLS: List[ToolSpec] = [
+    ToolSpec("Create Peering at IXP", "modules.ixp_peering", "IxpPeeringTool"),
+    ToolSpec("Reconcile IXP Sessions with PeeringDB", "modules.reconciliation", "ReconciliationTool"),
+    ToolSpec("Render Router BGP Configs", "modules.config_render", "ConfigRenderTool"),
+    # ToolSpec("Create PNI Peering", "modules.pni_peering", "PniPeeringTool"),
+]
+
+
+class ToolRegistry:
+    """
+    Lazy registry of BaseTool subclasses.
+    A tool is imported and instantiated on first use, then the same instance is reused,
+    so per-tool state (e.g. the IXP prefix index) survives between menu iterations.
+    """
+    def __init__(self, specs: Optional[List[ToolSpec]] = None):
+        self.specs = list(specs if specs is not None else TOOLS)
+        self._instances: Dict[str, BaseTool] = {}
+
+    def names(self) -> List[str]:
+        return [spec.name for spec in self.specs]
+
+    def get(self, index: int) -> BaseTool:
+        spec = self.specs[index]
+        tool = self._instances.get(spec.name)
+        if tool is None:
+            cls = getattr(importlib.import_module(spec.module), spec.class_name)
+            if not issubclass(cls, BaseTool):
+                raise TypeError(f"{spec.module}.{spec.class_name} is not a BaseTool")
+            tool = cls()
+            # the menu label is written here so the menu needs no import: it must not drift from the tool
+            if tool.name != spec.name:
+                raise TypeError(f"{spec.module}.{spec.class_name} is named '{tool.name}', "
+                                f"but registered as '{spec.name}' in TOOLS")
+            self._instances[spec.name] = tool
+        return tool
@@ -4,20 +4,68 @@ from rich.markup import escape
 
 console = Console()
 
-def get_validated_prefix_limits(net_info):
+def extract_prefix_limits(net_info):
     """
-    exctracts prefix-limits from the PeeringDB data
-    If the limit is missing, or 0, it'll interactively ask the user to enter a limit.
+    extracts prefix-limits from the PeeringDB data, without asking anything.
     
     Returns:
-        tuple: (limit_v4, limit_v6) integers
+        tuple: (limit_v4, limit_v6) integers, 0 if missing
     """
-    # 1. extract raw data
     raw_v4 = net_info.get('info_prefix_limit_v4') or net_info.get('info_prefixes4') or 0
     raw_v6 = net_info.get('info_prefix_limit_v6') or net_info.get('info_prefixes6') or 0
+    return int(raw_v4), int(raw_v6)
+
+def select_as_set(irr_as_set, is_v6):
+    """
+    AS-SET selection logic: the first AS-SET from PeeringDB 'irr_as_set',
+    for IPv6 sessions a 'V6' set among the first two wins.
+    """
+    as_set_parts = (irr_as_set or "").strip().split(' ')
+    
+    final_as_set = as_set_parts[0] if as_set_parts else ""
+    if as_set_parts:
+        candidates = as_set_parts[:2] 
+        for candidate in candidates:
+            if is_v6 and "V6" in candidate.upper():
+                final_as_set = candidate
+                break
+    return final_as_set
+
+def suggest_prefix_limits(net_info, irr_index=None):
+    """
+    PeeringDB prefix-limits; a missing one is filled from the local IRR index (if given),
+    counted over the same AS-SET the session gets (see select_as_set).
+
+    Returns:
+        tuple: (limit_v4, limit_v6, source) - source is 'irr' if any limit came from the IRR
+    """
+    limit_v4, limit_v6 = extract_prefix_limits(net_info)
+    if irr_index is None or (limit_v4 and limit_v6):
+        return limit_v4, limit_v6, None
+    irr_as_set = net_info.get('irr_as_set')
+    irr_v4, irr_v6 = irr_index.suggest_limits(select_as_set(irr_as_set, False), select_as_set(irr_as_set, True),
+                                              net_info.get('asn'))
+    source = 'irr' if (not limit_v4 and irr_v4) or (not limit_v6 and irr_v6) else None
+    return limit_v4 or irr_v4, limit_v6 or irr_v6, source
+
+def get_validated_prefix_limits(net_info, irr_index=None):
+    """
+    exctracts prefix-limits from the PeeringDB data, missing ones are suggested from the IRR index.
+    If the limit is still missing, or 0, it'll interactively ask the user to enter a limit.
     
-    final_limit_v4 = int(raw_v4)
-    final_limit_v6 = int(raw_v6)
+    Returns:
+        tuple: (limit_v4, limit_v6, sources) - sources is {'IPv4': ..., 'IPv6': ...},
+        each 'PeeringDB', 'IRR', 'manual' or None (no limit)
+    """
+    # 1. extract raw data (+ IRR suggestion)
+    pdb_v4, pdb_v6 = extract_prefix_limits(net_info)
+    final_limit_v4, final_limit_v6, source = suggest_prefix_limits(net_info, irr_index)
+    sources = {}
+    for family, pdb_limit, limit in (("IPv4", pdb_v4, final_limit_v4), ("IPv6", pdb_v6, final_limit_v6)):
+        sources[family] = 'PeeringDB' if pdb_limit else 'IRR' if limit else None
+        if source and not pdb_limit and limit:
+            console.print(f"[cyan]ℹ️  {family} Prefix Limit missing in PeeringDB, using {limit} "
+                          f"from the IRR ({escape(str(net_info.get('irr_as_set') or 'origin AS'))}).[/cyan]")
 
     # 2. ask manually, if IPv4 limit is 0
     if final_limit_v4 == 0:
@@ -27,6 +75,7 @@ def get_validated_prefix_limits(net_info):
                 val = Prompt.ask("Enter IPv4 Limit (integer)")
                 if val.isdigit() and int(val) > 0:
                     final_limit_v4 = int(val)
+                    sources["IPv4"] = 'manual'
                     break
 
     # 3. ask manually, if IPv6 limit is 0
@@ -37,26 +86,55 @@ def get_validated_prefix_limits(net_info):
                 val = Prompt.ask("Enter IPv6 Limit (integer)")
                 if val.isdigit() and int(val) > 0:
                     final_limit_v6 = int(val)
+                    sources["IPv6"] = 'manual'
                     break
                     
-    return final_limit_v4, final_limit_v6
+    return final_limit_v4, final_limit_v6, sources
 
-def select_tenant(nb_client, initial_search_term):
+def select_tenant(nb_client, initial_search_term, tenant_index=None, asn=None, asn_map=None):
     """
     Interactive Tenant chooser.
     
     Args:
         nb_client: The NetBoxClient entity.
         initial_search_term (str): name to search for (eg. a PeeringDB name).
+        tenant_index: optional TenantIndex, searched locally instead of NetBox 'q' searches.
+        asn, asn_map: optional peer ASN and AsnTenantMap; a remembered choice is offered
+            as the default (declining forgets it and searches), and the new choice is remembered.
         
     Returns:
         object: the choosen tenant object, or None, if the user quit.
     """
+    if asn_map is not None and asn is not None:
+        tenant_id = asn_map.get(asn)
+        if tenant_id:
+            t = (tenant_index.get(tenant_id) if tenant_index else None) or nb_client.get_tenant_by_id(tenant_id)
+            if t:
+                console.print(f"[green]✅ Remembered tenant for AS{asn}: {escape(t.name)} (ID: {t.id})[/green]")
+                if Prompt.ask("Use this Tenant? ('n': search again)", choices=["y", "n"], default="y") == "y":
+                    return t
+            # declined, or the tenant was deleted or merged in NetBox
+            asn_map.forget(asn)
+
+    tenant = _choose_tenant(nb_client, initial_search_term, tenant_index)
+    if tenant and asn_map is not None and asn is not None:
+        asn_map.remember(asn, tenant.id)
+    return tenant
+
+def _search_tenants(nb_client, search_term, tenant_index):
+    if tenant_index:
+        candidates = tenant_index.search(search_term)
+        if candidates:
+            return candidates
+    # no index, or a tenant created since the index was loaded
+    return nb_client.get_tenant_by_name(search_term)
+
+def _choose_tenant(nb_client, initial_search_term, tenant_index):
     console.print(f"Searching NetBox for: [bold]{escape(initial_search_term)}[/bold]...")
     search_term = initial_search_term
     
     while True:
-        candidates = nb_client.get_tenant_by_name(search_term)
+        candidates = _search_tenants(nb_client, search_term, tenant_index)
         
         if not candidates:
             console.print(f"[yellow]⚠️ No tenant found for '{escape(search_term)}'.[/yellow]")
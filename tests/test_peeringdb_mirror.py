@@ -0,0 +1,76 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.peeringdb_mirror import PeeringDBMirror
+
+DUMP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "peeringdb_dump.json")
+
+
+class FakeFetcher:
+    # Answers the '?since=' requests with prepared changes and records the params
+    def __init__(self, changes):
+        self.changes = changes
+        self.calls = []
+
+    def __call__(self, tag, params):
+        self.calls.append((tag, dict(params)))
+        return self.changes.get(tag, [])
+
+
+class PeeringDBMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = FakeFetcher({})
+        self.mirror = PeeringDBMirror(":memory:", fetcher=self.fetcher)
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_load_dump(self):
+        counts = self.mirror.load_dump(DUMP, synced_at=1000)
+        self.assertEqual(counts, {"net": 2, "ix": 1, "ixlan": 1, "ixpfx": 2, "netixlan": 2})
+        self.assertEqual(self.mirror.get_net(64500)["irr_as_set"], "AS-EXAMPLE")
+        self.assertIsNone(self.mirror.get_net(64999))
+        self.assertEqual([n["id"] for n in self.mirror.get_netixlans(64501)], [5001])
+        self.assertEqual([n["asn"] for n in self.mirror.get_netixlans_by_ix(10)], [64500, 64501])
+        self.assertEqual({p["prefix"] for p in self.mirror.get_ixpfxs(10)}, {"192.0.2.0/24", "2001:db8::/64"})
+        self.assertEqual(self.mirror.last_sync("netixlan"), 1000)
+
+    def test_not_ready_before_first_load(self):
+        self.assertFalse(self.mirror.is_initialized())
+        self.assertFalse(self.mirror.ready(3600))
+        # a lookup never starts the (full) download
+        self.assertEqual(self.fetcher.calls, [])
+
+    def test_incremental_sync(self):
+        self.mirror.load_dump(DUMP, synced_at=1000)
+        self.fetcher.changes = {
+            "net": [{"id": 1, "asn": 64500, "name": "Example Transit", "irr_as_set": "AS-EXAMPLE-V2", "status": "ok"},
+                    {"id": 3, "asn": 64502, "name": "Example New", "irr_as_set": "", "status": "ok"}],
+            "netixlan": [{"id": 5001, "net_id": 2, "ix_id": 10, "ixlan_id": 100, "asn": 64501, "name": "Example-IX",
+                          "ipaddr4": "192.0.2.2", "ipaddr6": None, "status": "deleted"}],
+        }
+        counts = self.mirror.sync()
+        self.assertEqual(counts["net"], 2)
+        self.assertEqual(counts["netixlan"], 1)
+        # only the changes since the dump are requested
+        self.assertTrue(all(params.get("since") == 1000 for _, params in self.fetcher.calls))
+        self.assertEqual(self.mirror.get_net(64500)["irr_as_set"], "AS-EXAMPLE-V2")
+        self.assertEqual(self.mirror.get_net(64502)["name"], "Example New")
+        self.assertEqual(self.mirror.get_netixlans(64501), [])
+        self.assertEqual(len(self.mirror.get_netixlans(64500)), 1)
+        self.assertGreater(self.mirror.last_sync("net"), 1000)
+
+    def test_ready_refreshes_when_stale(self):
+        self.mirror.load_dump(DUMP, synced_at=1000)
+        self.assertTrue(self.mirror.ready(3600))
+        self.assertEqual([tag for tag, _ in self.fetcher.calls], list(PeeringDBMirror.TABLES))
+        self.fetcher.calls.clear()
+        self.assertTrue(self.mirror.ready(3600))
+        self.assertEqual(self.fetcher.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()